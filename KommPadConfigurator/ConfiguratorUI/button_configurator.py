@@ -6,11 +6,12 @@ A standalone PyQt5 dialog for configuring button actions, values, and modifiers.
 import os
 from PyQt5.QtWidgets import (
     QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QLineEdit, 
-    QGroupBox, QComboBox, QCheckBox, QApplication, QMenu, QAction
+    QGroupBox, QComboBox, QCheckBox, QApplication, QMenu, QAction, QWidget
 )
 from PyQt5.QtCore import Qt
 from PyQt5.QtGui import QFont, QKeySequence
 import sys
+from macro_recorder import MacroRecorder
 
 
 class ButtonSettingsDialog(QDialog):
@@ -29,6 +30,10 @@ class ButtonSettingsDialog(QDialog):
         self.button_id = button_id
         self.config = config or {}
         
+        # Macro value (list of keys, steps or recording), kept as-is unless re-recorded
+        self.macro_value = None
+        self.macro_recorder = MacroRecorder()
+        
         self.setWindowTitle(f"Configure {self.button_id}")
         self.setFixedSize(600, 700)
         self.setModal(True)
@@ -188,6 +193,50 @@ class ButtonSettingsDialog(QDialog):
         self.additional_input.customContextMenuRequested.connect(self.show_custom_context_menu)
         value_group.addWidget(self.additional_input)
         
+        # Focus-or-launch option for Open_App
+        self.focus_app_checkbox = QCheckBox("Focus the app if it is already running")
+        self.focus_app_checkbox.setFont(QFont("Segoe UI", 12))
+        self.focus_app_checkbox.setVisible(False)
+        value_group.addWidget(self.focus_app_checkbox)
+        
+        # Macro recording controls
+        self.record_widget = QWidget()
+        record_layout = QHBoxLayout(self.record_widget)
+        record_layout.setContentsMargins(0, 0, 0, 0)
+        record_layout.setSpacing(12)
+        
+        self.record_btn = QPushButton("⏺ Record")
+        self.record_btn.setFont(QFont("Segoe UI", 12, QFont.Medium))
+        self.record_btn.setMinimumHeight(40)
+        self.record_btn.setStyleSheet("""
+            QPushButton {
+                background-color: #404040;
+                color: #e0e0e0;
+                border: 2px solid #606060;
+                border-radius: 12px;
+                padding: 6px 16px;
+            }
+            QPushButton:hover {
+                background-color: #505050;
+            }
+        """)
+        self.record_btn.clicked.connect(self.toggle_macro_recording)
+        record_layout.addWidget(self.record_btn)
+        
+        self.collapse_delays_checkbox = QCheckBox("Collapse pauses")
+        self.collapse_delays_checkbox.setFont(QFont("Segoe UI", 12))
+        self.collapse_delays_checkbox.setToolTip("Shorten pauses longer than 100 ms")
+        self.collapse_delays_checkbox.setChecked(True)
+        record_layout.addWidget(self.collapse_delays_checkbox)
+        
+        self.record_status_label = QLabel("")
+        self.record_status_label.setFont(QFont("Segoe UI", 12))
+        record_layout.addWidget(self.record_status_label)
+        record_layout.addStretch()
+        
+        self.record_widget.setVisible(False)
+        value_group.addWidget(self.record_widget)
+        
         form_layout.addLayout(value_group)
         
         # Modifiers
@@ -323,6 +372,8 @@ class ButtonSettingsDialog(QDialog):
         self.value_combo.clear()
         self.additional_input.setVisible(False)
         self.additional_input.setPlaceholderText("")
+        self.focus_app_checkbox.setVisible(False)
+        self.record_widget.setVisible(action_type == "📝 Macro")
         
         if action_type == "🔤 Key Press":
             # Keyboard keys
@@ -356,12 +407,13 @@ class ButtonSettingsDialog(QDialog):
         elif action_type == "⚡ Function":
             # Function actions
             function_actions = [
-                "Layer_Up", "Open_App", "Open_Web", "Text"
+                "Layer_Up", "Layer_Down", "Layer_Set", "Open_App", "Open_Web", "Text",
+                "App_Volume_Up", "App_Volume_Down"
             ]
             self.value_combo.addItems(function_actions)
             self.mod_group.setVisible(False)  # Will be shown conditionally
             
-        elif action_type == "� Macro":
+        elif action_type == "📝 Macro":
             # Macro actions (placeholder for future implementation)
             macro_actions = [
                 "Custom_Macro"
@@ -380,10 +432,12 @@ class ButtonSettingsDialog(QDialog):
         # Reset additional input visibility
         self.additional_input.setVisible(False)
         self.additional_input.setPlaceholderText("")
+        self.focus_app_checkbox.setVisible(False)
         
         if current_action == "⚡ Function":
             if value == "Open_App":
                 self.additional_input.setVisible(True)
+                self.focus_app_checkbox.setVisible(True)
                 self.additional_input.setPlaceholderText("Enter executable path (e.g., notepad.exe)")
                 # Hide modifiers for Open_App
                 self.mod_group.setVisible(False)
@@ -397,8 +451,18 @@ class ButtonSettingsDialog(QDialog):
                 self.additional_input.setPlaceholderText("Enter text to type")
                 # Hide modifiers for Text
                 self.mod_group.setVisible(False)
-            elif value == "Layer_Up":
-                # Hide additional input and modifiers for Layer_Up
+            elif value == "Layer_Set":
+                self.additional_input.setVisible(True)
+                self.additional_input.setPlaceholderText("Enter layer number (1-4)")
+                # Hide modifiers for Layer_Set
+                self.mod_group.setVisible(False)
+            elif value in ("App_Volume_Up", "App_Volume_Down"):
+                self.additional_input.setVisible(True)
+                self.additional_input.setPlaceholderText("Enter application (e.g., Spotify.exe or SYSTEM)")
+                # Hide modifiers for App_Volume_Up / App_Volume_Down
+                self.mod_group.setVisible(False)
+            elif value in ("Layer_Up", "Layer_Down"):
+                # Hide additional input and modifiers for Layer_Up / Layer_Down
                 self.mod_group.setVisible(False)
         
     def load_config(self):
@@ -414,9 +478,13 @@ class ButtonSettingsDialog(QDialog):
         self.on_action_type_changed(self.action_type_combo.currentText())
         
         # Set value after populating options
-        self.value_combo.setCurrentText(
-            self.config.get("value", "")
-        )
+        value = self.config.get("value", "")
+        if isinstance(value, str):
+            self.value_combo.setCurrentText(value)
+        else:
+            # Macro key lists, steps and recordings are not combo entries
+            self.macro_value = value
+            self.update_record_status()
         
         # Load modifiers (handle both old dict format and new list format)
         modifiers_data = self.config.get("modifiers", [])
@@ -426,6 +494,7 @@ class ButtonSettingsDialog(QDialog):
         self.alt_checkbox.setChecked(False)
         self.shift_checkbox.setChecked(False)
         self.win_checkbox.setChecked(False)
+        self.focus_app_checkbox.setChecked(False)
         
         additional_text = ""
         
@@ -446,6 +515,10 @@ class ButtonSettingsDialog(QDialog):
                     additional_text = modifier[5:]  # Remove "text:" prefix
                 elif modifier.startswith("url:"):
                     additional_text = modifier[4:]  # Remove "url:" prefix
+                elif modifier.startswith("layer:"):
+                    additional_text = modifier[6:]  # Remove "layer:" prefix
+                elif modifier == "mode:focus":
+                    self.focus_app_checkbox.setChecked(True)
         else:
             # Old dictionary format for backward compatibility
             self.ctrl_checkbox.setChecked(modifiers_data.get("ctrl", False))
@@ -495,23 +568,62 @@ class ButtonSettingsDialog(QDialog):
             if self.win_checkbox.isChecked():
                 modifiers.append("win")
         elif current_action == "⚡ Function":
-            if current_value == "Open_App":
+            if current_value in ("Open_App", "App_Volume_Up", "App_Volume_Down"):
                 modifiers.append(f"exe:{self.additional_input.text().strip()}")
+                if current_value == "Open_App" and self.focus_app_checkbox.isChecked():
+                    modifiers.append("mode:focus")
             elif current_value == "Text":
                 modifiers.append(f"text:{self.additional_input.text().strip()}") 
             elif current_value == "Open_Web":
                 modifiers.append(f"url:{self.additional_input.text().strip()}")  
+            elif current_value == "Layer_Set":
+                modifiers.append(f"layer:{self.additional_input.text().strip()}")
         print(modifiers)             
         
+        value = self.value_combo.currentText().strip()
+        if current_action == "📝 Macro" and self.macro_value is not None:
+            value = self.macro_value
+        
         config = {
             "display_name": self.display_name_input.text().strip() or str(self.button_id),
             "action_type": self.action_type_combo.currentText(),
-            "value": self.value_combo.currentText().strip(),
+            "value": value,
             "modifiers": modifiers
         }
         
         return config
     
+    def toggle_macro_recording(self):
+        """Start or stop recording a macro from the keyboard"""
+        if not self.macro_recorder.is_recording():
+            self.macro_recorder.start()
+            self.record_btn.setText("⏹ Stop")
+            self.record_status_label.setText("Recording...")
+            return
+        
+        max_delay_ms = 100 if self.collapse_delays_checkbox.isChecked() else None
+        encoded = self.macro_recorder.stop(max_delay_ms)
+        self.record_btn.setText("⏺ Record")
+        if encoded:
+            self.macro_value = {"encoded": encoded}
+        self.update_record_status()
+    
+    def update_record_status(self):
+        """Show a short summary of the current macro"""
+        if isinstance(self.macro_value, dict) and "encoded" in self.macro_value:
+            events = len(self.macro_value["encoded"].split())
+            self.record_status_label.setText(f"{events} recorded events")
+        elif self.macro_value:
+            self.record_status_label.setText(f"{len(self.macro_value)} steps")
+        else:
+            self.record_status_label.setText("")
+    
+    def done(self, result):
+        """Make sure the keyboard listener never outlives the dialog"""
+        if self.macro_recorder.is_recording():
+            self.macro_recorder.stop()
+        super().done(result)
+    
     def show_custom_context_menu(self, position):
         """Show a custom Figma-style context menu"""
         line_edit = self.sender()
@@ -0,0 +1,108 @@
+"""
+Macro Recorder for the KommPad Configurator
+Captures real keystrokes with their timing and encodes them as a compact macro
+
+Encoded macros are stored in the mapping as {"encoded": "..."}: space separated
+tokens "<delta_ms><op><key>", where delta_ms is the time since the previous
+token (omitted when 0), op is '+' for press or '-' for release and key is a
+character or a key name (CTRL, SHIFT, F5, SPACE, ...). The daemon decodes
+them the first time the macro is played.
+"""
+
+import time
+from pynput.keyboard import Key, KeyCode, Listener
+
+# Modifier variants recorded under one name, as used by the button handler
+MODIFIER_NAMES = {
+    'ctrl_l': 'CTRL', 'ctrl_r': 'CTRL',
+    'alt_l': 'ALT', 'alt_r': 'ALT', 'alt_gr': 'ALT',
+    'shift_l': 'SHIFT', 'shift_r': 'SHIFT',
+    'cmd': 'WIN', 'cmd_l': 'WIN', 'cmd_r': 'WIN',
+}
+
+def get_key_name(key):
+    """
+    Get the macro name of a pynput key
+
+    Returns:
+        str: Key name, or None if the key can't be replayed
+    """
+    if isinstance(key, Key):
+        return MODIFIER_NAMES.get(key.name, key.name.upper())
+    if isinstance(key, KeyCode) and key.char:
+        return "SPACE" if key.char == " " else key.char
+    return None
+
+def encode_events(events, max_delay_ms=None):
+    """
+    Encode recorded events as a compact macro string
+
+    Args:
+        events (list): (time in seconds, '+' or '-', key name) tuples
+        max_delay_ms (int): Collapse longer pauses to this delay (None keeps them)
+
+    Returns:
+        str: Encoded macro
+    """
+    tokens = []
+    previous = events[0][0] if events else 0.0
+    for timestamp, op, name in events:
+        delta = int(round((timestamp - previous) * 1000))
+        previous = timestamp
+        if max_delay_ms is not None:
+            delta = min(delta, max_delay_ms)
+        tokens.append(f"{delta or ''}{op}{name}")
+    return " ".join(tokens)
+
+class MacroRecorder:
+    """Record keystrokes through a pynput listener"""
+
+    def __init__(self):
+        self.events = []
+        self._down = set()
+        self._listener = None
+
+    def is_recording(self):
+        """Check if the recorder is running"""
+        return self._listener is not None
+
+    def start(self):
+        """Start a new recording"""
+        self.events = []
+        self._down = set()
+        self._listener = Listener(on_press=self._on_press, on_release=self._on_release)
+        self._listener.start()
+
+    def stop(self, max_delay_ms=None):
+        """
+        Stop recording
+
+        Args:
+            max_delay_ms (int): Collapse longer pauses to this delay (None keeps them)
+
+        Returns:
+            str: Encoded macro
+        """
+        if self._listener:
+            self._listener.stop()
+            self._listener = None
+        # Keys still down when recording stopped are released at the end
+        now = time.monotonic()
+        for name in sorted(self._down):
+            self.events.append((now, '-', name))
+        self._down.clear()
+        return encode_events(self.events, max_delay_ms)
+
+    def _on_press(self, key):
+        name = get_key_name(key)
+        if name is None or name in self._down:
+            return  # Unknown key or auto-repeat of a held key
+        self._down.add(name)
+        self.events.append((time.monotonic(), '+', name))
+
+    def _on_release(self, key):
+        name = get_key_name(key)
+        if name is None or name not in self._down:
+            return
+        self._down.discard(name)
+        self.events.append((time.monotonic(), '-', name))
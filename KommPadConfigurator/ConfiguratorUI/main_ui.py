@@ -1,5 +1,10 @@
 import sys
 import os
+import copy
+import time
+import threading
+# The configuration file layer (config_file.py) is shared with the daemon
+sys.path.insert(1, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from PyQt5.QtWidgets import QApplication, QWidget, QVBoxLayout, QLabel, QHBoxLayout, QLineEdit, QPushButton, QDialog, QSpinBox, QMenu, QAction
 from PyQt5.QtCore import Qt, QEvent
 from PyQt5.QtGui import QIcon, QPixmap, QKeySequence, QColor
@@ -7,7 +12,9 @@ from PyQt5.QtSvg import QSvgWidget
 from button_configurator import ButtonSettingsDialog
 from dial_configurator import DialSettingsDialog
 from settings_configurator import SettingsDialog
-import json
+from config_file import get_config_writer
+from config_model import compile_config
+from control_socket import send_request
 
 class MainWindow(QWidget):
     def __init__(self):
@@ -612,8 +619,7 @@ class MainWindow(QWidget):
     def get_button_config_from_json(self, button_num):
         """Get button configuration directly from JSON file"""
         try:
-            with open("config.json", 'r') as f:
-                config_data = json.load(f)
+            config_data = get_config_writer("config.json").read()
             
             if "mappings" not in config_data:
                 return None
@@ -649,46 +655,43 @@ class MainWindow(QWidget):
             return None
     
     def save_configuration(self, filename="config.json"):
-        """Save button configurations to file"""
+        """Save button configurations to file (changes within a short time are written together)"""
         try:
             # Save current layer to mappings before saving
             if hasattr(self, 'full_mappings'):
                 self.save_current_layer_to_mappings()
             
-            # Load existing config to preserve device and other settings
-            try:
-                with open(filename, 'r') as f:
-                    existing_config = json.load(f)
-            except FileNotFoundError:
-                existing_config = {
-                    "device": {
-                        "max_layers": 4,
-                        "COM": "COM12"
-                    }
-                }
-            
-            # Update mappings
-            existing_config["mappings"] = self.full_mappings
-            
-            # Update settings with layer information
-            if "settings" not in existing_config:
-                existing_config["settings"] = {}
-            
+            mappings = copy.deepcopy(self.full_mappings)
             # Get max layers from spin box
             max_layers = self.max_layers_spinbox.value() if hasattr(self, 'max_layers_spinbox') else 4
-            existing_config["settings"]["MaxLayers"] = max_layers
-            
-            # Preserve existing layer data and only update names for active layers
-            if "Layers" not in existing_config["settings"]:
-                existing_config["settings"]["Layers"] = {}
+            layer_names = list(self.layer_names)
             
-            # Update layer names only for currently active layers (don't delete existing ones)
-            for i, name in enumerate(self.layer_names):
-                if i < len(self.layer_names):  # Only update layers we have in memory
+            def update_config(existing_config):
+                # Device and other settings are preserved, a new file gets the default device
+                if not existing_config:
+                    existing_config["device"] = {
+                        "max_layers": 4,
+                        "COM": "COM12"
+                    }
+                
+                # Update mappings
+                existing_config["mappings"] = mappings
+                
+                # Update settings with layer information
+                if "settings" not in existing_config:
+                    existing_config["settings"] = {}
+                
+                existing_config["settings"]["MaxLayers"] = max_layers
+                
+                # Preserve existing layer data and only update names for active layers
+                if "Layers" not in existing_config["settings"]:
+                    existing_config["settings"]["Layers"] = {}
+                
+                # Update layer names only for currently active layers (don't delete existing ones)
+                for i, name in enumerate(layer_names):
                     existing_config["settings"]["Layers"][f"layer{i}"] = {"name": name}
             
-            with open(filename, 'w') as f:
-                json.dump(existing_config, f, indent=2)
+            get_config_writer(filename).update(update_config, coalesce=True)
             print(f"Configuration saved to {filename}")
         except Exception as e:
             print(f"Error saving configuration: {e}")
@@ -696,8 +699,11 @@ class MainWindow(QWidget):
     def load_configuration(self, filename="config.json"):
         """Load button configurations from file"""
         try:
-            with open(filename, 'r') as f:
-                config_data = json.load(f)
+            config_data = get_config_writer(filename).read()
+            
+            # Report mistakes now instead of when the daemon runs the mapping
+            for error in compile_config(config_data).errors:
+                print(f"Config error: {error}")
             
             # Load accent color from device section and update UI colors
             if "device" in config_data and "AccentColor" in config_data["device"]:
@@ -830,31 +836,34 @@ class MainWindow(QWidget):
             else:
                 converted_modifiers = modifiers
             
+            # Keep fields the dialogs don't edit (double_tap, repeat, long_press, ...)
+            layer_mapping = self.full_mappings[button_key].setdefault(current_layer, {})
+            
             # Handle different button types with different JSON structures
             if button_num <= 6:
                 # Matrix buttons use standard format
-                self.full_mappings[button_key][current_layer] = {
+                layer_mapping.update({
                     "action": self.convert_action_from_old_format(config.get("action_type", "🔤 Key Press")),
                     "value": self.convert_value_from_old_format(config),
                     "modifiers": converted_modifiers,
                     "display": config.get("display_name", self.get_default_button_name(button_num))
-                }
+                })
             elif button_num <= 9:
                 # Dial buttons use dial format with exe, min, max
-                self.full_mappings[button_key][current_layer] = {
+                layer_mapping.update({
                     "exe": config.get("value", ""),
                     "min": config.get("min", 0),
                     "max": config.get("max", 100),
                     "display": config.get("display_name", self.get_default_button_name(button_num))
-                }
+                })
             else:
                 # Encoder buttons use standard format
-                self.full_mappings[button_key][current_layer] = {
+                layer_mapping.update({
                     "action": self.convert_action_from_old_format(config.get("action_type", "🔤 Key Press")),
                     "value": self.convert_value_from_old_format(config),
                     "modifiers": converted_modifiers,
                     "display": config.get("display_name", self.get_default_button_name(button_num))
-                }
+                })
     
     def load_layer_configurations(self):
         """Load configurations for the current layer"""
@@ -1164,7 +1173,7 @@ class MainWindow(QWidget):
             "🎮 Gamepad": "gamepad",
             "🎵 Media Control": "media",  # Fixed to match button configurator
             "⚙️ System": "system",
-            "� Macro": "macro",  # Fixed to match button configurator
+            "📝 Macro": "macro",  # Fixed to match button configurator
             "⚡ Function": "function"  # Fixed to match button configurator
         }
         return action_map.get(old_action, "key")
@@ -1178,7 +1187,7 @@ class MainWindow(QWidget):
             "gamepad": "🎮 Gamepad",
             "media": "🎵 Media Control",  # Fixed to match button configurator
             "system": "⚙️ System",
-            "macro": "� Macro",  # Fixed to match button configurator
+            "macro": "📝 Macro",  # Fixed to match button configurator
             "function": "⚡ Function"  # Fixed to match button configurator
         }
         return action_map.get(new_action, "🔤 Key Press")
@@ -1286,7 +1295,18 @@ class MainWindow(QWidget):
             for btn in self.encoder_buttons:
                 btn.setStyleSheet(encoder_button_style)
 
+def notify_daemon(written):
+    """Ask the running daemon to apply a saved configuration now (no-op if it isn't running)"""
+    def request_reload():
+        reply = send_request("reload", saved_ms=written * 1000.0)
+        if reply and reply.get('ok'):
+            print(f"Daemon updated in {(time.time() - written) * 1000.0:.1f} ms "
+                  f"({', '.join(reply.get('changes', [])) or 'no changes'})")
+
+    threading.Thread(target=request_reload, daemon=True).start()
+
 if __name__ == "__main__":
+    get_config_writer("config.json").add_listener(notify_daemon)
     app = QApplication(sys.argv)
     window = MainWindow()
     window.show()
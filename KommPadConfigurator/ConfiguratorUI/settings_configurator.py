@@ -4,6 +4,9 @@ A standalone PyQt5 dialog for configuring application settings, matching the sty
 """
 
 import sys
+import os
+# The configuration file layer (config_file.py) is shared with the daemon
+sys.path.insert(1, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from PyQt5.QtWidgets import (
     QApplication, QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, 
     QScrollArea, QWidget, QSpinBox, QSlider, QComboBox, QGroupBox, QFrame,
@@ -13,7 +16,8 @@ from PyQt5.QtCore import Qt
 from PyQt5.QtGui import QFont, QColor
 import json
 from color_picker import ColorPickerDialog
-import os
+from config_file import get_config_writer
+from config_model import compile_config
 
 
 class SettingsDialog(QDialog):
@@ -782,8 +786,7 @@ class SettingsDialog(QDialog):
             
             if file_path:
                 if os.path.exists("config.json"):
-                    with open("config.json", 'r') as source:
-                        config = json.load(source)
+                    config = get_config_writer("config.json").read()
                     
                     with open(file_path, 'w') as target:
                         json.dump(config, target, indent=2)
@@ -812,10 +815,12 @@ class SettingsDialog(QDialog):
                 # Validate the imported config has required structure
                 if not isinstance(imported_config, dict):
                     raise ValueError("Invalid configuration file format")
+                errors = compile_config(imported_config).errors
+                if errors:
+                    raise ValueError("\n".join(errors[:10]))
                 
                 # Save imported config
-                with open("config.json", 'w') as f:
-                    json.dump(imported_config, f, indent=2)
+                get_config_writer("config.json").replace(imported_config)
                 
                 # Reload settings from the imported config
                 self.load_settings()
@@ -871,8 +876,7 @@ class SettingsDialog(QDialog):
                 }
                 
                 # Save default config
-                with open("config.json", 'w') as f:
-                    json.dump(default_config, f, indent=2)
+                get_config_writer("config.json").replace(default_config)
                 
                 # Update parent if available
                 if self.parent_window:
@@ -941,8 +945,7 @@ class SettingsDialog(QDialog):
         """Load settings from config file"""
         try:
             if os.path.exists("config.json"):
-                with open("config.json", 'r') as f:
-                    config = json.load(f)
+                config = get_config_writer("config.json").read()
                 
                 # Load settings values
                 settings = config.get("settings", {})
@@ -976,30 +979,29 @@ class SettingsDialog(QDialog):
     def save_settings(self):
         """Save settings to config file and update parent"""
         try:
-            # Read existing config or create new one
-            config = {}
-            if os.path.exists("config.json"):
-                with open("config.json", 'r') as f:
-                    config = json.load(f)
-            
-            # Update settings section
-            if "settings" not in config:
-                config["settings"] = {}
-            
-            config["settings"]["Brightness"] = self.brightness_slider.value()
-            config["settings"]["ColorMode"] = self.mode_combo.currentText()
-            config["settings"]["Colors"] = self.led_colors.copy()
-            config["settings"]["EnableDeviceMonitoring"] = self.device_monitoring_checkbox.isChecked()
+            brightness = self.brightness_slider.value()
+            color_mode = self.mode_combo.currentText()
+            colors = self.led_colors.copy()
+            device_monitoring = self.device_monitoring_checkbox.isChecked()
             
-            # Update device section for accent color
-            if "device" not in config:
-                config["device"] = {}
-            
-            config["device"]["AccentColor"] = self.accent_color
+            def update_config(config):
+                # Update settings section
+                if "settings" not in config:
+                    config["settings"] = {}
+                
+                config["settings"]["Brightness"] = brightness
+                config["settings"]["ColorMode"] = color_mode
+                config["settings"]["Colors"] = colors
+                config["settings"]["EnableDeviceMonitoring"] = device_monitoring
+                
+                # Update device section for accent color
+                if "device" not in config:
+                    config["device"] = {}
+                
+                config["device"]["AccentColor"] = self.accent_color
             
             # Save config file
-            with open("config.json", 'w') as f:
-                json.dump(config, f, indent=2)
+            get_config_writer("config.json").update(update_config)
             
             # Update parent window if available
             if self.parent_window and hasattr(self.parent_window, 'load_configuration'):
@@ -0,0 +1,460 @@
+"""
+Async Core Module for KommPad Configurator
+asyncio implementation of the daemon core (python main.py --asyncio)
+
+AsyncioEventLoop offers the interface of event_loop.EventLoop on an asyncio
+loop, so the serial sessions, the config watcher, the hotplug monitor and
+all timers (hold, tap, macro) run on one asyncio thread unchanged. On top
+of it, the device I/O that used to block a thread is written as
+coroutines:
+    - probe_port() and find_kommpad_async() ping ports without blocking,
+      all candidate ports at the same time
+    - send_settings_async() writes the settings upload and waits for the
+      port to accept it
+    - AsyncControlServer serves the control socket on the same loop
+Launcher actions run in the default executor, every other action on the
+loop in event order (see button_handler.set_function_runner); the tray runs
+in its own thread.
+"""
+
+import asyncio
+import os
+import selectors
+import threading
+import time
+from collections import deque
+import serial
+import serial.tools.list_ports
+import metrics
+from scheduler import TimerHandle
+from control_socket import encode_message, decode_messages, MAX_SUBSCRIBER_BACKLOG
+from device_detector import load_last_port, save_last_port, get_settings_payload, prepare_layer_upload
+from event_loop import WAKEUP_WINDOW
+
+# Time a probed port gets to answer 'ping' with 'KommPong' (seconds)
+DEFAULT_PROBE_TIMEOUT = 3.0
+
+class _CountingSelector(selectors.DefaultSelector):
+    """Selector that records every wakeup of the asyncio loop"""
+
+    def __init__(self):
+        super().__init__()
+        self.wakeups = deque(maxlen=WAKEUP_WINDOW)
+
+    def select(self, timeout=None):
+        events = super().select(timeout)
+        self.wakeups.append(time.monotonic())
+        metrics.increment('loop_wakeups')
+        return events
+
+class _AsyncioTimer(TimerHandle):
+    """TimerHandle that also cancels the asyncio timer"""
+
+    __slots__ = ('owner', 'handle')
+
+    def __init__(self, owner, deadline, callback, args):
+        super().__init__(deadline, callback, args)
+        self.owner = owner
+        self.handle = None
+
+    def cancel(self):
+        if self.cancelled:
+            return
+        self.cancelled = True
+        self.owner._timers.discard(self)
+        if self.handle is not None:
+            self.owner.call_soon(self.handle.cancel)
+
+class AsyncioEventLoop:
+    """EventLoop interface (see event_loop.py) on an asyncio loop"""
+
+    def __init__(self, name="KommPadAsyncio"):
+        self.name = name
+        self._selector = _CountingSelector()
+        self.loop = asyncio.SelectorEventLoop(self._selector)
+        self._timers = set()  # Scheduled and not cancelled
+        self._thread = None
+
+    def is_loop_thread(self):
+        """Check if the caller runs on the loop thread"""
+        return self._thread is threading.current_thread()
+
+    def add_reader(self, fd, callback, *args):
+        """Call back whenever a file descriptor is readable (call on the loop thread)"""
+        self.loop.add_reader(fd, callback, *args)
+
+    def remove_reader(self, fd):
+        """Stop watching a file descriptor (call on the loop thread)"""
+        try:
+            self.loop.remove_reader(fd)
+        except (ValueError, OSError):
+            pass  # Already closed
+
+    def call_soon(self, callback, *args):
+        """Run a callback on the loop thread (from any thread)"""
+        if self.is_loop_thread():
+            self.loop.call_soon(callback, *args)
+        else:
+            self.loop.call_soon_threadsafe(callback, *args)
+
+    def call_at(self, deadline, callback, *args):
+        """
+        Run a callback at a time.monotonic() deadline (from any thread)
+
+        Returns:
+            TimerHandle: Handle that can cancel the callback
+        """
+        timer = _AsyncioTimer(self, deadline, callback, args)
+        self._timers.add(timer)
+        if self.is_loop_thread():
+            self._schedule(timer)
+        else:
+            self.loop.call_soon_threadsafe(self._schedule, timer)
+        return timer
+
+    def call_later(self, delay, callback, *args):
+        """
+        Run a callback after a delay in seconds (from any thread)
+
+        Returns:
+            TimerHandle: Handle that can cancel the callback
+        """
+        return self.call_at(time.monotonic() + delay, callback, *args)
+
+    def _schedule(self, timer):
+        if not timer.cancelled:
+            # The default asyncio clock is time.monotonic()
+            timer.handle = self.loop.call_at(timer.deadline, self._fire, timer)
+
+    def _fire(self, timer):
+        if timer.cancelled:
+            return
+        self._timers.discard(timer)
+        try:
+            timer.callback(*timer.args)
+        except Exception as e:
+            print(f"Error in scheduled callback: {e}")
+
+    def run_in_thread(self, func, *args, done=None):
+        """
+        Run a blocking function in the default executor
+
+        Args:
+            func (callable): Called with args in a worker thread
+            done (callable): Called with the result on the loop thread (None if func raised)
+        """
+        async def run():
+            return await self.loop.run_in_executor(None, func, *args)
+
+        self.run_coroutine(run(), done)
+
+    def run_coroutine(self, coroutine, done=None):
+        """
+        Run a coroutine on the loop (from any thread)
+
+        Args:
+            coroutine: Coroutine to run
+            done (callable): Called with the result on the loop thread (None if it raised)
+        """
+        async def run():
+            try:
+                result = await coroutine
+            except Exception as e:
+                print(f"Error in {getattr(coroutine, '__name__', 'coroutine')}: {e}")
+                result = None
+            if done:
+                done(result)
+
+        self.call_soon(self.loop.create_task, run())
+
+    def run_function(self, func, *args):
+        """Runner for button_handler.set_function_runner(): run a blocking action (launcher) in the executor"""
+        def work():
+            try:
+                func(*args)
+            except Exception as e:
+                print(f"Error in {getattr(func, '__name__', 'action')}: {e}")
+
+        self.call_soon(self.loop.run_in_executor, None, work)
+
+    def pending(self):
+        """Get the number of scheduled callbacks that were not cancelled"""
+        return len(self._timers)
+
+    def wakeups_per_minute(self):
+        """Get the number of wakeups in the last minute"""
+        cutoff = time.monotonic() - 60.0
+        return sum(1 for wakeup in tuple(self._selector.wakeups) if wakeup >= cutoff)
+
+    def start(self):
+        """Run the loop in a background thread"""
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def run(self):
+        """Run the loop in the calling thread until stop() is called"""
+        self._thread = threading.current_thread()
+        self._run()
+
+    def stop(self):
+        """Stop the loop and drop all pending callbacks"""
+        for timer in list(self._timers):
+            timer.cancel()
+        if self.loop.is_running():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+        if self._thread and not self.is_loop_thread():
+            self._thread.join(timeout=1)
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+async def _wait_writable(fd):
+    loop = asyncio.get_running_loop()
+    writable = loop.create_future()
+    loop.add_writer(fd, lambda: writable.done() or writable.set_result(None))
+    try:
+        await writable
+    finally:
+        loop.remove_writer(fd)
+
+async def write_serial_async(ser, data):
+    """
+    Write to a serial port without blocking the loop
+
+    Args:
+        ser (serial.Serial): Open port with a file descriptor (POSIX)
+        data (bytes): Data to send, returns once the port accepted all of it
+    """
+    fd = ser.fileno()
+    view = memoryview(data)
+    while view:
+        try:
+            written = os.write(fd, view)
+        except BlockingIOError:
+            await _wait_writable(fd)
+            continue
+        view = view[written:]
+
+class _LineReader:
+    """Lines of a serial port for coroutines, fed by the loop while the port is readable"""
+
+    def __init__(self, ser, loop):
+        self.ser = ser
+        self.loop = loop
+        self.fd = ser.fileno()
+        self.reader = asyncio.StreamReader()
+        loop.add_reader(self.fd, self._on_readable)
+
+    def _on_readable(self):
+        try:
+            data = os.read(self.fd, 4096)
+        except BlockingIOError:
+            return
+        except OSError as e:
+            self.detach()
+            self.reader.set_exception(e)
+            return
+        if data:
+            self.reader.feed_data(data)
+        else:
+            self.detach()
+            self.reader.feed_eof()
+
+    async def readline(self, timeout):
+        line = await asyncio.wait_for(self.reader.readline(), timeout)
+        if not line:
+            raise EOFError("port closed")
+        return line
+
+    def detach(self):
+        self.loop.remove_reader(self.fd)
+
+async def probe_port(port, baudrate=9600, timeout=DEFAULT_PROBE_TIMEOUT):
+    """
+    Check if a port is a KommPad (it answers 'ping' with 'KommPong')
+
+    Returns:
+        serial.Serial: Open port if it is a KommPad, None otherwise
+    """
+    loop = asyncio.get_running_loop()
+    # Opening a port may block (e.g., while the driver sets up DTR)
+    opening = loop.run_in_executor(None, lambda: serial.Serial(port, baudrate=baudrate, timeout=1))
+    try:
+        # Shielded: a cancelled probe can't stop the worker, the port it opens is closed instead
+        ser = await asyncio.shield(opening)
+    except asyncio.CancelledError:
+        opening.add_done_callback(_close_opened_port)
+        raise
+    except (serial.SerialException, OSError):
+        return None
+    reader = None
+    found = False
+    try:
+        ser.reset_input_buffer()
+        reader = _LineReader(ser, loop)
+        await write_serial_async(ser, b'ping\n')
+        deadline = loop.time() + timeout
+        while not found:
+            line = await reader.readline(max(0.0, deadline - loop.time()))
+            found = b"KommPong" in line
+    except (asyncio.TimeoutError, EOFError, OSError, serial.SerialException):
+        pass
+    finally:
+        # Also runs when the probe is cancelled (another port answered first)
+        if reader:
+            reader.detach()
+        if not found:
+            ser.close()
+    if not found:
+        return None
+    try:
+        await loop.run_in_executor(None, save_last_port, port)
+    except BaseException:
+        # Cancelled while saving: nobody receives the port
+        ser.close()
+        raise
+    return ser
+
+def _close_opened_port(opening):
+    """Close the port of an open that finished after its probe was cancelled"""
+    if not opening.cancelled() and opening.exception() is None:
+        opening.result().close()
+
+async def find_kommpad_async(baudrate=9600, timeout=DEFAULT_PROBE_TIMEOUT):
+    """
+    Search all serial ports for a KommPad, see device_detector.find_kommpad()
+
+    The last known port is tried first, then all other ports at the same
+    time instead of one after the other.
+
+    Returns:
+        serial.Serial: Open port of the KommPad, None if there is none
+    """
+    loop = asyncio.get_running_loop()
+    ports = [port.device for port in await loop.run_in_executor(None, serial.tools.list_ports.comports)]
+    last_port = load_last_port()
+    if last_port in ports:
+        ser = await probe_port(last_port, baudrate, timeout)
+        if ser:
+            return ser
+        ports.remove(last_port)
+    if not ports:
+        return None
+
+    probes = [asyncio.ensure_future(probe_port(port, baudrate, timeout)) for port in ports]
+    found = None
+    try:
+        for probe in asyncio.as_completed(probes):
+            ser = await probe
+            if ser:
+                found = ser
+                break
+    finally:
+        # Also when the search is cancelled: stop the other probes and close the other KommPads
+        for probe in probes:
+            if not probe.done():
+                probe.cancel()
+            elif not probe.cancelled() and probe.exception() is None \
+                    and probe.result() and probe.result() is not found:
+                probe.result().close()
+    return found
+
+async def send_settings_async(ser, config):
+    """
+    Send the settings upload (see device_detector.send_settings_to_macropad())
+
+    Returns:
+        bool: True if the upload was written
+    """
+    if config is None or 'settings' not in config.raw:
+        print("Error: 'settings' key is missing in the configuration.")
+        return False
+    try:
+        await write_serial_async(ser, get_settings_payload(config) + prepare_layer_upload(config))
+    except OSError as e:
+        print(f"Error sending settings to the macropad: {e}")
+        return False
+    print("Settings sent to the macropad")
+    return True
+
+class AsyncControlServer:
+    """Serve the control socket on the asyncio loop (protocol and handlers of a ControlServer)"""
+
+    def __init__(self, server):
+        """
+        Args:
+            server (ControlServer): Registered handlers, socket path and event bus (not started)
+        """
+        self.server = server
+        self.path = server.path
+        self._server = None
+        self._loop = None
+
+    async def start(self):
+        """
+        Create the socket and serve
+
+        Returns:
+            bool: False if the socket can't be created (e.g., another daemon is running)
+        """
+        listener = self.server.create_listener()
+        if listener is None:
+            return False
+        self._loop = asyncio.get_running_loop()
+        self._server = await asyncio.start_unix_server(self._serve, sock=listener)
+        return True
+
+    def stop(self):
+        """Stop serving and remove the socket (from any thread)"""
+        if self._server and self._loop.is_running():
+            self._loop.call_soon_threadsafe(self._server.close)
+        self._server = None
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+    async def _serve(self, reader, writer):
+        loop = asyncio.get_running_loop()
+        buffer = bytearray()
+        subscription = None
+
+        def send_event(event):
+            if writer.is_closing():
+                return
+            if writer.transport.get_write_buffer_size() > MAX_SUBSCRIBER_BACKLOG:
+                metrics.increment('control_subscribers_dropped')
+                writer.close()
+                return
+            writer.write(encode_message(event.to_dict()))
+
+        try:
+            while True:
+                data = await reader.read(65536)
+                if not data:
+                    break
+                buffer += data
+                try:
+                    requests = decode_messages(buffer)
+                except ValueError as e:
+                    writer.write(encode_message({"ok": False, "error": str(e)}))
+                    break
+                for request in requests:
+                    if isinstance(request, dict) and request.get("cmd") == "subscribe":
+                        metrics.increment('control_requests')
+                        if subscription is None and self.server.bus:
+                            # Events are published on any thread, deliver them on the loop
+                            subscription = self.server.bus.subscribe(
+                                lambda event: loop.call_soon_threadsafe(send_event, event))
+                        reply = {"ok": True}
+                    else:
+                        reply = self.server.dispatch(request)
+                    writer.write(encode_message(reply))
+                await writer.drain()
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            if subscription:
+                subscription.unsubscribe()
+            writer.close()
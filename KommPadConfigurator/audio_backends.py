@@ -0,0 +1,165 @@
+"""
+Audio Backends Module for KommPad Configurator
+Reads and sets the volume of single applications for the mixer engine
+
+Backends (settings.AudioBackend):
+    "pulse"  PulseAudio, and PipeWire through pipewire-pulse, using pactl (default on Linux)
+    "fake"   keeps the volumes in memory, for tests and benchmarks
+
+Applications are named like in the dial configuration: an executable
+("Spotify.exe", "spotify") or one of the special names "SYSTEM" (default
+output) and "MIC" (default input). Volumes are percentages.
+"""
+
+import re
+import shutil
+import subprocess
+import sys
+import threading
+import time
+
+# Special application names
+SYSTEM_OUTPUT = "system"
+SYSTEM_INPUT = "mic"
+
+# Seconds the list of streams of an application is reused
+STREAM_CACHE_TTL = 2.0
+
+def normalize_app_name(app):
+    """Lower-case name without the .exe suffix ("Spotify.exe" -> "spotify")"""
+    name = app.strip().lower()
+    return name[:-4] if name.endswith(".exe") else name
+
+class FakeAudioBackend:
+    """Keep application volumes in memory"""
+
+    name = "fake"
+
+    def __init__(self):
+        self.volumes = {}  # Normalized application name -> percent
+        self.calls = 0     # Number of set_volume() calls
+
+    def get_volume(self, app):
+        return self.volumes.get(normalize_app_name(app))
+
+    def set_volume(self, app, percent):
+        self.calls += 1
+        self.volumes[normalize_app_name(app)] = percent
+        return True
+
+class PulseAudioBackend:
+    """Set application volumes through pactl (PulseAudio or PipeWire)"""
+
+    name = "pulse"
+
+    def __init__(self):
+        self._pactl = shutil.which("pactl")
+        if self._pactl is None:
+            raise RuntimeError("pactl not found")
+        self._lock = threading.Lock()
+        self._streams = {}       # Normalized name -> [(index, percent)]
+        self._streams_time = 0.0
+
+    def get_volume(self, app):
+        name = normalize_app_name(app)
+        if name in (SYSTEM_OUTPUT, SYSTEM_INPUT):
+            kind = "sink" if name == SYSTEM_OUTPUT else "source"
+            output = self._run("get-default-" + kind)
+            if output is None:
+                return None
+            output = self._run(f"get-{kind}-volume", output.strip())
+            return _parse_percent(output) if output else None
+
+        streams = self._get_streams(name)
+        return streams[0][1] if streams else None
+
+    def set_volume(self, app, percent):
+        name = normalize_app_name(app)
+        value = f"{int(round(percent))}%"
+        if name == SYSTEM_OUTPUT:
+            return self._run("set-sink-volume", "@DEFAULT_SINK@", value) is not None
+        if name == SYSTEM_INPUT:
+            return self._run("set-source-volume", "@DEFAULT_SOURCE@", value) is not None
+
+        streams = self._get_streams(name)
+        if streams and self._set_streams(streams, value):
+            return True
+        # The streams may have changed (e.g., the next song), look again once
+        streams = self._get_streams(name, refresh=True)
+        return bool(streams) and self._set_streams(streams, value)
+
+    def _set_streams(self, streams, value):
+        return all(self._run("set-sink-input-volume", str(index), value) is not None
+                   for index, _ in streams)
+
+    def _get_streams(self, name, refresh=False):
+        with self._lock:
+            if refresh or time.monotonic() - self._streams_time > STREAM_CACHE_TTL:
+                output = self._run("list", "sink-inputs")
+                self._streams = _parse_sink_inputs(output or "")
+                self._streams_time = time.monotonic()
+            return self._streams.get(name, [])
+
+    def _run(self, *args):
+        try:
+            result = subprocess.run([self._pactl, *args], capture_output=True, text=True, timeout=2)
+        except (OSError, subprocess.TimeoutExpired) as e:
+            print(f"Error running pactl: {e}")
+            return None
+        if result.returncode != 0:
+            return None
+        return result.stdout
+
+_PERCENT = re.compile(r"(\d+)%")
+_PROPERTY = re.compile(r'^\s*(application\.process\.binary|application\.name)\s*=\s*"(.*)"')
+
+def _parse_percent(text):
+    match = _PERCENT.search(text)
+    return int(match.group(1)) if match else None
+
+def _parse_sink_inputs(output):
+    """Parse "pactl list sink-inputs" into {application name: [(index, percent)]}"""
+    streams = {}
+    index = None
+    percent = None
+    for line in output.splitlines():
+        if line.startswith("Sink Input #"):
+            index = int(line[12:])
+            percent = None
+        elif index is None:
+            continue
+        elif line.strip().startswith("Volume:"):
+            percent = _parse_percent(line)
+        else:
+            match = _PROPERTY.match(line)
+            if match:
+                entries = streams.setdefault(normalize_app_name(match.group(2)), [])
+                if (index, percent) not in entries:
+                    entries.append((index, percent))
+    return streams
+
+# Backend classes, by configuration name
+AUDIO_BACKENDS = {
+    "pulse": PulseAudioBackend,
+    "fake": FakeAudioBackend,
+}
+
+def create_audio_backend(name=None):
+    """
+    Create an audio backend
+
+    Args:
+        name (str): Backend name (default: "pulse" on Linux)
+
+    Returns:
+        Backend object, the fake backend when the requested one is not available
+    """
+    if name is None:
+        name = "pulse" if sys.platform.startswith("linux") else "fake"
+    try:
+        if name not in AUDIO_BACKENDS:
+            raise ValueError(f"Unknown audio backend: {name}")
+        return AUDIO_BACKENDS[name]()
+    except Exception as e:
+        print(f"Audio backend {name} not available ({e}), volume changes are ignored")
+        return FakeAudioBackend()
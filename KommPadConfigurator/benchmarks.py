@@ -0,0 +1,618 @@
+"""
+Benchmark Suite for KommPad Configurator
+Measures timing-sensitive parts of the daemon without a device attached
+
+Usage:
+    python benchmarks.py            run every benchmark
+    python benchmarks.py NAME ...   run selected benchmarks
+"""
+
+import os
+import sys
+import time
+import metrics
+
+# Registered benchmarks, by name
+BENCHMARKS = {}
+
+def benchmark(func):
+    """Register a benchmark function returning a dict of results"""
+    BENCHMARKS[func.__name__] = func
+    return func
+
+class NullKeyboard:
+    """Keyboard stand-in that only counts calls"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def press(self, key):
+        self.calls += 1
+
+    def release(self, key):
+        self.calls += 1
+
+    def type(self, text):
+        self.calls += len(text)
+
+    def tap(self, keys, count=1):
+        self.calls += 2 * (len(keys) - 1 + count)
+
+@benchmark
+def macro_jitter(steps=200, delay_ms=5):
+    """Timer jitter of a macro with many short delays"""
+    from macro_engine import MacroEngine
+    from scheduler import Scheduler
+
+    scheduler = Scheduler("BenchmarkScheduler")
+    keyboard = NullKeyboard()
+    engine = MacroEngine(keyboard, lambda key: key, lambda name, modifiers: None, scheduler)
+    macro = [{"repeat": steps, "steps": [{"tap": "a"}, {"delay": delay_ms}]}]
+
+    metrics.reset()
+    start = time.perf_counter()
+    engine.play("benchmark", macro)
+    while engine.is_playing("benchmark"):
+        time.sleep(0.01)
+    elapsed = time.perf_counter() - start
+    scheduler.stop()
+
+    jitter = metrics.get_sample_stats('macro_timer_jitter_ms')
+    return {
+        'expected_s': steps * delay_ms / 1000.0,
+        'elapsed_s': elapsed,
+        'jitter_p50_ms': jitter['p50'],
+        'jitter_p95_ms': jitter['p95'],
+        'jitter_max_ms': jitter['max']
+    }
+
+@benchmark
+def text_injection(length=20000, seconds=2.0):
+    """
+    Typing throughput for Unicode, multi-line snippets
+
+    Without a rate limit (injector overhead and correctness), at the
+    configured TextRate (achieved against configured characters per second)
+    and, with KOMMPAD_BENCHMARK_TYPING=1, on the configured input backend.
+    The last part types into the focused window, so it is opt-in.
+    """
+    from text_injector import TextInjector, DEFAULT_RATE
+    from config_model import compile_config
+    from config_store import get_config_store
+    from input_backends import DEFAULT_BACKEND, create_backend
+
+    class RecordingKeyboard(NullKeyboard):
+        def __init__(self):
+            super().__init__()
+            self.text = []
+
+        def type(self, text):
+            super().type(text)
+            self.text.append(text)
+
+    class NoClipboard:
+        def is_available(self):
+            return False
+
+    def run(keyboard, text, rate):
+        injector = TextInjector(keyboard, ['ctrl', 'v'], clipboard=NoClipboard(), mode="type", rate=rate)
+        start = time.perf_counter()
+        injector.inject(text)
+        injector.wait_idle()
+        return len(text) / (time.perf_counter() - start)
+
+    snippet = "Grüße, κόσμε! 日本語 🎛️ a:b:c\r\nsecond line\tTab\n"
+    text = (snippet * (length // len(snippet) + 1))[:length]
+    expected = text.replace("\r\n", "\n").replace("\r", "\n")
+
+    keyboard = RecordingKeyboard()
+    results = {
+        'characters': len(expected),
+        'unlimited_chars_per_second': run(keyboard, text, 0),
+        'type_calls': len(keyboard.text),
+        'typed_correct': "".join(keyboard.text) == expected
+    }
+
+    settings = compile_config(get_config_store().get()).settings
+    rate = settings.text_rate if settings.text_rate is not None else DEFAULT_RATE
+    results['configured_chars_per_second'] = rate or "unlimited"
+    if rate:
+        # About `seconds` of typing at the configured rate
+        limited = text[:max(1, int(rate * seconds))]
+        achieved = run(RecordingKeyboard(), limited, rate)
+        results['achieved_chars_per_second'] = achieved
+        results['rate_error_percent'] = (achieved - rate) / rate * 100.0
+
+    name = settings.input_backend or DEFAULT_BACKEND
+    if os.environ.get("KOMMPAD_BENCHMARK_TYPING") != "1":
+        results[f'{name}_chars_per_second'] = "skipped (set KOMMPAD_BENCHMARK_TYPING=1, types into the focused window)"
+        return results
+    try:
+        backend = create_backend(name, strict=True)
+    except Exception as e:
+        results[f'{name}_chars_per_second'] = f"not available ({e})"
+        return results
+    # Plain text so any application accepts it, short enough to clear by hand
+    typed = ("kommpad benchmark " * 20)[:min(len(expected), int(rate * seconds) if rate else 200)]
+    time.sleep(1.0)  # Time to focus a scratch window
+    results[f'{name}_chars_per_second'] = run(backend, typed, rate)
+    if hasattr(backend, 'close'):
+        backend.close()
+    return results
+
+@benchmark
+def input_backends(taps=500):
+    """Latency of a two-key chord on every available input backend"""
+    from input_backends import BACKENDS, create_backend
+
+    results = {}
+    for name in BACKENDS:
+        try:
+            backend = create_backend(name, strict=True)
+        except Exception as e:
+            results[f'{name}_available'] = f"no ({e})"
+            continue
+        # A high function key with Shift does nothing in most applications
+        keys = ['shift', 'f24']
+        if name == "pynput":
+            from pynput.keyboard import Key
+            keys = [Key.shift, Key.f20]
+
+        samples = []
+        for _ in range(taps):
+            start = time.perf_counter()
+            backend.tap(keys)
+            samples.append((time.perf_counter() - start) * 1000.0)
+        if hasattr(backend, 'close'):
+            backend.close()
+        samples.sort()
+        results[f'{name}_tap_p50_ms'] = samples[len(samples) // 2]
+        results[f'{name}_tap_p95_ms'] = samples[int(len(samples) * 0.95)]
+    return results
+
+@benchmark
+def process_lookup(processes=5000, lookups=200, churn=20):
+    """Focus-or-launch lookup cost with thousands of processes (fake /proc tree)"""
+    import os
+    import shutil
+    import tempfile
+    from process_index import ProcessIndex
+
+    root = tempfile.mkdtemp(prefix="kommpad-proc-")
+
+    def add_process(pid, name):
+        path = os.path.join(root, str(pid))
+        os.mkdir(path)
+        with open(os.path.join(path, "comm"), "w") as f:
+            f.write(name + "\n")
+        os.symlink(f"/usr/bin/{name}", os.path.join(path, "exe"))
+
+    try:
+        os.mkdir(os.path.join(root, "self"))
+        for pid in range(1, processes + 1):
+            add_process(pid, f"worker{pid % 97}")
+        add_process(processes + 1, "firefox")
+
+        index = ProcessIndex(root)
+        start = time.perf_counter()
+        index.refresh()
+        build_ms = (time.perf_counter() - start) * 1000.0
+
+        # Processes come and go between lookups
+        next_pid = processes + 2
+        scanned = index.scanned
+        lookup_ms = 0.0
+        for _ in range(lookups):
+            for _ in range(churn // 2):
+                shutil.rmtree(os.path.join(root, str(next_pid - processes)))
+                add_process(next_pid, "worker")
+                next_pid += 1
+            start = time.perf_counter()
+            found = index.find("firefox --new-window")
+            lookup_ms += (time.perf_counter() - start) * 1000.0 / lookups
+        incremental_reads = (index.scanned - scanned) / lookups
+
+        start = time.perf_counter()
+        for _ in range(10):
+            ProcessIndex(root).find("firefox")
+        full_scan_ms = (time.perf_counter() - start) * 1000.0 / 10
+    finally:
+        shutil.rmtree(root)
+
+    return {
+        'processes': processes,
+        'initial_build_ms': build_ms,
+        'lookup_ms': lookup_ms,
+        'entries_read_per_lookup': incremental_reads,
+        'full_scan_lookup_ms': full_scan_ms,
+        'found': found == [processes + 1]
+    }
+
+@benchmark
+def dial_filter(dials=3, seconds=60, sample_rate=100, noise=3.0):
+    """Event rate and lag of the dial filter with synthetic noisy input"""
+    import math
+    import random
+    from dial_filter import DialFilter, RAW_MAX
+
+    rng = random.Random(1)
+    samples = []
+    ideal_events = 0
+    ideal_levels = {}
+    for i in range(seconds * sample_rate):
+        t = i / sample_rate
+        for dial in range(dials):
+            # Slow turns with pauses, ADC noise and rare spikes
+            target = (0.5 + 0.5 * math.sin(t * (0.2 + 0.1 * dial))) * RAW_MAX
+            raw = target + rng.gauss(0.0, noise) + (rng.choice((-40, 40)) if rng.random() < 0.002 else 0)
+            samples.append((f"dial{dial + 1}", int(min(max(raw, 0), RAW_MAX))))
+            level = round(target * 100 / RAW_MAX)
+            if ideal_levels.get(dial) != level:
+                ideal_levels[dial] = level
+                ideal_events += 1
+
+    def run(dial_filter):
+        events = 0
+        start = time.perf_counter()
+        for dial, raw in samples:
+            if dial_filter.update(dial, raw, 0, 100) is not None:
+                events += 1
+        return events, time.perf_counter() - start
+
+    events, elapsed = run(DialFilter())
+    unfiltered, _ = run(DialFilter(smoothing=1.0, deadband=0))
+
+    # Lag: samples until the level settles after a turn (about one level per sample) stops
+    step_filter = DialFilter()
+    reported = None
+    for raw in range(0, RAW_MAX // 2, 10):
+        reported = step_filter.update("dial1", raw) or reported
+    final = round(raw * 100 / RAW_MAX)
+    lag_samples = 0
+    while reported != final and lag_samples < sample_rate:
+        reported = step_filter.update("dial1", raw) or reported
+        lag_samples += 1
+
+    return {
+        'samples': len(samples),
+        'events_noise_free': ideal_events,
+        'events_quantized_only': unfiltered,
+        'events_filtered': events,
+        'reduction_vs_samples': len(samples) / max(events, 1),
+        'samples_per_second': len(samples) / elapsed,
+        'settle_lag_ms': lag_samples * 1000.0 / sample_rate
+    }
+
+@benchmark
+def config_model(layers=4, lookups=200000):
+    """Compile time and mapping lookup cost of the typed model against raw dict chains"""
+    import os
+    import json
+    from config_model import compile_config
+
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'config.json')) as f:
+        raw = json.load(f)
+
+    start = time.perf_counter()
+    for _ in range(100):
+        model = compile_config(raw)
+    compile_ms = (time.perf_counter() - start) * 10.0
+
+    keys = [(control, f"layer{layer}") for control in raw.get("mappings", {})
+            if not control.startswith("dial") for layer in range(layers)]
+    keys = (keys * (lookups // max(len(keys), 1) + 1))[:lookups]
+
+    # What the dispatcher used to do per event: a dict chain and several field lookups
+    start = time.perf_counter()
+    for control, layer_key in keys:
+        mapping = raw.get("mappings", {}).get(control, {}).get(layer_key)
+        if mapping:
+            mapping.get("action"), mapping.get("value"), mapping.get("modifiers"), mapping.get("long_press")
+    dict_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for key in keys:
+        action = model.mappings.get(key)
+        if action:
+            action.action, action.value, action.modifiers, action.long_press
+    model_elapsed = time.perf_counter() - start
+
+    return {
+        'mappings': len(model.mappings),
+        'errors': len(model.errors),
+        'compile_ms': compile_ms,
+        'dict_lookup_ns': dict_elapsed * 1e9 / lookups,
+        'model_lookup_ns': model_elapsed * 1e9 / lookups,
+        'speedup': dict_elapsed / model_elapsed
+    }
+
+@benchmark
+def idle_wakeups(seconds=10.0):
+    """Wakeups and CPU time of the event loop while the pad is idle (serial, config watcher, hotplug)"""
+    import os
+    import socket
+    import tempfile
+    from event_loop import EventLoop
+    from config_watcher import ConfigWatcher
+    from hotplug import HotplugMonitor
+
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, 'config.json')
+    with open(path, 'w') as f:
+        f.write('{}')
+    # Stand-in for the serial port: a connected socket nobody writes to
+    device, host = socket.socketpair()
+
+    loop = EventLoop("BenchmarkLoop")
+    watcher = ConfigWatcher(path, lambda: None)
+    monitor = HotplugMonitor(loop, lambda port: None)
+
+    def setup():
+        loop.add_reader(host.fileno(), host.recv, 4096)
+        watcher.attach(loop)
+        monitor.start()
+        monitor.set_active(True)
+
+    loop.start()
+    loop.call_soon(setup)
+    time.sleep(0.5)  # Let the setup finish
+
+    metrics.reset()
+    cpu_start = time.process_time()
+    time.sleep(seconds)
+    cpu_ms = (time.process_time() - cpu_start) * 1000.0
+    wakeups = metrics.get_counter('loop_wakeups')
+
+    loop.call_soon(watcher.detach)
+    loop.call_soon(monitor.stop)
+    time.sleep(0.1)
+    loop.stop()
+    device.close()
+    host.close()
+    os.remove(path)
+    os.rmdir(directory)
+    return {
+        'seconds': seconds,
+        'config_watch': watcher.mode,
+        'hotplug': monitor.mode,
+        'wakeups': wakeups,
+        'wakeups_per_minute': wakeups * 60.0 / seconds,
+        # read_serial slept 0.1 s, the watcher polled every 1 s and the monitor every 3 s
+        'polling_wakeups_per_minute': 60 / 0.1 + 60 / 1.0 + 60 / 3.0,
+        'cpu_ms': cpu_ms,
+        'cpu_percent': cpu_ms / (seconds * 10.0)
+    }
+
+class PtySerial:
+    """Serial port stand-in on the device end of a pseudo-terminal"""
+
+    def __init__(self, fd):
+        self.fd = fd
+        self.port = "pty"
+        self.is_open = True
+
+    def fileno(self):
+        return self.fd
+
+    @property
+    def in_waiting(self):
+        import fcntl
+        import struct
+        import termios
+        return struct.unpack('i', fcntl.ioctl(self.fd, termios.FIONREAD, b'\0' * 4))[0]
+
+    def read(self, size=1):
+        return os.read(self.fd, size)
+
+    def readline(self):
+        # Like pyserial: one byte at a time, each read waits for the port
+        import select
+        line = bytearray()
+        while not line.endswith(b'\n'):
+            select.select([self.fd], [], [])
+            line += os.read(self.fd, 1)
+        return bytes(line)
+
+    def close(self):
+        self.is_open = False
+
+@benchmark
+def serial_throughput(events=20000):
+    """Input events per second and context switches of the threaded reader, EventLoop and the asyncio core"""
+    import pty
+    import resource
+    import threading
+    import tty
+    import button_handler
+    from config_model import compile_config
+    from event_loop import EventLoop
+    from async_core import AsyncioEventLoop
+    from scheduler import Scheduler, set_scheduler
+    from serial_session import SerialSession
+    from event_timing import host_time_ms
+
+    config = compile_config({"mappings": {"button1": {"layer0": {"action": "key", "value": "a"}}}})
+    previous_backend = button_handler.get_input_backend()
+    button_handler.set_input_backend("recording")
+    lines = b"button1 layer0 d\nbutton1 layer0 u\n" * (events // 2)
+
+    def run(mode):
+        master, slave = pty.openpty()
+        tty.setraw(slave)
+        ser = PtySerial(slave)
+        session = SerialSession(ser, config)
+        loop = None
+        if mode == "thread":
+            scheduler = Scheduler("BenchmarkScheduler")
+            set_scheduler(scheduler)
+
+            def read():
+                while not session.closed:
+                    session.handle_line(ser.readline(), host_time_ms())
+            threading.Thread(target=read, daemon=True).start()
+        else:
+            loop = scheduler = EventLoop("BenchmarkLoop") if mode == "event_loop" else AsyncioEventLoop("BenchmarkAsyncio")
+            set_scheduler(loop)
+            loop.start()
+            loop.call_soon(session.attach, loop)
+        time.sleep(0.1)
+
+        metrics.reset()
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        start = time.perf_counter()
+        threading.Thread(target=os.write, args=(master, lines), daemon=True).start()
+        while metrics.get_counter('serial_event_lines') < events and time.perf_counter() - start < 60:
+            time.sleep(0.005)
+        elapsed = time.perf_counter() - start
+        end = resource.getrusage(resource.RUSAGE_SELF)
+        processed = metrics.get_counter('serial_event_lines')
+
+        if loop:
+            loop.call_soon(session.close)
+        else:
+            session.closed = True
+            os.write(master, b"\n")  # Let the reader see the flag
+        time.sleep(0.1)
+        scheduler.stop()
+        os.close(master)
+        os.close(slave)
+        button_handler.get_keyboard().clear()
+        return {
+            f'{mode}_events_per_second': processed / elapsed,
+            f'{mode}_context_switches': (end.ru_nvcsw - usage.ru_nvcsw) + (end.ru_nivcsw - usage.ru_nivcsw),
+            f'{mode}_cpu_ms': ((end.ru_utime - usage.ru_utime) + (end.ru_stime - usage.ru_stime)) * 1000.0
+        }
+
+    results = {'events': events}
+    try:
+        for mode in ("thread", "event_loop", "asyncio"):
+            results.update(run(mode))
+    finally:
+        set_scheduler(None)
+        button_handler.set_input_backend(previous_backend)
+    return results
+
+@benchmark
+def headless_startup(runs=5):
+    """Import time and peak memory of the daemon, headless and with the tray libraries (fresh interpreters)"""
+    import subprocess
+    script = (
+        "import resource, sys, time\n"
+        "start = time.perf_counter()\n"
+        "import main\n"
+        "{tray}"
+        "elapsed = (time.perf_counter() - start) * 1000.0\n"
+        "gui = [name for name in ('pystray', 'PIL') if name in sys.modules]\n"
+        "print(elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, ','.join(gui) or '-')\n"
+    )
+    # ru_maxrss is in bytes on macOS, in kilobytes elsewhere
+    rss_unit = 1024.0 * 1024.0 if sys.platform == 'darwin' else 1024.0
+
+    def measure(tray):
+        samples = []
+        for _ in range(runs):
+            output = subprocess.run([sys.executable, "-c", script.format(tray=tray)], capture_output=True, text=True,
+                                    cwd=os.path.dirname(os.path.abspath(__file__)))
+            if output.returncode != 0:
+                return None
+            elapsed, rss, gui = output.stdout.split()[-3:]
+            samples.append((float(elapsed), int(rss) / rss_unit, gui))
+        samples.sort()
+        return samples[len(samples) // 2]
+
+    results = {}
+    for name, tray in (("headless", ""), ("tray", "import pystray\nfrom PIL import Image\n")):
+        sample = measure(tray)
+        if sample is None:
+            results[f'{name}_available'] = "no"
+            continue
+        results[f'{name}_import_ms'], results[f'{name}_max_rss_mb'], results[f'{name}_gui_modules'] = sample
+    return results
+
+@benchmark
+def config_startup(runs=50, synthetic_controls=500):
+    """Config load without the cache, cold (compile and write the artifact) and warm (load it), two config sizes"""
+    import json
+    import shutil
+    import tempfile
+    import threading
+    from config_store import ConfigStore
+    from config_model import compile_config
+    from config_cache import get_artifact_path
+    from device_detector import get_settings_payload
+
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'config.json')) as f:
+        shipped = json.load(f)
+    # Many controls with every kind of mapping field, on every layer
+    large = json.loads(json.dumps(shipped))
+    for index in range(synthetic_controls):
+        large.setdefault("mappings", {})[f"button{100 + index}"] = {
+            f"layer{layer}": {"action": "key", "value": "a", "modifiers": ["CTRL", "SHIFT"], "display": f"K{index}",
+                              "repeat": {"delay": 300, "rate": 25}, "long_press": {"action": "key", "value": "b"},
+                              "double_tap": {"action": "function", "value": "Open_App", "modifiers": ["exe:app"]}}
+            for layer in range(4)}
+
+    directory = tempfile.mkdtemp(prefix="kommpad-config-")
+    path = os.path.join(directory, 'config.json')
+
+    def load():
+        start = time.perf_counter()
+        get_settings_payload(ConfigStore(path).get_model())
+        elapsed = (time.perf_counter() - start) * 1000.0
+        # The artifact is written in the background, let it finish
+        for thread in threading.enumerate():
+            if thread.name == "KommPadConfigCache":
+                thread.join()
+        return elapsed
+
+    def median(samples):
+        return sorted(samples)[len(samples) // 2]
+
+    results = {}
+    try:
+        for name, config in (("shipped", shipped), ("large", large)):
+            with open(path, 'w') as f:
+                json.dump(config, f, indent=2)
+            with open(path, 'rb') as f:
+                content = f.read()
+
+            # Without the cache: what every start and reload did before
+            uncached = []
+            for _ in range(runs):
+                start = time.perf_counter()
+                get_settings_payload(compile_config(json.loads(content)))
+                uncached.append((time.perf_counter() - start) * 1000.0)
+
+            cold = []
+            for _ in range(runs):
+                if os.path.exists(get_artifact_path(path)):
+                    os.remove(get_artifact_path(path))
+                cold.append(load())
+            metrics.reset()
+            warm = [load() for _ in range(runs)]
+
+            results[f'{name}_mappings'] = len(compile_config(config).mappings)
+            results[f'{name}_uncached_ms'] = median(uncached)
+            results[f'{name}_cold_ms'] = median(cold)
+            results[f'{name}_warm_ms'] = median(warm)
+            results[f'{name}_warm_hits'] = metrics.get_counter('config_artifact_hits')
+            results[f'{name}_artifact_kb'] = os.path.getsize(get_artifact_path(path)) / 1024.0
+    finally:
+        shutil.rmtree(directory)
+    return results
+
+def main(names=None):
+    """Run benchmarks and print their results"""
+    names = names or list(BENCHMARKS)
+    for name in names:
+        if name not in BENCHMARKS:
+            print(f"Unknown benchmark: {name} (available: {', '.join(BENCHMARKS)})")
+            continue
+        print(f"{name}:")
+        for key, value in BENCHMARKS[name]().items():
+            if isinstance(value, float):
+                value = f"{value:.3f}"
+            print(f"  {key}: {value}")
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -3,19 +3,86 @@ Button Handler Module for KommPad Configurator
 Handles all button press actions including keys, macros, and functions
 """
 
-from pynput.keyboard import Key, Controller
-from serial_utils import write_serial
-import subprocess
-import os
+try:
+    from pynput.keyboard import Key
+except ImportError:
+    # No desktop session (e.g., headless on a server): special keys are sent
+    # by name ("ctrl", "media_volume_up"), which the uinput backend understands
+    class _KeyNames:
+        """Stand-in for pynput's Key, every key is its name"""
 
-# Initialize keyboard controller
-keyboard = Controller()
+        def __getattr__(self, name):
+            if name.startswith('_'):
+                raise AttributeError(name)
+            return name
+
+    Key = _KeyNames()
+import layer_manager
+import launcher
+from mixer_engine import get_mixer_engine
+from dial_filter import DialFilter
+from input_backends import create_backend, DEFAULT_BACKEND
+from macro_engine import MacroEngine, is_timed_macro, get_macro_steps
+from text_injector import TextInjector, get_default_paste_keys
+from config_model import parse_modifiers
+from event_bus import get_event_bus, ACTION_DONE
+import time
+
+# Keyboard backend, created from settings.InputBackend on first use (see get_keyboard)
+keyboard = None
+_backend_name = DEFAULT_BACKEND
+
+# Smoothing and quantization of the dial positions (configured by main.load_config)
+dial_filter = DialFilter()
+
+def set_input_backend(name):
+    """
+    Select the backend that sends key events (settings.InputBackend)
+
+    The backend is created when the first key is sent, a daemon that never
+    sends one (e.g., headless with only volume dials) loads no input library.
+
+    Args:
+        name (str): "pynput", "uinput" or "recording" (None for the default)
+    """
+    global keyboard, _backend_name, _macro_engine, _text_injector
+    name = name or DEFAULT_BACKEND
+    if name == _backend_name:
+        return
+    if _macro_engine is not None:
+        _macro_engine.cancel_all()
+    _backend_name = name
+    # Created again with the new backend on first use
+    keyboard = None
+    _macro_engine = None
+    _text_injector = None
+
+def get_input_backend():
+    """Get the name of the selected input backend"""
+    return _backend_name
+
+def get_keyboard():
+    """
+    Get the input backend, created on first use
+
+    Raises:
+        Exception: If neither the selected backend nor a fallback is available
+    """
+    global keyboard
+    if keyboard is None:
+        try:
+            keyboard = create_backend(_backend_name)
+        except Exception as e:
+            print(f"Error: no input backend available, key actions are not sent ({e})")
+            raise
+        print(f"Input backend: {keyboard.name}")
+    return keyboard
 
 def get_key_from_string(key_str):
     """Convert string representation of key to pynput Key object if special key"""
     special_keys = {
         # keyboard keys
-        'CTRL': Key.ctrl, 'ALT': Key.alt, 'SHIFT': Key.shift,
+        'CTRL': Key.ctrl, 'ALT': Key.alt, 'SHIFT': Key.shift, 'WIN': Key.cmd,
         'ENTER': Key.enter, 'ESC': Key.esc, 'TAB': Key.tab,
         'SPACE': Key.space, 'BACKSPACE': Key.backspace,
         'DELETE': Key.delete, 'INSERT': Key.insert,
@@ -37,205 +104,280 @@ def get_key_from_string(key_str):
         
     }
     
-    return special_keys.get(key_str.upper(), key_str)
+    key = special_keys.get(key_str.upper())
+    if key is None and len(key_str) > 1:
+        # Other named keys (e.g., recorded "CAPS_LOCK" or "F13")
+        key = getattr(Key, key_str.lower(), None)
+    return key if key is not None else key_str
 
-def execute_key_action(key_value, modifiers=None):
-    # Execute a single key action with optional modifierss
-    # modifiers can be a single key or a list of keys
-    # join value with modifiers if provided in keys
+def get_action_keys(key_value, modifiers=None):
+    """Get the pynput keys of a key action, modifiers first"""
     keys = []
     if modifiers:
         keys.extend(get_key_from_string(mod) for mod in modifiers)
     keys.append(get_key_from_string(key_value))
+    return keys
 
-    
-    # Press all keys in sequence
-    for key in keys:
+def execute_key_action(key_value, modifiers=None, count=1):
+    # Execute a single key action with optional modifierss
+    # modifiers can be a single key or a list of keys
+    # join value with modifiers if provided in keys
+    # Pressed in sequence and released in reverse order, as one batch
+    # With a count the key is repeated while the modifiers stay down
+    get_keyboard().tap(get_action_keys(key_value, modifiers), count)
+
+def press_key_action(key_value, modifiers=None):
+    """Press and hold the keys of a key action (released by release_key_action)"""
+    keyboard = get_keyboard()
+    for key in get_action_keys(key_value, modifiers):
         keyboard.press(key)
-    # Release all keys in reverse order
-    for key in reversed(keys):
+
+def release_key_action(key_value, modifiers=None):
+    """Release the keys of a key action held by press_key_action"""
+    keyboard = get_keyboard()
+    for key in reversed(get_action_keys(key_value, modifiers)):
         keyboard.release(key)
      
 def execute_macro_action(macro_keys):
-    """Execute a key combination macro"""
-    # Convert string keys to pynput Key objects
-    keys = [get_key_from_string(k) for k in macro_keys]
-    
-    # Press all keys in sequence
-    for key in keys:
-        keyboard.press(key)
-    
-    # Release all keys in reverse order
-    for key in reversed(keys):
-        keyboard.release(key)
+    """Execute a macro: timed steps are played in the background, a list of keys is a key combination"""
+    if is_timed_macro(macro_keys):
+        # Keyed by the mapping value so pressing the same button again cancels it
+        get_macro_engine().play(id(macro_keys), get_macro_steps(macro_keys))
+        return
 
-def execute_media_action(media_value):
-    """Execute media control actions"""
-    
-    if media_value == "Volume_Up":
-        keyboard.press(Key.media_volume_up)
-        keyboard.release(Key.media_volume_up)
-        return True
-        
-    elif media_value == "Volume_Down":
-        keyboard.press(Key.media_volume_down)
-        keyboard.release(Key.media_volume_down)
-        return True
-        
-    elif media_value == "Volume_Mute":
-        keyboard.press(Key.media_volume_mute)
-        keyboard.release(Key.media_volume_mute)
-        return True
-        
-    elif media_value == "Media_Next":
-        keyboard.press(Key.media_next)
-        keyboard.release(Key.media_next)
-        return True
-        
-    elif media_value == "Media_Previous":
-        keyboard.press(Key.media_previous)
-        keyboard.release(Key.media_previous)
-        return True
-        
-    elif media_value == "Media_Play_Pause":
-        keyboard.press(Key.media_play_pause)
-        keyboard.release(Key.media_play_pause)
-        return True
-        
-    else:
+    # Convert string keys to pynput Key objects and send them as one key combination
+    get_keyboard().tap([get_key_from_string(k) for k in macro_keys])
+
+# Macro player, created on first use
+_macro_engine = None
+
+def get_macro_engine():
+    """Get the macro engine that plays timed macros"""
+    global _macro_engine
+    if _macro_engine is None:
+        _macro_engine = MacroEngine(get_keyboard(), get_key_from_string, execute_function_action)
+    return _macro_engine
+
+# Text injector, created on first use
+_text_injector = None
+
+# Text mode and rate (settings.TextMode, settings.TextRate), None for the defaults
+_text_settings = (None, None)
+
+def configure_text_injector(mode, rate):
+    """Set the text mode and rate, also of a text injector created later"""
+    global _text_settings
+    _text_settings = (mode, rate)
+    if _text_injector is not None:
+        _text_injector.configure(mode, rate)
+
+def get_text_injector():
+    """Get the text injector used by the Text function"""
+    global _text_injector
+    if _text_injector is None:
+        _text_injector = TextInjector(get_keyboard(), get_default_paste_keys(Key))
+        _text_injector.configure(*_text_settings)
+    return _text_injector
+
+# Volume change of App_Volume_Up/App_Volume_Down without a "step:" modifier, in percent
+DEFAULT_VOLUME_STEP = 5
+
+# Media actions and their keys
+MEDIA_KEYS = {
+    "Volume_Up": Key.media_volume_up,
+    "Volume_Down": Key.media_volume_down,
+    "Volume_Mute": Key.media_volume_mute,
+    "Media_Next": Key.media_next,
+    "Media_Previous": Key.media_previous,
+    "Media_Play_Pause": Key.media_play_pause,
+}
+
+def execute_media_action(media_value, count=1):
+    """Execute media control actions (count times, as one batch)"""
+    key = MEDIA_KEYS.get(media_value)
+    if key is None:
         print(f"Unknown media action: {media_value}")
         return False
+    get_keyboard().tap([key], count)
+    return True
 
-def execute_function_action(function_name, modifiers=None):
-    """Execute special functions like volume control, brightness, etc."""
+def execute_function_action(function_name, modifiers=None, count=1, params=None):
+    """
+    Execute special functions like volume control, brightness, etc.
+
+    The count (encoder acceleration) scales App_Volume_Up/App_Volume_Down,
+    the other functions run once. params are the parsed "name:value"
+    modifiers of a compiled Action; without them (e.g., macro steps) the
+    modifiers are parsed here.
+    """
+    if params is None:
+        params = parse_modifiers(modifiers)
     
     if function_name == "Layer_Up":
-        write_serial("layerUp")
-        print("Layer up command sent")
+        layer_manager.layer_up()
+        print(f"Layer up: {layer_manager.get_current_layer()}")
+        return True
+
+    elif function_name == "Layer_Down":
+        layer_manager.layer_down()
+        print(f"Layer down: {layer_manager.get_current_layer()}")
+        return True
+
+    elif function_name == "Layer_Set":
+        # Layer number as shown in the configurator (1-4)
+        layer = params.get("layer")
+        try:
+            if layer_manager.set_layer(int(layer) - 1):
+                print(f"Layer set: {layer_manager.get_current_layer()}")
+        except (TypeError, ValueError):
+            print(f"Invalid layer number for Layer_Set: {layer}")
         return True
     
     elif function_name == "Open_Web":
-        if modifiers and isinstance(modifiers, list):
-            url = next((mod[4:] for mod in modifiers if mod.startswith("url:")), None)
-            if url:
-                try:
-                    import webbrowser
-                    
-                    # Ensure URL has a proper protocol
-                    if not url.startswith(('http://', 'https://', 'ftp://', 'file://')):
-                        # Add https:// as default for most websites
-                        if url.startswith('www.') or '.' in url:
-                            url = 'https://' + url
-                        else:
-                            # For sites like "youtube.com", "google.com", etc.
-                            url = 'https://' + url
-                    
-                    # Open in default browser
-                    webbrowser.open(url)
-                    print(f"Opening URL in default browser: {url}")
-                    
-                except Exception as e:
-                    print(f"Error opening URL: {e}")
-                    print(f"Tried to open: {url}")
-            else:
-                print("No URL found in modifiers for Open_Web")
+        url = params.get("url")
+        if url:
+            launcher.open_url(url)
         else:
-            print("No valid URL modifier provided for Open_Web")
+            print("No URL found in modifiers for Open_Web")
         return True
 
     elif function_name == "Open_App":
-        if modifiers and isinstance(modifiers, list):
-            exe_path = next((mod[4:] for mod in modifiers if mod.startswith("exe:")), None)
-            if exe_path:
-                try:
-                    # Try different approaches to launch the application
-                    if os.path.isabs(exe_path) and os.path.exists(exe_path):
-                        # Absolute path that exists
-                        subprocess.Popen([exe_path])
-                        print(f"Opening application: {exe_path}")
-                    elif exe_path.endswith('.exe'):
-                        # Try to find the executable in PATH or use shell=True for Windows
-                        if os.name == 'nt':  # Windows
-                            subprocess.Popen(exe_path, shell=True)
-                            print(f"Opening application via shell: {exe_path}")
-                        else:
-                            subprocess.Popen([exe_path])
-                            print(f"Opening application: {exe_path}")
-                    else:
-                        # Treat as application name and let the shell handle it
-                        subprocess.Popen(exe_path, shell=True)
-                        print(f"Opening application via shell: {exe_path}")
-                except FileNotFoundError:
-                    print(f"Application not found: {exe_path}")
-                    print("Make sure the executable path is correct or the application is installed")
-                except Exception as e:
-                    print(f"Error opening application: {e}")
-                    print(f"Tried to open: {exe_path}")
+        exe_path = params.get("exe")
+        if exe_path:
+            if params.get("mode") == "focus":
+                launcher.focus_or_launch(exe_path)
             else:
-                print("No executable path found in modifiers for Open_App")
+                launcher.launch_app(exe_path)
         else:
-            print("No valid executable modifier provided for Open_App")
+            print("No executable path found in modifiers for Open_App")
         return True
     
-    elif function_name == "Text":
-        if modifiers and isinstance(modifiers, list):
-            keyboard.type(modifiers[0].split(":")[1])  
+    elif function_name in ("App_Volume_Up", "App_Volume_Down"):
+        app = params.get("exe")
+        step = params.get("step")
+        try:
+            step = float(step) if step else DEFAULT_VOLUME_STEP
+        except ValueError:
+            print(f"Invalid volume step for {function_name}: {step}")
             return True
+        if app:
+            step *= count
+            get_mixer_engine().step(app, step if function_name == "App_Volume_Up" else -step)
+        else:
+            print(f"No application found in modifiers for {function_name}")
+        return True
+
+    elif function_name == "Text":
+        # Everything after the prefix, the text itself may contain ':'
+        text = params.get("text")
+        if text:
+            get_text_injector().inject(text, params.get("mode"))
+        else:
+            print("No text found in modifiers for Text")
+        return True
 
     else:
         print(f"Unknown function action: {function_name}")
         return False  
 
-def handle_button_press(config, button_key, layer_key):
+def get_button_config(config, button_key, layer_key):
     """
-    Process button press according to JSON config using specified layer
+    Get the action of a button on a layer
     
     Args:
-        config (dict): Configuration dictionary loaded from config.json
+        config (ConfigModel): Compiled configuration
         button_key (str): Button identifier (e.g., "button1", "encoder1")
         layer_key (str): Layer identifier (e.g., "layer0", "layer1")
-    """
     
-    if not config or "mappings" not in config or button_key not in config["mappings"]:
-        print(f"No mapping found for {button_key}")
-        return
-    
-    # Get the button mappings
-    button_mappings = config["mappings"][button_key]
-    
-    # Check if the layer exists for this button
-    if layer_key not in button_mappings:
+    Returns:
+        Action: Compiled action, or None if there is no mapping
+    """
+    action = config.get_action(button_key, layer_key) if config else None
+    if action is None:
         print(f"No mapping found for {button_key} on {layer_key}")
-        return
+    return action
+
+def handle_button_press(config, button_key, layer_key):
+    """
+    Process button press according to the configuration using specified layer
+    
+    Args:
+        config (ConfigModel): Compiled configuration
+        button_key (str): Button identifier (e.g., "button1", "encoder1")
+        layer_key (str): Layer identifier (e.g., "layer0", "layer1")
+    """
+    action = get_button_config(config, button_key, layer_key)
+    if action is not None:
+        execute_action(action)
+
+# Function actions that block (resolving and starting programs, focusing windows)
+BLOCKING_FUNCTIONS = frozenset(("Open_Web", "Open_App"))
+
+# Runs the blocking function actions elsewhere, e.g. in an executor (None: inline)
+_function_runner = None
+
+def set_function_runner(runner):
+    """
+    Run the blocking function actions through a runner instead of the calling thread
+
+    Everything else stays on the calling thread, in the order of the events:
+    key, media and macro actions are short and their order matters (press
+    before release), layer switches must be done before the next event is
+    looked up, and text and volume changes are queued to worker threads of
+    their own (text_injector, mixer_engine).
+
+    Args:
+        runner (callable): Called as runner(func, *args), None to run inline
+    """
+    global _function_runner
+    _function_runner = runner
+
+def execute_action(action, count=1):
+    """
+    Execute a compiled action
     
-    # Get the action configuration for this button and layer
-    button_config = button_mappings[layer_key]
-    action_type = button_config.get("action")
-    action_value = button_config.get("value")
-    action_modifiers = button_config.get("modifiers", None)
+    Args:
+        action (Action): Action of a mapping (see config_model)
+        count (int): Repeat key and media actions and scale volume steps (macros run once)
+    """
+    if _function_runner is not None and action.action == "function" and action.value in BLOCKING_FUNCTIONS:
+        _function_runner(_execute_action, action, count)
+    else:
+        _execute_action(action, count)
+
+def _execute_action(action, count):
+    action_type = action.action
+    # Only timed when someone listens for action-done events
+    bus = get_event_bus()
+    start = time.perf_counter() if bus.has_subscribers(ACTION_DONE) else None
     
     # Execute the appropriate action
     if action_type == "key":
-        execute_key_action(action_value, action_modifiers)
+        execute_key_action(action.value, action.modifiers, count)
         
     elif action_type == "macro":
-        execute_macro_action(action_value)
+        execute_macro_action(action.value)
         
     elif action_type == "media":
-        execute_media_action(action_value)
+        execute_media_action(action.value, count)
         
     elif action_type == "function":
-        execute_function_action(action_value, action_modifiers)
+        execute_function_action(action.value, action.modifiers, count, action.params)
         
     else:
         print(f"Unknown action type: {action_type}")
+        return
+
+    if start is not None:
+        bus.publish(ACTION_DONE, action=action_type, value=action.value, count=count,
+                    duration_ms=(time.perf_counter() - start) * 1000.0)
 
 def handle_encoder_press(config, encoder_key, layer_key):
     """
     Handle encoder button presses (same as regular buttons but with different naming)
     
     Args:
-        config (dict): Configuration dictionary loaded from config.json
+        config (ConfigModel): Compiled configuration
         encoder_key (str): Encoder identifier (e.g., "encoder1", "encoder2")
         layer_key (str): Layer identifier (e.g., "layer0", "layer1")
     """
@@ -246,7 +388,7 @@ def handle_encoder_rotation(config, encoder_key, direction, layer_key):
     Handle encoder rotation events
     
     Args:
-        config (dict): Configuration dictionary loaded from config.json
+        config (ConfigModel): Compiled configuration
         encoder_key (str): Encoder identifier (e.g., "encoder1_cw", "encoder1_ccw")
         direction (str): Rotation direction ("cw" for clockwise, "ccw" for counter-clockwise)
         layer_key (str): Layer identifier (e.g., "layer0", "layer1")
@@ -254,3 +396,22 @@ def handle_encoder_rotation(config, encoder_key, direction, layer_key):
     # Create the rotation-specific key
     rotation_key = f"{encoder_key}_{direction}"
     handle_button_press(config, rotation_key, layer_key)
+
+def handle_dial_event(config, dial_key, layer_key, value):
+    """
+    Handle dial position events
+    
+    Args:
+        config (ConfigModel): Compiled configuration
+        dial_key (str): Dial identifier (e.g., "dial1")
+        layer_key (str): Layer identifier (e.g., "layer0", "layer1")
+        value (int): Raw dial position from 0 to 1023
+    """
+    dial = config.get_action(dial_key, layer_key) if config else None
+    if dial is None or value is None:
+        return
+    low, high = dial.low, dial.high
+    # Most samples are noise or don't change the volume level
+    level = dial_filter.update(dial_key, value, low, high)
+    if level is not None:
+        get_mixer_engine().set_volume(dial.exe, level, min(low, high), max(low, high))
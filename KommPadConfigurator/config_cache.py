@@ -0,0 +1,184 @@
+"""
+Config Cache Module for KommPad Configurator
+Keeps the compiled configuration next to config.json for the next start
+
+The artifact (config.json.compiled) holds everything the daemon derives
+from the configuration: the parsed configuration, the compiled model with
+its dispatch table (mappings and chords) and the pre-encoded device
+commands (settings upload and display names, see device_detector). It is
+keyed by the content hash of config.json, so a start with an unchanged
+configuration skips JSON parsing, compilation and payload building.
+
+The artifact is a header (format version, compiler fingerprint and
+content hash) and the model as plain values (see
+config_model.get_model_state()), written with marshal: loading it
+builds the objects directly and never runs code from the file. It is used
+only if the header matches: a changed config.json, a changed compiler
+module (see _COMPILER_MODULES) or another Python version is a miss, and
+the configuration is compiled as usual.
+
+Hits, misses and writes are counted in the metrics (config_artifact_hits,
+config_artifact_misses, config_artifact_writes).
+
+Usage (compile ahead of time, e.g. when deploying a configuration):
+    python config_cache.py [config.json]
+"""
+
+import gc
+import marshal
+import os
+import sys
+import tempfile
+import threading
+import metrics
+from config_model import get_model_state, restore_model
+
+# Format of the artifact, bump when its content changes
+ARTIFACT_VERSION = 1
+
+# File name suffix of the artifact (config.json -> config.json.compiled)
+ARTIFACT_SUFFIX = ".compiled"
+
+# Modules whose changes invalidate artifacts: they parse and hash the file (config_store),
+# build the model (config_model), encode the payloads (device_detector and layer_manager,
+# which it uses for the device commands) or write the artifact
+_COMPILER_MODULES = ("config_store.py", "config_model.py", "device_detector.py", "layer_manager.py",
+                     "config_cache.py")
+
+_fingerprint = None
+
+def get_artifact_path(config_path):
+    """Get the artifact path of a configuration file"""
+    return config_path + ARTIFACT_SUFFIX
+
+def get_compiler_fingerprint():
+    """Get the fingerprint of the compiler modules (size and modification time) and the marshal format"""
+    global _fingerprint
+    if _fingerprint is None:
+        directory = os.path.dirname(os.path.abspath(__file__))
+        parts = [("marshal", marshal.version, sys.version_info[:2])]
+        for name in _COMPILER_MODULES:
+            try:
+                stat = os.stat(os.path.join(directory, name))
+                parts.append((name, stat.st_size, stat.st_mtime_ns))
+            except OSError:
+                parts.append((name, None, None))
+        _fingerprint = tuple(parts)
+    return _fingerprint
+
+def precompile_payloads(model):
+    """Encode the device commands of a model (cached in model.payloads)"""
+    try:
+        # Imported here, the UI uses the store without the device modules
+        from device_detector import get_settings_payload, get_display_names_string
+    except ImportError:
+        return  # Encoded on first use instead
+    get_settings_payload(model)
+    get_display_names_string(model)
+
+def load_artifact(config_path, content_hash):
+    """
+    Load the compiled configuration of a config.json content
+
+    Args:
+        config_path (str): Path of config.json
+        content_hash (str): Hash of the current content of config.json
+
+    Returns:
+        ConfigModel: Compiled configuration (its raw is the parsed file), None on a miss
+    """
+    try:
+        with open(get_artifact_path(config_path), 'rb') as f:
+            header, state = marshal.loads(f.read())
+        if header == (ARTIFACT_VERSION, get_compiler_fingerprint(), content_hash):
+            # The load only allocates, garbage collections would just slow it down
+            gc_enabled = gc.isenabled()
+            gc.disable()
+            try:
+                model = restore_model(marshal.loads(state))
+            finally:
+                if gc_enabled:
+                    gc.enable()
+            metrics.increment('config_artifact_hits')
+            return model
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        print(f"Ignoring the compiled configuration: {e}")
+    metrics.increment('config_artifact_misses')
+    return None
+
+def save_artifact(config_path, content_hash, model, background=False):
+    """
+    Write the compiled configuration of a config.json content
+
+    Args:
+        config_path (str): Path of config.json
+        content_hash (str): Hash of the content the model was compiled from
+        model (ConfigModel): Compiled configuration
+        background (bool): Write in a worker thread (the payloads are encoded before it starts)
+    """
+    try:
+        precompile_payloads(model)
+    except Exception as e:
+        print(f"Error encoding the device commands: {e}")
+        return
+    if background:
+        threading.Thread(target=_write_artifact, args=(config_path, content_hash, model),
+                         name="KommPadConfigCache", daemon=True).start()
+    else:
+        _write_artifact(config_path, content_hash, model)
+
+def _write_artifact(config_path, content_hash, model):
+    try:
+        header = (ARTIFACT_VERSION, get_compiler_fingerprint(), content_hash)
+        state = get_model_state(model)
+        path = get_artifact_path(config_path)
+        # A cache: no lock and no fsync, a torn or stale artifact is just a miss
+        fd, temp_path = tempfile.mkstemp(prefix="." + os.path.basename(path) + ".", suffix=".tmp",
+                                         dir=os.path.dirname(os.path.abspath(path)))
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                # The model stays encoded until the header matched
+                f.write(marshal.dumps((header, marshal.dumps(state))))
+            os.replace(temp_path, path)
+        except BaseException:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            raise
+        metrics.increment('config_artifact_writes')
+    except Exception as e:
+        print(f"Error writing the compiled configuration: {e}")
+
+def main(argv):
+    """Compile a configuration file and write its artifact"""
+    import hashlib
+    import json
+    from config_model import compile_config
+    from config_store import CONFIG_PATH
+    path = os.path.abspath(argv[0]) if argv else CONFIG_PATH
+    try:
+        with open(path, 'rb') as f:
+            content = f.read()
+        raw = json.loads(content)
+    except (OSError, ValueError) as e:
+        print(f"Error loading config: {e}")
+        return 1
+    # Same content hash as the config store
+    digest = hashlib.sha1(content).hexdigest()
+    if load_artifact(path, digest) is not None:
+        print(f"Up to date: {get_artifact_path(path)}")
+        return 0
+    model = compile_config(raw)
+    for error in model.errors:
+        print(f"  {error}")
+    save_artifact(path, digest, model)
+    if not metrics.get_counter('config_artifact_writes'):
+        return 1
+    print(f"Compiled {len(model.mappings)} mappings to {get_artifact_path(path)}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,247 @@
+"""
+Config File Module for KommPad Configurator
+Safe reads and writes of config.json, shared by the daemon and the UI
+
+Every write:
+    - takes an advisory lock (config.json.lock) so the daemon and the UI
+      don't interleave their read-modify-write cycles
+    - is skipped if it would not change the file
+    - goes to a temporary file that replaces config.json with a rename, so
+      readers see either the old or the new file, never a partial one
+
+ConfigWriter coalesces quick successive changes (e.g., spin box ticks)
+into one write, so one UI gesture causes one write and one daemon reload.
+"""
+
+import atexit
+import copy
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+import metrics
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# Default window in which ConfigWriter collects changes into one write (seconds)
+DEFAULT_COALESCE_DELAY = 0.3
+
+# Suffix of the lock file next to the configuration file
+LOCK_SUFFIX = ".lock"
+
+@contextmanager
+def lock_config(path):
+    """
+    Hold the advisory lock of a configuration file
+
+    The lock is taken on a separate file because the configuration file
+    itself is replaced on every write.
+    """
+    with open(path + LOCK_SUFFIX, 'a+b') as lock_file:
+        if fcntl:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        else:
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+def read_config_bytes(path):
+    """Read the raw content of a configuration file, None if it doesn't exist"""
+    try:
+        with open(path, 'rb') as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+def read_config(path):
+    """
+    Read a configuration file
+
+    Returns:
+        dict: Configuration
+
+    Raises:
+        FileNotFoundError: If the file doesn't exist
+    """
+    with open(path, 'rb') as f:
+        return json.loads(f.read())
+
+def write_config_locked(path, data):
+    """
+    Write a configuration file atomically, the caller holds lock_config(path)
+
+    Returns:
+        bytes: Content of the file
+    """
+    content = json.dumps(data, indent=2).encode('utf-8')
+    if read_config_bytes(path) == content:
+        metrics.increment('config_writes_skipped')
+        return content
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(prefix="." + os.path.basename(path) + ".", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        # mkstemp creates the file readable by the owner only, keep the mode of the original
+        os.chmod(temp_path, os.stat(path).st_mode & 0o777 if os.path.exists(path) else 0o644)
+        _replace(temp_path, path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+    metrics.increment('config_writes')
+    return content
+
+def _replace(source, target):
+    """Rename over the target, retrying while Windows readers hold it open"""
+    for attempt in range(10):
+        try:
+            os.replace(source, target)
+            return
+        except PermissionError:
+            if sys.platform != 'win32' or attempt == 9:
+                raise
+            time.sleep(0.05)
+
+def write_config(path, data):
+    """
+    Write a configuration file atomically under the lock
+
+    Returns:
+        bytes: Content of the file
+    """
+    with lock_config(path):
+        return write_config_locked(path, data)
+
+def update_config(path, change):
+    """
+    Read, change and write a configuration file under the lock
+
+    Args:
+        path (str): Configuration file
+        change (callable): Called with the configuration to modify (an empty
+                           dictionary if the file doesn't exist)
+
+    Returns:
+        dict: New configuration
+    """
+    with lock_config(path):
+        content = read_config_bytes(path)
+        data = json.loads(content) if content is not None else {}
+        change(data)
+        write_config_locked(path, data)
+        return data
+
+class ConfigWriter:
+    """Collect changes to a configuration file and write them together"""
+
+    def __init__(self, path, delay=DEFAULT_COALESCE_DELAY):
+        """
+        Args:
+            path (str): Configuration file
+            delay (float): Time to wait for more changes before writing (seconds)
+        """
+        self.path = path
+        self.delay = delay
+        self._lock = threading.RLock()
+        self._pending = []  # Changes not written yet, in order
+        self._timer = None
+        self._listeners = []
+
+    def add_listener(self, callback):
+        """
+        Call back after each write
+
+        Args:
+            callback (callable): Called with the time of the write (seconds since the epoch)
+        """
+        self._listeners.append(callback)
+
+    def update(self, change, coalesce=False):
+        """
+        Change the configuration file
+
+        Args:
+            change (callable): Called with the configuration to modify
+            coalesce (bool): Wait for more changes instead of writing now
+        """
+        with self._lock:
+            self._pending.append(change)
+            if not coalesce:
+                self.flush()
+                return
+            metrics.increment('config_writes_coalesced')
+            if self._timer is None:
+                self._timer = threading.Timer(self.delay, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def replace(self, data, coalesce=False):
+        """Replace the whole configuration"""
+        data = copy.deepcopy(data)
+
+        def replace_all(config):
+            config.clear()
+            config.update(data)
+
+        self.update(replace_all, coalesce)
+
+    def flush(self):
+        """Write the pending changes now"""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._pending:
+                return
+            pending, self._pending = self._pending, []
+
+            def apply_all(config):
+                for change in pending:
+                    change(config)
+
+            update_config(self.path, apply_all)
+            written = time.time()
+        for callback in self._listeners:
+            try:
+                callback(written)
+            except Exception as e:
+                print(f"Error notifying config write: {e}")
+
+    def read(self):
+        """Read the configuration file, including pending changes"""
+        self.flush()
+        return read_config(self.path)
+
+# Writers by absolute path, so all windows of a process share the pending changes
+_writers = {}
+_writers_lock = threading.Lock()
+
+def get_config_writer(path):
+    """Get the shared ConfigWriter of a configuration file"""
+    path = os.path.abspath(path)
+    with _writers_lock:
+        writer = _writers.get(path)
+        if writer is None:
+            writer = _writers[path] = ConfigWriter(path)
+            atexit.register(writer.flush)
+        return writer
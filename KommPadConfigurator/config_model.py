@@ -0,0 +1,554 @@
+"""
+Config Model Module for KommPad Configurator
+Compiles config.json into typed objects once per load
+
+compile_config() validates and normalizes the configuration and returns a
+ConfigModel. Consumers read attributes instead of chains of dict.get, a
+mapping lookup is one dictionary access by (control, layer), and mistakes
+are reported when the configuration is loaded instead of when the button
+is pressed. Invalid mappings are left out of the model.
+
+The objects use __slots__ and are not changed after compilation, so a
+model can be shared between threads. The module has no dependencies, the
+daemon and the UI both use it.
+
+get_model_state() and restore_model() convert a model to plain values and
+back, for the compiled artifact kept next to config.json (config_cache.py).
+"""
+
+# Layers and display buttons known to the firmware
+NUM_LAYERS = 4
+NUM_DISPLAY_BUTTONS = 6
+
+# Action types of a mapping
+ACTION_TYPES = ("key", "macro", "media", "function")
+
+# Steps of a timed macro, in the order macro_engine checks them
+MACRO_STEPS = ("delay", "repeat", "press", "release", "tap", "type", "function")
+
+# Function actions and the modifier they need ("exe:..." -> "exe"), None if they need none
+FUNCTIONS = {
+    "Layer_Up": None,
+    "Layer_Down": None,
+    "Layer_Set": "layer",
+    "Open_Web": "url",
+    "Open_App": "exe",
+    "App_Volume_Up": "exe",
+    "App_Volume_Down": "exe",
+    "Text": "text",
+}
+
+# Defaults of the optional mapping fields
+DEFAULT_REPEAT_DELAY_MS = 500
+DEFAULT_REPEAT_RATE_HZ = 20
+DEFAULT_LONG_PRESS_MS = 500
+DEFAULT_TAP_WINDOW_MS = 200
+DEFAULT_CHORD_WINDOW_MS = 50
+DEFAULT_ACCELERATION = {"slow": 150, "fast": 20, "max": 8, "curve": 1.5}
+
+# Mapping fields of the multi-tap actions, by number of taps
+TAP_FIELDS = {2: "double_tap", 3: "triple_tap"}
+
+class Device:
+    """Device section"""
+
+    __slots__ = ('name', 'port', 'accent_color')
+
+    def __init__(self, name=None, port=None, accent_color=None):
+        self.name = name
+        self.port = port
+        self.accent_color = accent_color
+
+class Settings:
+    """Settings section, with the defaults of the daemon"""
+
+    __slots__ = ('max_layers', 'layer_names', 'brightness', 'color_mode', 'colors', 'idle_timeout',
+                 'event_timestamps', 'key_release_events', 'dial_inputs', 'firmware_debug',
+                 'enable_device_monitoring', 'input_backend', 'audio_backend', 'text_mode', 'text_rate',
+                 'dial_smoothing', 'dial_deadband', 'action_limits')
+
+    def __init__(self):
+        self.max_layers = 2
+        self.layer_names = ("",) * NUM_LAYERS
+        self.brightness = 255
+        self.color_mode = "solid"
+        self.colors = ()
+        self.idle_timeout = 0
+        self.event_timestamps = True
+        self.key_release_events = True
+        self.dial_inputs = False
+        self.firmware_debug = False
+        self.enable_device_monitoring = True
+        self.input_backend = None
+        self.audio_backend = None
+        self.text_mode = None
+        self.text_rate = None
+        self.dial_smoothing = None
+        self.dial_deadband = None
+        self.action_limits = None
+
+class Repeat:
+    """Auto-repeat while held ("repeat" field)"""
+
+    __slots__ = ('delay_ms', 'rate_hz')
+
+    def __init__(self, delay_ms=DEFAULT_REPEAT_DELAY_MS, rate_hz=DEFAULT_REPEAT_RATE_HZ):
+        self.delay_ms = delay_ms
+        self.rate_hz = rate_hz
+
+class LongPress:
+    """Other action when held long enough ("long_press" field)"""
+
+    __slots__ = ('time_ms', 'action')
+
+    def __init__(self, time_ms, action):
+        self.time_ms = time_ms
+        self.action = action
+
+class Acceleration:
+    """Encoder acceleration curve ("acceleration" field)"""
+
+    __slots__ = ('slow', 'fast', 'max', 'curve')
+
+    def __init__(self, slow, fast, max, curve):
+        self.slow = slow
+        self.fast = fast
+        self.max = max
+        self.curve = curve
+
+class Action:
+    """
+    Action of a control on a layer.
+
+    params holds the "name:value" modifiers of function actions (e.g.,
+    {"exe": "firefox", "mode": "focus"}), with "step" as a float and
+    "layer" as an int.
+    """
+
+    __slots__ = ('action', 'value', 'modifiers', 'display', 'params', 'hold', 'repeat', 'long_press',
+                 'taps', 'max_taps', 'tap_window', 'acceleration', 'debounce', 'window')
+
+    def __init__(self, action, value, modifiers=None, display="", params=None):
+        self.action = action
+        self.value = value
+        self.modifiers = modifiers or []
+        self.display = display
+        self.params = params or {}
+        self.hold = False
+        self.repeat = None        # Repeat
+        self.long_press = None    # LongPress
+        self.taps = None          # Number of taps -> Action, for multi-tap buttons
+        self.max_taps = 0
+        self.tap_window = DEFAULT_TAP_WINDOW_MS
+        self.acceleration = None  # Acceleration
+        self.debounce = None      # ms, None for the default of the action type
+        self.window = DEFAULT_CHORD_WINDOW_MS
+
+    @property
+    def action_type(self):
+        """Action type used for limits: the function name or the action ("Open_App", "key", ...)"""
+        return self.value if self.action == "function" else self.action
+
+class DialMapping:
+    """Volume dial of a layer"""
+
+    __slots__ = ('exe', 'low', 'high', 'display')
+
+    def __init__(self, exe, low=0, high=100, display=""):
+        self.exe = exe
+        self.low = low
+        self.high = high
+        self.display = display
+
+class ConfigModel:
+    """Compiled configuration"""
+
+    __slots__ = ('raw', 'device', 'settings', 'mappings', 'chords', 'display_names', 'errors', 'payloads')
+
+    def __init__(self, raw):
+        self.raw = raw                # The configuration as loaded from config.json
+        self.device = Device()
+        self.settings = Settings()
+        self.mappings = {}            # (control, layer_key) -> Action or DialMapping
+        self.chords = {}              # (control, layer_key) -> ((partner, Action), ...)
+        self.display_names = (("",) * NUM_DISPLAY_BUTTONS,) * NUM_LAYERS  # Per layer and display button
+        self.errors = []              # Problems found while compiling
+        self.payloads = {}            # Encoded device commands, by name (see device_detector, config_cache)
+
+    def get_action(self, control, layer_key):
+        """Get the Action (or DialMapping) of a control on a layer, None if there is none"""
+        return self.mappings.get((control, layer_key))
+
+def parse_modifiers(modifiers):
+    """
+    Get the "name:value" entries of a modifier list
+
+    Returns:
+        dict: name -> value, the first entry of a name wins
+    """
+    params = {}
+    for modifier in modifiers or ():
+        if isinstance(modifier, str) and ":" in modifier:
+            name, value = modifier.split(":", 1)
+            params.setdefault(name, value)
+    return params
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+class _Compiler:
+    """Builds a ConfigModel and collects the problems"""
+
+    def __init__(self, raw):
+        self.model = ConfigModel(raw)
+
+    def error(self, where, message):
+        self.model.errors.append(f"{where}: {message}")
+
+    def number(self, where, section, field, default, minimum=0):
+        value = section.get(field, default)
+        if not _is_number(value) or value < minimum:
+            self.error(f"{where}.{field}", f"expected a number >= {minimum}, got {value!r}")
+            return default
+        return value
+
+    def compile(self):
+        raw = self.model.raw
+        if not isinstance(raw, dict):
+            self.error("config", "expected an object")
+            return self.model
+        self.compile_device(raw.get("device", {}))
+        self.compile_settings(raw.get("settings", {}))
+        mappings = raw.get("mappings", {})
+        if not isinstance(mappings, dict):
+            self.error("mappings", "expected an object")
+            mappings = {}
+        for control, layers in mappings.items():
+            if not isinstance(layers, dict):
+                self.error(f"mappings.{control}", "expected an object of layers")
+                continue
+            for layer_key, mapping in layers.items():
+                self.compile_mapping(control, layer_key, mapping)
+        self.model.chords = {key: tuple(chords) for key, chords in self.model.chords.items()}
+        # Also shown for mappings that failed to compile
+        self.model.display_names = tuple(
+            tuple(str(((mappings.get(f"button{button}") or {}).get(f"layer{layer}") or {}).get("display", ""))
+                  for button in range(1, NUM_DISPLAY_BUTTONS + 1))
+            for layer in range(NUM_LAYERS))
+        return self.model
+
+    def compile_device(self, section):
+        if not isinstance(section, dict):
+            self.error("device", "expected an object")
+            return
+        self.model.device = Device(section.get("name"), section.get("COM"), section.get("AccentColor"))
+
+    def compile_settings(self, section):
+        settings = self.model.settings
+        if not isinstance(section, dict):
+            self.error("settings", "expected an object")
+            return
+        max_layers = section.get("MaxLayers", settings.max_layers)
+        if isinstance(max_layers, int) and 1 <= max_layers <= NUM_LAYERS:
+            settings.max_layers = max_layers
+        else:
+            self.error("settings.MaxLayers", f"expected 1 to {NUM_LAYERS}, got {max_layers!r}")
+        layers = section.get("Layers", {})
+        if isinstance(layers, dict):
+            settings.layer_names = tuple(str((layers.get(f"layer{i}") or {}).get("name", ""))
+                                         for i in range(NUM_LAYERS))
+        else:
+            self.error("settings.Layers", "expected an object")
+        settings.brightness = self.number("settings", section, "Brightness", settings.brightness)
+        settings.color_mode = str(section.get("ColorMode", settings.color_mode))
+        colors = section.get("Colors", [])
+        if isinstance(colors, list) and all(isinstance(color, str) for color in colors):
+            settings.colors = tuple(colors)
+        else:
+            self.error("settings.Colors", "expected a list of colors")
+        settings.idle_timeout = self.number("settings", section, "idleTimeout", settings.idle_timeout)
+        settings.event_timestamps = bool(section.get("EventTimestamps", True))
+        settings.key_release_events = bool(section.get("KeyReleaseEvents", True))
+        settings.dial_inputs = bool(section.get("DialInputs", False))
+        settings.firmware_debug = bool(section.get("FirmwareDebug", False))
+        settings.enable_device_monitoring = bool(section.get("EnableDeviceMonitoring", True))
+        settings.input_backend = section.get("InputBackend")
+        settings.audio_backend = section.get("AudioBackend")
+        settings.text_mode = section.get("TextMode")
+        settings.text_rate = section.get("TextRate")
+        settings.dial_smoothing = section.get("DialSmoothing")
+        settings.dial_deadband = section.get("DialDeadband")
+        action_limits = section.get("ActionLimits")
+        if action_limits is not None:
+            if isinstance(action_limits, dict) and all(
+                    isinstance(limits, dict) and all(_is_number(value) and value >= 0 for value in limits.values())
+                    for limits in action_limits.values()):
+                settings.action_limits = action_limits
+            else:
+                self.error("settings.ActionLimits", "expected {action type: {limit: number}}")
+
+    def compile_mapping(self, control, layer_key, mapping):
+        where = f"mappings.{control}.{layer_key}"
+        if not isinstance(mapping, dict):
+            self.error(where, "expected an object")
+            return
+        if control.startswith("dial"):
+            mapping_object = self.compile_dial(where, mapping)
+        else:
+            mapping_object = self.compile_action(where, mapping)
+        if mapping_object is None:
+            return
+        controls = control.split("+")
+        if len(controls) == 2:
+            first, second = controls
+            self.model.chords.setdefault((first, layer_key), []).append((second, mapping_object))
+            self.model.chords.setdefault((second, layer_key), []).append((first, mapping_object))
+        elif len(controls) > 2:
+            self.error(where, "a chord joins exactly two controls")
+        else:
+            self.model.mappings[(control, layer_key)] = mapping_object
+
+    def compile_dial(self, where, mapping):
+        if not mapping.get("exe"):
+            # A dial without an application does nothing, like an unmapped one
+            return None
+        low = self.number(where, mapping, "min", 0, minimum=float('-inf'))
+        high = self.number(where, mapping, "max", 100, minimum=float('-inf'))
+        return DialMapping(str(mapping["exe"]), low, high, str(mapping.get("display", "")))
+
+    def compile_action(self, where, mapping, nested=False):
+        """Compile an action and, unless nested, its optional behavior fields"""
+        action_type = mapping.get("action")
+        value = mapping.get("value")
+        modifiers = mapping.get("modifiers") or []
+        if action_type not in ACTION_TYPES:
+            self.error(where, f"unknown action type {action_type!r}")
+            return None
+        if not isinstance(modifiers, list):
+            self.error(where, "modifiers must be a list")
+            return None
+        params = {}
+        if action_type == "function":
+            params = self.compile_function(where, value, modifiers)
+            if params is None:
+                return None
+        elif action_type == "macro":
+            if not self.compile_macro(where, value):
+                return None
+        elif not isinstance(value, str) or not value:
+            self.error(where, f"missing {action_type} value")
+            return None
+        action = Action(action_type, value, modifiers, str(mapping.get("display", "")), params)
+        if nested:
+            return action
+
+        action.hold = bool(mapping.get("hold")) and action_type == "key"
+        action.debounce = mapping.get("debounce")
+        if action.debounce is not None:
+            action.debounce = self.number(where, mapping, "debounce", 0)
+        action.window = self.number(where, mapping, "window", DEFAULT_CHORD_WINDOW_MS)
+        repeat = mapping.get("repeat")
+        if repeat:
+            if isinstance(repeat, dict):
+                action.repeat = Repeat(self.number(where + ".repeat", repeat, "delay", DEFAULT_REPEAT_DELAY_MS),
+                                       self.number(where + ".repeat", repeat, "rate", DEFAULT_REPEAT_RATE_HZ))
+            else:
+                self.error(where + ".repeat", "expected an object")
+        long_press = mapping.get("long_press")
+        if long_press:
+            long_action = self.compile_action(where + ".long_press", long_press, nested=True) \
+                if isinstance(long_press, dict) else None
+            if long_action:
+                action.long_press = LongPress(self.number(where + ".long_press", long_press, "time",
+                                                          DEFAULT_LONG_PRESS_MS), long_action)
+            elif not isinstance(long_press, dict):
+                self.error(where + ".long_press", "expected an object")
+        taps = {}
+        for count, field in TAP_FIELDS.items():
+            if field in mapping:
+                tap_action = self.compile_action(f"{where}.{field}", mapping[field], nested=True) \
+                    if isinstance(mapping[field], dict) else None
+                if tap_action:
+                    taps[count] = tap_action
+                elif not isinstance(mapping[field], dict):
+                    self.error(f"{where}.{field}", "expected an object")
+        if taps:
+            action.taps = taps
+            action.max_taps = max(taps)
+            action.tap_window = self.number(where, mapping, "tap_window", DEFAULT_TAP_WINDOW_MS)
+        acceleration = mapping.get("acceleration")
+        if acceleration:
+            curve = dict(DEFAULT_ACCELERATION)
+            if isinstance(acceleration, dict):
+                for field, default in DEFAULT_ACCELERATION.items():
+                    curve[field] = self.number(where + ".acceleration", acceleration, field, default)
+            action.acceleration = Acceleration(curve["slow"], curve["fast"], curve["max"], curve["curve"])
+        return action
+
+    def compile_macro(self, where, value):
+        """
+        Check a macro value, in any form macro_engine plays: a list of key
+        names or steps, {"steps": [...]} or a recorded {"encoded": "..."}
+        """
+        if isinstance(value, dict):
+            if "encoded" in value:
+                return self.compile_recorded_macro(where + ".encoded", value["encoded"])
+            if "steps" not in value:
+                self.error(where, "a macro object needs 'steps' or 'encoded'")
+                return False
+            return self.compile_macro_steps(where + ".steps", value["steps"])
+        if not isinstance(value, list):
+            self.error(where, "a macro value must be a list or an object")
+            return False
+        return self.compile_macro_steps(where, value)
+
+    def compile_recorded_macro(self, where, encoded):
+        if not isinstance(encoded, str) or not encoded.strip():
+            self.error(where, "a recorded macro must be a non-empty string")
+            return False
+        for token in encoded.split():
+            # "<delta_ms><op><key>", see macro_engine.decode_macro()
+            key_start = len(token) - len(token.lstrip("0123456789"))
+            if key_start + 1 >= len(token) or token[key_start] not in "+-":
+                self.error(where, f"invalid recorded macro token {token!r}")
+                return False
+        return True
+
+    def compile_macro_steps(self, where, steps):
+        if not isinstance(steps, list) or not steps:
+            self.error(where, "expected a non-empty list of steps")
+            return False
+        for index, step in enumerate(steps):
+            step_where = f"{where}[{index}]"
+            if isinstance(step, str) and step:
+                continue  # Key name
+            if not isinstance(step, dict):
+                self.error(step_where, "expected a key name or a step object")
+                return False
+            kind = next((kind for kind in MACRO_STEPS if kind in step), None)
+            if kind is None:
+                self.error(step_where, f"unknown macro step, expected one of {', '.join(MACRO_STEPS)}")
+                return False
+            argument = step[kind]
+            if kind == "delay":
+                if not _is_number(argument) or argument < 0:
+                    self.error(step_where, f"expected a delay >= 0, got {argument!r}")
+                    return False
+            elif kind == "repeat":
+                if not isinstance(argument, int) or isinstance(argument, bool) or argument < 1:
+                    self.error(step_where, f"expected a repeat count >= 1, got {argument!r}")
+                    return False
+                if not self.compile_macro_steps(step_where + ".steps", step.get("steps")):
+                    return False
+            elif kind == "function":
+                modifiers = step.get("modifiers") or []
+                if not isinstance(modifiers, list):
+                    self.error(step_where, "modifiers must be a list")
+                    return False
+                if self.compile_function(step_where, argument, modifiers) is None:
+                    return False
+            elif not isinstance(argument, str) or not argument:
+                self.error(step_where, f"missing {kind} value")
+                return False
+            elif kind == "tap" and not isinstance(step.get("modifiers", []), list):
+                self.error(step_where, "modifiers must be a list")
+                return False
+        return True
+
+    def compile_function(self, where, name, modifiers):
+        """Check a function action and parse its modifiers, None if it can't run"""
+        if name not in FUNCTIONS:
+            self.error(where, f"unknown function {name!r}")
+            return None
+        params = parse_modifiers(modifiers)
+        required = FUNCTIONS[name]
+        if required and not params.get(required):
+            self.error(where, f"{name} needs the '{required}:' modifier")
+            return None
+        if "step" in params:
+            try:
+                params["step"] = float(params["step"])
+            except ValueError:
+                self.error(where, f"invalid volume step {params['step']!r}")
+                return None
+        if name == "Layer_Set":
+            try:
+                params["layer"] = int(params["layer"])
+            except ValueError:
+                params["layer"] = 0
+            if not 1 <= params["layer"] <= NUM_LAYERS:
+                self.error(where, f"layer must be 1 to {NUM_LAYERS}")
+                return None
+        return params
+
+def compile_config(raw):
+    """
+    Compile a configuration
+
+    Args:
+        raw (dict): Configuration as loaded from config.json
+
+    Returns:
+        ConfigModel: Compiled configuration; problems are listed in its errors
+    """
+    return _Compiler(raw if raw is not None else {}).compile()
+
+def _mapping_state(mapping):
+    if isinstance(mapping, DialMapping):
+        return (None, mapping.exe, mapping.low, mapping.high, mapping.display)
+    acceleration = mapping.acceleration
+    return (mapping.action, mapping.value, mapping.modifiers, mapping.display, mapping.params, mapping.hold,
+            (mapping.repeat.delay_ms, mapping.repeat.rate_hz) if mapping.repeat else None,
+            (mapping.long_press.time_ms, _mapping_state(mapping.long_press.action)) if mapping.long_press else None,
+            {count: _mapping_state(tap) for count, tap in mapping.taps.items()} if mapping.taps else None,
+            mapping.max_taps, mapping.tap_window,
+            (acceleration.slow, acceleration.fast, acceleration.max, acceleration.curve) if acceleration else None,
+            mapping.debounce, mapping.window)
+
+def _restore_mapping(state):
+    if state[0] is None:
+        return DialMapping(*state[1:])
+    # Filled directly, this runs for every mapping on a cached start
+    action = Action.__new__(Action)
+    (action.action, action.value, action.modifiers, action.display, action.params, action.hold, repeat, long_press,
+     taps, action.max_taps, action.tap_window, acceleration, action.debounce, action.window) = state
+    action.repeat = Repeat(*repeat) if repeat else None
+    action.long_press = LongPress(long_press[0], _restore_mapping(long_press[1])) if long_press else None
+    action.taps = {count: _restore_mapping(tap) for count, tap in taps.items()} if taps else None
+    action.acceleration = Acceleration(*acceleration) if acceleration else None
+    return action
+
+def get_model_state(model):
+    """
+    Get a compiled configuration as plain values (dicts, lists, tuples, strings, numbers)
+
+    Returns:
+        tuple: State for restore_model(), can be stored with marshal
+    """
+    return (model.raw,
+            tuple(getattr(model.device, name) for name in Device.__slots__),
+            tuple(getattr(model.settings, name) for name in Settings.__slots__),
+            {key: _mapping_state(mapping) for key, mapping in model.mappings.items()},
+            {key: tuple((partner, _mapping_state(mapping)) for partner, mapping in chords)
+             for key, chords in model.chords.items()},
+            model.display_names, model.errors, model.payloads)
+
+def restore_model(state):
+    """
+    Rebuild a compiled configuration from get_model_state()
+
+    Returns:
+        ConfigModel: The configuration as it was compiled
+    """
+    raw, device, settings, mappings, chords, display_names, errors, payloads = state
+    model = ConfigModel(raw)
+    model.device = Device(*device)
+    for name, value in zip(Settings.__slots__, settings):
+        setattr(model.settings, name, value)
+    model.mappings = {key: _restore_mapping(mapping) for key, mapping in mappings.items()}
+    model.chords = {key: tuple((partner, _restore_mapping(mapping)) for partner, mapping in key_chords)
+                    for key, key_chords in chords.items()}
+    model.display_names = display_names
+    model.errors = errors
+    model.payloads = payloads
+    return model
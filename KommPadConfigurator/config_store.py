@@ -0,0 +1,254 @@
+"""
+Config Store Module for KommPad Configurator
+Keeps config.json in memory so the daemon parses it once per change
+
+Every consumer (main, device_detector, ...) reads the configuration from
+the shared store instead of opening the file. The file is parsed on the
+first read and again only when reload() is called (e.g., by the config
+watcher). All changes go through update() or replace(), which writes the file through
+config_file (locked, atomic) and swaps in the new snapshot.
+
+refresh() is used by the config watcher: it reads the file, skips the parse
+when the content hash is unchanged (e.g., a write of the store itself) and
+reports which parts of the configuration changed (see classify_changes()).
+
+The compiled model of the file is kept in config.json.compiled (see
+config_cache.py); a start with an unchanged file loads it instead of
+parsing and compiling.
+
+Snapshots are shared: treat the returned dictionaries as read-only and
+change the configuration through update().
+
+Parses, reads and skipped reloads are counted in the metrics
+(config_parses, config_reads, config_reloads_skipped).
+"""
+
+import copy
+import hashlib
+import json
+import os
+import threading
+import metrics
+from config_file import lock_config, read_config_bytes, write_config_locked
+from config_model import compile_config
+from config_cache import load_artifact, save_artifact
+
+# Default location of the configuration file
+CONFIG_PATH = os.path.join(os.path.dirname(__file__), 'config.json')
+
+class ConfigStore:
+    """In-memory copy of a JSON configuration file"""
+
+    def __init__(self, path=CONFIG_PATH):
+        self.path = path
+        self._lock = threading.RLock()
+        self._data = None
+        self._hash = None  # Content hash of the file as last read or written
+        self._model = None # Compiled form of the current snapshot
+
+    def get(self):
+        """
+        Get the current configuration snapshot (parsed on first use)
+
+        Returns:
+            dict: Configuration, empty if the file is missing or invalid
+        """
+        metrics.increment('config_reads')
+        with self._lock:
+            if self._data is None:
+                self._data = self._parse()
+            return self._data
+
+    def get_model(self):
+        """
+        Get the compiled form of the current snapshot (compiled once per snapshot)
+
+        Returns:
+            ConfigModel: Validated configuration, problems are listed in its errors
+        """
+        with self._lock:
+            data = self.get()
+            if self._model is None or self._model.raw is not data:
+                self._model = compile_config(data)
+                metrics.increment('config_compiles')
+                if self._hash is not None:
+                    # The snapshot is the content of the file: keep the result for the next start
+                    save_artifact(self.path, self._hash, self._model, background=True)
+            return self._model
+
+    def get_section(self, name):
+        """Get a top-level section ("device", "settings", "mappings"), empty if missing"""
+        return self.get().get(name, {})
+
+    def get_setting(self, name, default=None):
+        """Get a value of the settings section"""
+        return self.get_section("settings").get(name, default)
+
+    def reload(self):
+        """
+        Parse the file again, e.g. after another process changed it
+
+        Returns:
+            dict: New configuration snapshot
+        """
+        with self._lock:
+            self._data = self._parse()
+            return self._data
+
+    def refresh(self):
+        """
+        Reload the file if its content changed
+
+        Returns:
+            tuple: (new snapshot, set of changes from classify_changes()), or None if
+                   the content is unchanged or can't be parsed (the snapshot is kept)
+        """
+        try:
+            with open(self.path, 'rb') as f:
+                content = f.read()
+        except OSError:
+            return None
+        digest = hashlib.sha1(content).hexdigest()
+        with self._lock:
+            if digest == self._hash:
+                metrics.increment('config_reloads_skipped')
+                return None
+            metrics.increment('config_parses')
+            try:
+                data = json.loads(content)
+            except ValueError as e:
+                print(f"Error loading config: {e}")
+                return None
+            changes = classify_changes(self._data or {}, data)
+            self._data = data
+            self._hash = digest
+            return data, changes
+
+    def update(self, change):
+        """
+        Change the configuration and write it to the file
+
+        Args:
+            change (callable): Called with a copy of the configuration to modify;
+                               returning False skips the write (nothing changed)
+
+        Returns:
+            dict: New configuration snapshot
+        """
+        with self._lock, lock_config(self.path):
+            content = read_config_bytes(self.path)
+            external = content is not None and hashlib.sha1(content).hexdigest() != self._hash
+            if external:
+                # Changed by another process (e.g., the UI) since the last reload: change
+                # that version, the watcher then reports both changes
+                data = json.loads(content)
+            else:
+                data = copy.deepcopy(self.get())
+            if change(data) is False:
+                return self._data
+            content = write_config_locked(self.path, data)
+            if external:
+                return data
+            self._data = data
+            self._hash = hashlib.sha1(content).hexdigest()
+            return data
+
+    def replace(self, data, model=None):
+        """
+        Replace the whole configuration (e.g., pushed over the control socket)
+
+        The file is written too, the watcher then skips it as our own write.
+
+        Args:
+            data (dict): New configuration
+            model (ConfigModel): compile_config(data), if the caller already validated it
+
+        Returns:
+            set: Changes from classify_changes()
+        """
+        with self._lock, lock_config(self.path):
+            changes = classify_changes(self.get(), data)
+            content = write_config_locked(self.path, data)
+            self._data = data
+            self._hash = hashlib.sha1(content).hexdigest()
+            if model is not None and model.raw is data:
+                # get_model() returns it instead of compiling the same snapshot again
+                self._model = model
+                save_artifact(self.path, self._hash, model, background=True)
+            return changes
+
+    def _parse(self):
+        self._hash = None
+        try:
+            with open(self.path, 'rb') as f:
+                content = f.read()
+            digest = hashlib.sha1(content).hexdigest()
+            model = load_artifact(self.path, digest)
+            if model is not None:
+                # Parsed and compiled by an earlier start (see config_cache.py)
+                self._model = model
+                self._hash = digest
+                return model.raw
+            metrics.increment('config_parses')
+            data = json.loads(content)
+            self._hash = digest
+            return data
+        except FileNotFoundError:
+            print("Config file not found. Using an empty configuration.")
+        except Exception as e:
+            print(f"Error loading config: {e}")
+        return {}
+
+def _get_display_names(config):
+    """Get the display names of all mappings: (control, layer) -> name"""
+    return {(control, layer_key): layer_config.get("display", "")
+            for control, layers in config.get("mappings", {}).items()
+            for layer_key, layer_config in layers.items() if isinstance(layer_config, dict)}
+
+def classify_changes(old, new):
+    """
+    Find out which parts of the configuration changed
+
+    Args:
+        old (dict): Previous configuration
+        new (dict): New configuration
+
+    Returns:
+        set: Any of
+            "port"           device.COM changed
+            "device"         another field of the device section changed
+            "settings"       the settings section changed
+            "display_names"  a display name of a mapping changed (shown by the device)
+            "mappings"       the mappings changed
+            "other"          another top-level section changed
+        Empty if the configurations are equal.
+    """
+    changes = set()
+    old_device = dict(old.get("device", {}))
+    new_device = dict(new.get("device", {}))
+    if old_device.pop("COM", None) != new_device.pop("COM", None):
+        changes.add("port")
+    if old_device != new_device:
+        changes.add("device")
+    if old.get("settings") != new.get("settings"):
+        changes.add("settings")
+    if old.get("mappings") != new.get("mappings"):
+        changes.add("mappings")
+        if _get_display_names(old) != _get_display_names(new):
+            changes.add("display_names")
+    if any(old.get(key) != new.get(key) for key in set(old) | set(new)
+           if key not in ("device", "settings", "mappings")):
+        changes.add("other")
+    return changes
+
+# Shared store of the daemon, created on first use
+_store = None
+_store_lock = threading.Lock()
+
+def get_config_store():
+    """Get the config store shared by the daemon modules"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ConfigStore()
+        return _store
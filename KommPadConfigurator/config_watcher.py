@@ -0,0 +1,234 @@
+"""
+Config Watcher Module for KommPad Configurator
+Calls back once per burst of writes to the configuration file
+
+On Linux the watcher uses inotify on the directory of the file (so
+replacing the file with a rename is seen too) and sleeps until the kernel
+reports an event. Elsewhere, or if inotify is not available, it polls the
+modification time and size of the file.
+
+Writes usually come in bursts (truncate, several writes, close, or an
+editor saving through a temporary file). The callback runs when no event
+arrived for the debounce time, so a burst produces one reload.
+
+The watcher either runs its own thread (start(), run()) or is attached to
+the daemon's event loop (attach(), see event_loop.py).
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+import metrics
+
+# Quiet time after the last event before the callback runs (seconds)
+DEFAULT_DEBOUNCE = 0.2
+
+# Check interval of the polling fallback (seconds)
+DEFAULT_POLL_INTERVAL = 1.0
+
+# inotify constants (linux/inotify.h)
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+# struct inotify_event: wd, mask, cookie, len (followed by the name)
+_INOTIFY_EVENT = struct.Struct('iIII')
+
+def _open_inotify(directory):
+    """
+    Create an inotify descriptor watching a directory
+
+    Returns:
+        int: File descriptor, or None if inotify is not available
+    """
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            return None
+        if libc.inotify_add_watch(fd, os.fsencode(directory), WATCH_MASK) < 0:
+            os.close(fd)
+            return None
+        return fd
+    except (OSError, AttributeError):
+        return None
+
+def _get_event_names(buffer):
+    """Get the file names of the events in an inotify read buffer"""
+    names = []
+    offset = 0
+    while offset + _INOTIFY_EVENT.size <= len(buffer):
+        _, _, _, length = _INOTIFY_EVENT.unpack_from(buffer, offset)
+        offset += _INOTIFY_EVENT.size
+        names.append(buffer[offset:offset + length].rstrip(b'\0'))
+        offset += length
+    return names
+
+class ConfigWatcher:
+    """Watch a file and call back after each burst of changes"""
+
+    def __init__(self, path, callback, debounce=DEFAULT_DEBOUNCE, poll_interval=DEFAULT_POLL_INTERVAL):
+        """
+        Args:
+            path (str): File to watch
+            callback (callable): Called without arguments after a change
+            debounce (float): Quiet time before the callback runs (seconds)
+            poll_interval (float): Check interval if inotify is not available (seconds)
+        """
+        self.path = os.path.abspath(path)
+        self.callback = callback
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.mode = None  # "inotify" or "polling" while running
+        self._stop = threading.Event()
+        self._wake_read, self._wake_write = os.pipe()
+        self._thread = None
+        self._loop = None
+        self._fd = None
+        self._timer = None  # Debounce or poll timer on the event loop
+        self._last_stat = None
+        self._changed = False  # Polling on the loop saw a change that was not reported yet
+
+    def start(self):
+        """Watch in a background thread"""
+        self._thread = threading.Thread(target=self.run, name="KommPadConfigWatcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop watching"""
+        self._stop.set()
+        os.write(self._wake_write, b'x')
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=1.0)
+
+    def run(self):
+        """Watch until stop() is called"""
+        fd = _open_inotify(os.path.dirname(self.path))
+        if fd is None:
+            self.mode = "polling"
+            self._run_polling()
+            return
+        self.mode = "inotify"
+        try:
+            self._run_inotify(fd)
+        finally:
+            os.close(fd)
+
+    def _run_inotify(self, fd):
+        name = os.fsencode(os.path.basename(self.path))
+        while not self._stop.is_set():
+            # Sleep until the kernel reports an event, no periodic wakeups
+            select.select([fd, self._wake_read], [], [])
+            if not self._read_events(fd, name):
+                continue
+            # Wait until the burst of writes is over
+            while not self._stop.is_set():
+                readable, _, _ = select.select([fd, self._wake_read], [], [], self.debounce)
+                if fd not in readable:
+                    break
+                self._read_events(fd, name)
+            if not self._stop.is_set():
+                self._notify()
+
+    def attach(self, loop):
+        """Watch on an event loop instead of a thread (call on the loop thread)"""
+        self._loop = loop
+        self._fd = _open_inotify(os.path.dirname(self.path))
+        if self._fd is None:
+            self.mode = "polling"
+            self._last_stat = self._stat()
+            self._timer = loop.call_later(self.poll_interval, self._poll_on_loop)
+            return
+        self.mode = "inotify"
+        loop.add_reader(self._fd, self._on_inotify)
+
+    def detach(self):
+        """Stop watching on the event loop (call on the loop thread)"""
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+        if self._fd is not None:
+            self._loop.remove_reader(self._fd)
+            os.close(self._fd)
+            self._fd = None
+
+    def _on_inotify(self):
+        if self._read_events(self._fd, os.fsencode(os.path.basename(self.path))):
+            # Run the callback once the burst of writes is over
+            if self._timer:
+                self._timer.cancel()
+            self._timer = self._loop.call_later(self.debounce, self._on_quiet)
+
+    def _on_quiet(self):
+        self._timer = None
+        self._notify()
+
+    def _poll_on_loop(self):
+        current = self._stat()
+        if current != self._last_stat:
+            self._last_stat = current
+            metrics.increment('config_watch_events')
+            # Check again after the debounce time, the callback runs once the file stops changing
+            self._timer = self._loop.call_later(self.debounce, self._poll_on_loop)
+            self._changed = True
+            return
+        if self._changed:
+            self._changed = False
+            self._notify()
+        self._timer = self._loop.call_later(self.poll_interval, self._poll_on_loop)
+
+    def _read_events(self, fd, name):
+        """Read the pending events, True if one of them is about the watched file"""
+        found = False
+        while True:
+            try:
+                buffer = os.read(fd, 4096)
+            except BlockingIOError:
+                return found
+            if not buffer:
+                return found
+            for event_name in _get_event_names(buffer):
+                if event_name == name:
+                    metrics.increment('config_watch_events')
+                    found = True
+
+    def _run_polling(self):
+        last = self._stat()
+        while not self._stop.wait(self.poll_interval):
+            current = self._stat()
+            if current == last:
+                continue
+            metrics.increment('config_watch_events')
+            # Wait until the file stops changing
+            while not self._stop.wait(self.debounce):
+                latest = self._stat()
+                if latest == current:
+                    break
+                current = latest
+            last = current
+            if not self._stop.is_set():
+                self._notify()
+
+    def _stat(self):
+        try:
+            stat = os.stat(self.path)
+            return stat.st_mtime_ns, stat.st_size, stat.st_ino
+        except OSError:
+            return None
+
+    def _notify(self):
+        try:
+            self.callback()
+        except Exception as e:
+            print(f"Error handling config change: {e}")
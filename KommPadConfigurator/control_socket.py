@@ -0,0 +1,419 @@
+"""
+Control Socket Module for KommPad Configurator
+Local control interface of the daemon over a Unix domain socket
+
+Messages are UTF-8 JSON objects (without whitespace), each preceded by its
+length as a 4-byte big-endian integer. A request names a command:
+    {"cmd": "status"}
+and gets one reply:
+    {"ok": true, ...} or {"ok": false, "error": "..."}
+
+Built-in commands are "ping" and "subscribe"; after a subscribe reply the
+server keeps sending the events of the daemon's event bus on that
+connection ({"event": "input-event", ...}, see event_bus.py). The server
+only subscribes to the bus while a client is subscribed. The daemon
+registers the other commands (see main.py).
+
+The socket is created in $XDG_RUNTIME_DIR (or the temp directory) and is
+only accessible by the user running the daemon.
+"""
+
+import json
+import os
+import selectors
+import socket
+import struct
+import tempfile
+import threading
+import time
+import metrics
+
+# Length prefix of every message
+_HEADER = struct.Struct('>I')
+
+# Largest accepted message (bytes)
+MAX_MESSAGE_SIZE = 1 << 20
+
+# Unsent events a subscriber may fall behind before it is disconnected (bytes)
+MAX_SUBSCRIBER_BACKLOG = 1 << 20
+
+# Socket file name
+SOCKET_NAME = "kommpad.sock"
+
+def get_socket_path():
+    """Get the path of the control socket of the current user"""
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir and os.path.isdir(runtime_dir):
+        return os.path.join(runtime_dir, SOCKET_NAME)
+    user = os.getuid() if hasattr(os, 'getuid') else os.environ.get("USERNAME", "user")
+    return os.path.join(tempfile.gettempdir(), f"kommpad-{user}.sock")
+
+def encode_message(message):
+    """Encode a message with its length prefix"""
+    payload = json.dumps(message, separators=(',', ':')).encode('utf-8')
+    return _HEADER.pack(len(payload)) + payload
+
+def decode_messages(buffer):
+    """
+    Decode the complete messages at the start of a buffer
+
+    Args:
+        buffer (bytearray): Received bytes, decoded messages are removed
+
+    Returns:
+        list: Decoded messages
+
+    Raises:
+        ValueError: If a message is too large or not valid JSON
+    """
+    messages = []
+    while len(buffer) >= _HEADER.size:
+        (length,) = _HEADER.unpack_from(buffer)
+        if length > MAX_MESSAGE_SIZE:
+            raise ValueError(f"message too large ({length} bytes)")
+        if len(buffer) < _HEADER.size + length:
+            break
+        payload = bytes(buffer[_HEADER.size:_HEADER.size + length])
+        del buffer[:_HEADER.size + length]
+        messages.append(json.loads(payload))
+    return messages
+
+class _Client:
+    """Connection state of a client"""
+
+    __slots__ = ('sock', 'inbox', 'outbox', 'subscribed')
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.inbox = bytearray()
+        self.outbox = bytearray()
+        self.subscribed = False
+
+class ControlServer:
+    """
+    Serve control requests on one thread.
+
+    Handlers run on the server thread, or wherever call_soon runs them
+    (e.g., the daemon's event loop, the thread that owns its state):
+    handler(request) returns a dict merged into the reply, exceptions
+    become error replies. The replies of a client are sent in the order of
+    its requests. publish() may be called from any thread and costs nothing
+    without subscribers.
+    """
+
+    def __init__(self, path=None, bus=None, call_soon=None):
+        """
+        Args:
+            path (str): Socket path (default: get_socket_path())
+            bus (EventBus): Events forwarded to subscribed clients
+            call_soon (callable): Runs the handlers, called as call_soon(callback, *args)
+                from the server thread (default: run them on the server thread)
+        """
+        self.path = path or get_socket_path()
+        self.bus = bus
+        self._bus_subscription = None
+        self._handlers = {}
+        self._selector = None
+        self._listener = None
+        self._clients = {}
+        self._call_soon = call_soon
+        self._events = []
+        self._replies = []  # (client, request, reply) of handlers run by call_soon
+        self._events_lock = threading.Lock()
+        self._wake_read, self._wake_write = socket.socketpair()
+        self._stop = False
+        self._subscribers = 0
+        self._thread = None
+
+    def register(self, command, handler):
+        """Register the handler of a command"""
+        self._handlers[command] = handler
+
+    def start(self):
+        """
+        Create the socket and serve in a background thread
+
+        Returns:
+            bool: False if the socket can't be created (e.g., another daemon is running)
+        """
+        listener = self.create_listener()
+        if listener is None:
+            return False
+        self._listener = listener
+        self._selector = selectors.DefaultSelector()
+        self._selector.register(listener, selectors.EVENT_READ)
+        self._selector.register(self._wake_read, selectors.EVENT_READ)
+        self._thread = threading.Thread(target=self._run, name="KommPadControl", daemon=True)
+        self._thread.start()
+        return True
+
+    def create_listener(self):
+        """
+        Create the listening socket, accessible by the current user only
+
+        Returns:
+            socket.socket: Non-blocking listener, None if the socket can't be created
+        """
+        if not hasattr(socket, 'AF_UNIX'):
+            print("Control socket not available on this platform")
+            return None
+        if os.path.exists(self.path):
+            if self._is_live():
+                print(f"Control socket already in use: {self.path}")
+                return None
+            os.remove(self.path)  # Left behind by a daemon that crashed
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        old_umask = os.umask(0o177)
+        try:
+            listener.bind(self.path)
+        finally:
+            os.umask(old_umask)
+        listener.listen(8)
+        listener.setblocking(False)
+        return listener
+
+    def stop(self):
+        """Stop serving and remove the socket"""
+        self._stop = True
+        self._wake()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=1.0)
+
+    def publish(self, event):
+        """Send an event message to all subscribers"""
+        if not self._subscribers:
+            return
+        with self._events_lock:
+            self._events.append(encode_message(event))
+        self._wake()
+
+    def _wake(self):
+        try:
+            self._wake_write.send(b'x')
+        except OSError:
+            pass
+
+    def _is_live(self):
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(self.path)
+            return True
+        except OSError:
+            return False
+        finally:
+            probe.close()
+
+    def _run(self):
+        try:
+            while not self._stop:
+                for key, mask in self._selector.select():
+                    if key.fileobj is self._listener:
+                        self._accept()
+                    elif key.fileobj is self._wake_read:
+                        self._wake_read.recv(4096)
+                        self._deliver_replies()
+                        self._deliver_events()
+                    else:
+                        client = key.data
+                        if mask & selectors.EVENT_READ:
+                            self._read(client)
+                        if mask & selectors.EVENT_WRITE and client.sock.fileno() != -1:
+                            self._flush(client)
+        finally:
+            for client in list(self._clients.values()):
+                self._close(client)
+            self._selector.close()
+            self._listener.close()
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+
+    def _accept(self):
+        try:
+            sock, _ = self._listener.accept()
+        except OSError:
+            return
+        sock.setblocking(False)
+        client = _Client(sock)
+        self._clients[sock.fileno()] = client
+        self._selector.register(sock, selectors.EVENT_READ, client)
+
+    def _read(self, client):
+        try:
+            data = client.sock.recv(65536)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError:
+            data = b''
+        if not data:
+            self._close(client)
+            return
+        client.inbox += data
+        try:
+            requests = decode_messages(client.inbox)
+        except ValueError as e:
+            self._send(client, {"ok": False, "error": str(e)})
+            self._close(client)
+            return
+        for request in requests:
+            if self._call_soon is None:
+                self._send(client, self._handle(client, request))
+            else:
+                self._call_soon(self._handle_elsewhere, client, request)
+
+    def _handle_elsewhere(self, client, request):
+        """Run a handler through call_soon, the reply is sent by the server thread"""
+        if isinstance(request, dict) and request.get("cmd") == "subscribe":
+            reply = None  # Subscribed on the server thread, it owns the client state
+        else:
+            reply = self.dispatch(request)
+        with self._events_lock:
+            self._replies.append((client, request, reply))
+        self._wake()
+
+    def _deliver_replies(self):
+        with self._events_lock:
+            replies, self._replies = self._replies, []
+        for client, request, reply in replies:
+            if client.sock.fileno() == -1:
+                continue  # Closed while the handler ran
+            self._send(client, reply if reply is not None else self._handle(client, request))
+
+    def _handle(self, client, request):
+        if isinstance(request, dict) and request.get("cmd") == "subscribe":
+            metrics.increment('control_requests')
+            if not client.subscribed:
+                client.subscribed = True
+                self._subscribers += 1
+                if self.bus and self._bus_subscription is None:
+                    self._bus_subscription = self.bus.subscribe(self._forward)
+            return {"ok": True}
+        return self.dispatch(request)
+
+    def dispatch(self, request):
+        """
+        Run the handler of a request (any command but "subscribe")
+
+        Returns:
+            dict: Reply
+        """
+        command = request.get("cmd") if isinstance(request, dict) else None
+        metrics.increment('control_requests')
+        if command == "ping":
+            return {"ok": True}
+        handler = self._handlers.get(command)
+        if handler is None:
+            return {"ok": False, "error": f"unknown command: {command}"}
+        start = time.perf_counter()
+        try:
+            reply = {"ok": True}
+            reply.update(handler(request) or {})
+        except Exception as e:
+            reply = {"ok": False, "error": str(e)}
+        metrics.record_sample(f'control_{command}_ms', (time.perf_counter() - start) * 1000.0)
+        return reply
+
+    def _forward(self, event):
+        self.publish(event.to_dict())
+
+    def _deliver_events(self):
+        with self._events_lock:
+            events, self._events = self._events, []
+        if not events:
+            return
+        data = b"".join(events)
+        for client in list(self._clients.values()):
+            if not client.subscribed:
+                continue
+            if len(client.outbox) > MAX_SUBSCRIBER_BACKLOG:
+                metrics.increment('control_subscribers_dropped')
+                self._close(client)
+                continue
+            client.outbox += data
+            self._flush(client)
+
+    def _send(self, client, message):
+        client.outbox += encode_message(message)
+        self._flush(client)
+
+    def _flush(self, client):
+        if client.sock.fileno() == -1:
+            return
+        try:
+            sent = client.sock.send(client.outbox)
+            del client.outbox[:sent]
+        except (BlockingIOError, InterruptedError):
+            pass
+        except OSError:
+            self._close(client)
+            return
+        events = selectors.EVENT_READ | (selectors.EVENT_WRITE if client.outbox else 0)
+        self._selector.modify(client.sock, events, client)
+
+    def _close(self, client):
+        if self._clients.pop(client.sock.fileno(), None) is None:
+            return
+        if client.subscribed:
+            self._subscribers -= 1
+            if not self._subscribers and self._bus_subscription:
+                self._bus_subscription.unsubscribe()
+                self._bus_subscription = None
+        try:
+            self._selector.unregister(client.sock)
+        except (KeyError, ValueError):
+            pass
+        client.sock.close()
+
+class ControlClient:
+    """Blocking client of the control socket"""
+
+    def __init__(self, path=None, timeout=2.0):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(timeout)
+        self.sock.connect(path or get_socket_path())
+        self._inbox = bytearray()
+        self._received = []
+
+    def close(self):
+        self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def request(self, command, **fields):
+        """
+        Send a request and wait for its reply
+
+        Returns:
+            dict: Reply ({"ok": ...})
+        """
+        fields["cmd"] = command
+        self.sock.sendall(encode_message(fields))
+        return self.receive()
+
+    def receive(self):
+        """Wait for the next message (reply or event)"""
+        while not self._received:
+            data = self.sock.recv(65536)
+            if not data:
+                raise ConnectionError("daemon closed the connection")
+            self._inbox += data
+            self._received.extend(decode_messages(self._inbox))
+        return self._received.pop(0)
+
+def send_request(command, path=None, timeout=2.0, **fields):
+    """
+    Send one request to the daemon
+
+    Returns:
+        dict: Reply, or None if the daemon is not running
+    """
+    try:
+        with ControlClient(path, timeout) as client:
+            return client.request(command, **fields)
+    except (OSError, ConnectionError):
+        return None
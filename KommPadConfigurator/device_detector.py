@@ -1,11 +1,14 @@
 import serial
 import serial.tools.list_ports
 import time
-import json
 import os
+import layer_manager
+from config_store import get_config_store
 
-# Configuration file for storing device settings including last connected port
-CONFIG_FILE = "config.json"
+# Firmware log levels (see the 'logLevel' command in KommPadV3.ino)
+LOG_LEVEL_QUIET = 0  # Only replies to commands (KommPong, layer changes, ...)
+LOG_LEVEL_INFO = 1   # Acknowledgements and warnings
+LOG_LEVEL_DEBUG = 2  # Echo every parsed token (firmware default)
 
 def find_kommpad(baudrate=9600, timeout=2, debug=True):
     """
@@ -174,30 +177,19 @@ def save_last_port(port_device):
     Args:
         port_device (str): Port device name (e.g., 'COM9')
     """
-    try:
-        config_path = os.path.join(os.path.dirname(__file__), CONFIG_FILE)
-
-        # Load existing config or create new one
-        config = {}
-        if os.path.exists(config_path):
-            with open(config_path, 'r') as f:
-                config = json.load(f)
-
+    def set_port(config):
         # Ensure device section exists
-        if 'device' not in config:
-            config['device'] = {}
+        device_config = config.setdefault('device', {})
 
         # Check if the port is different from the saved one
-        if config['device'].get('COM') == port_device:
-            return  # No need to save if the port is the same
+        if device_config.get('COM') == port_device:
+            return False  # No need to save if the port is the same
 
         # Update only the COM port
-        config['device']['COM'] = port_device
-
-        # Save back to file
-        with open(config_path, 'w') as f:
-            json.dump(config, f, indent=2)
+        device_config['COM'] = port_device
 
+    try:
+        get_config_store().update(set_port)
     except Exception as e:
         print(f"Warning: Could not save last port: {e}")
 
@@ -208,23 +200,8 @@ def load_last_port():
     Returns:
         str: Last connected port device name or None if not found
     """
-    try:
-        config_path = os.path.join(os.path.dirname(__file__), CONFIG_FILE)
-        if not os.path.exists(config_path):
-            return None
-            
-        with open(config_path, 'r') as f:
-            config = json.load(f)
-        
-        # Get the COM port from device section
-        device_config = config.get('device', {})
-        last_port = device_config.get('COM')
-        
-        return last_port
-        
-    except Exception as e:
-        print(f"Warning: Could not load last port: {e}")
-        return None
+    # Get the COM port from device section
+    return get_config_store().get_section('device').get('COM')
 
 def try_connect_to_port(port_device, baudrate=9600, timeout=2, debug=True):
     """
@@ -297,23 +274,19 @@ def clear_last_port():
     """
     Clear the saved last port information from config.json (useful for troubleshooting)
     """
+    def remove_port(config):
+        # Remove COM from device section
+        if 'COM' not in config.get('device', {}):
+            return False
+        config['device'].pop('COM')
+
     try:
-        config_path = os.path.join(os.path.dirname(__file__), CONFIG_FILE)
-        if os.path.exists(config_path):
-            with open(config_path, 'r') as f:
-                config = json.load(f)
-            
-            # Remove COM from device section
-            if 'device' in config:
-                config['device'].pop('COM', None)
-            
-            # Save back to file
-            with open(config_path, 'w') as f:
-                json.dump(config, f, indent=2)
-            
-            print("Last port information cleared from config.json.")
-        else:
+        store = get_config_store()
+        if not os.path.exists(store.path):
             print("No config.json file found.")
+            return
+        store.update(remove_port)
+        print("Last port information cleared from config.json.")
     except Exception as e:
         print(f"Error clearing last port: {e}")
 
@@ -324,70 +297,171 @@ def get_last_port_info():
     Returns:
         dict: Last port information or None if not available
     """
-    try:
-        config_path = os.path.join(os.path.dirname(__file__), CONFIG_FILE)
-        if not os.path.exists(config_path):
-            return None
-            
-        with open(config_path, 'r') as f:
-            config = json.load(f)
-        
-        device_config = config.get('device', {})
-        last_port = device_config.get('COM')
-        
-        if not last_port:
-            return None
-            
-        return {
-            'port': last_port,
-            'connected_at': 'Unknown',
-            'age_hours': 0
-        }
-    except Exception as e:
-        print(f"Error getting last port info: {e}")
+    last_port = load_last_port()
+    if not last_port:
         return None
+        
+    return {
+        'port': last_port,
+        'connected_at': 'Unknown',
+        'age_hours': 0
+    }
+
+def get_firmware_log_level(config):
+    """
+    Get the firmware log level for a configuration.
+    Debug output is only enabled when "FirmwareDebug" is set in the settings,
+    in production mode the firmware is kept quiet.
+
+    Args:
+        config (ConfigModel): Compiled configuration
+
+    Returns:
+        int: One of LOG_LEVEL_QUIET, LOG_LEVEL_INFO or LOG_LEVEL_DEBUG
+    """
+    if config is not None and config.settings.firmware_debug:
+        return LOG_LEVEL_DEBUG
+    return LOG_LEVEL_QUIET
+
+def send_log_level(ser, level):
+    """
+    Set the log level of the firmware
+
+    Args:
+        ser (serial.Serial): The serial connection to the macropad.
+        level (int): One of LOG_LEVEL_QUIET, LOG_LEVEL_INFO or LOG_LEVEL_DEBUG
+    """
+    ser.write((get_log_level_command(level) + '\n').encode('utf-8'))
+
+def get_log_level_command(level):
+    """Get the command that sets the log level of the firmware"""
+    return f"logLevel {level}"
+
+# Event format flags (see the 'eventFormat' command in KommPadV3.ino)
+EVENT_FORMAT_TIMESTAMPS = 1  # Append the device time and a sequence number
+EVENT_FORMAT_KEY_STATES = 2  # Report key-down and key-up instead of single presses
+EVENT_FORMAT_DIALS = 4       # Report the raw positions of the dials
+
+def send_event_format(ser, timestamps, key_states=True, dials=False):
+    """
+    Select the event format of the firmware
+
+    Args:
+        ser (serial.Serial): The serial connection to the macropad.
+        timestamps (bool): Append the device time and a sequence number to each event
+        key_states (bool): Report key-down and key-up events (default: True)
+        dials (bool): Report the dial positions (default: False, the inputs float without dials)
+    """
+    ser.write((get_event_format_command(timestamps, key_states, dials) + '\n').encode('utf-8'))
+
+def get_event_format_command(timestamps, key_states=True, dials=False):
+    """Get the command that selects the event format of the firmware (see send_event_format())"""
+    flags = 0
+    if timestamps:
+        flags |= EVENT_FORMAT_TIMESTAMPS
+    if key_states:
+        flags |= EVENT_FORMAT_KEY_STATES
+    if dials:
+        flags |= EVENT_FORMAT_DIALS
+    return f"eventFormat {flags}"
+
+def get_display_names_string(config):
+    """
+    Get the DisplayNames command with the display name of each button for all layers
+
+    Args:
+        config (ConfigModel): Compiled configuration
+
+    Returns:
+        str: "DisplayNames: ..." command for the firmware
+    """
+    command = config.payloads.get('display_names')
+    if command is None:
+        command = config.payloads['display_names'] = \
+            f"DisplayNames: {'|'.join('~'.join(names) for names in config.display_names)}"
+    return command
+
+def get_settings_string(config):
+    """
+    Get the Settings command with the layer names and LED settings
+
+    Args:
+        config (ConfigModel): Compiled configuration
+
+    Returns:
+        str: "Settings: ..." command for the firmware
+    """
+    settings = config.settings
+    layer_names_str = "~".join(settings.layer_names)
+    colors_str = "~".join(settings.colors)
+    return (f"Settings: {settings.max_layers},{layer_names_str},{settings.brightness},"
+            f"{settings.color_mode},{colors_str},{settings.idle_timeout}")
+
+def send_display_names(ser, config):
+    """
+    Send only the display names to the macropad, e.g. after a mapping was renamed
+
+    Args:
+        ser (serial.Serial): The serial connection to the macropad.
+        config (ConfigModel): Compiled configuration
+    """
+    display_names_string = get_display_names_string(config)
+    ser.write((display_names_string + '\n').encode('utf-8'))
+    print(f"Display names sent to the macropad: {display_names_string}")
 
-def send_settings_to_macropad(ser, app_state):
+def get_settings_payload(config):
+    """
+    Get the upload sent to the macropad after connecting, without the layer command
+
+    Args:
+        config (ConfigModel): Compiled configuration
+
+    Returns:
+        bytes: Log level, event format, display names and settings commands, one per line
+    """
+    payload = config.payloads.get('settings')
+    if payload is not None:
+        return payload
+    settings = config.settings
+    commands = (
+        # Set the log level first so the upload itself is not echoed back
+        get_log_level_command(get_firmware_log_level(config)),
+        get_event_format_command(settings.event_timestamps, settings.key_release_events, settings.dial_inputs),
+        get_display_names_string(config),
+        get_settings_string(config)
+    )
+    payload = config.payloads['settings'] = "".join(command + '\n' for command in commands).encode('utf-8')
+    return payload
+
+def prepare_layer_upload(config):
+    """
+    Reset the layer state for a settings upload
+
+    The firmware resets to layer 0 when it loads settings, the returned
+    command restores the host layer.
+
+    Returns:
+        bytes: setLayer command line
+    """
+    layer_manager.set_max_layers(config.settings.max_layers)
+    layer_manager.reset_in_flight()
+    return (layer_manager.get_set_layer_command() + '\n').encode('utf-8')
+
+def send_settings_to_macropad(ser, config):
     """
     Send settings to the macropad as a lightweight string.
 
     Args:
         ser (serial.Serial): The serial connection to the macropad.
-        app_state (dict): The application state containing configuration data.
+        config (ConfigModel): Compiled configuration
     """
     try:
-        if 'settings' in app_state and 'mappings' in app_state:
-            settings = app_state['settings']
-            # Prepare settings string with layer names
-            max_layers = settings.get('MaxLayers', 2)
-            layer_names_str = "~".join([settings.get('Layers', {}).get(f"layer{i}", {}).get("name", "") for i in range(4)])
-            brightness = settings.get('Brightness', 255)
-            color_mode = settings.get('ColorMode', 'solid')
-            colors = settings.get('Colors', [])
-            colors_str = "~".join(colors) if colors else ""
-            idle_timeout = settings.get('idleTimeout', 0)
-            # create string of display names of each button for all layers
-            mappings = app_state['mappings']
-            display_names = []
-            display_names_strs = []
-            for layer in range(4):
-                layer_display_names = []
-                layer_key = f"layer{layer}"
-                for button in range(1, 7):
-                    button_key = f"button{button}"
-                    display_name = mappings.get(button_key, {}).get(layer_key, {}).get("display", "")
-                    layer_display_names.append(display_name)
-                layer_display_names_str = "~".join(layer_display_names)
-                display_names_strs.append(layer_display_names_str)
-            display_names_str = "|".join(display_names_strs)
-
-            settings_string = f"Settings: {max_layers},{layer_names_str},{brightness},{color_mode},{colors_str},{idle_timeout}"
-            display_names_string = f"DisplayNames: {display_names_str}"
-            ser.write((display_names_string + '\n').encode('utf-8'))
-            ser.write((settings_string + '\n').encode('utf-8'))
-            print(f"Settings sent to the macropad: {settings_string}, {display_names_string}")
+        if config is not None and 'settings' in config.raw:
+            # One write for the whole upload
+            ser.write(get_settings_payload(config) + prepare_layer_upload(config))
+            print(f"Settings sent to the macropad: {get_settings_string(config)}, {get_display_names_string(config)}")
         else:
-            print("Error: 'settings' key is missing in app_state.")
+            print("Error: 'settings' key is missing in the configuration.")
     except Exception as e:
         print(f"Error sending settings to the macropad: {e}")
 
@@ -396,19 +470,9 @@ def load_app_state():
     Load the application state from the config.json file.
 
     Returns:
-        dict: The application state loaded from the config file.
+        dict: The application state (shared snapshot of the config store, don't modify it).
     """
-    try:
-        config_path = os.path.join(os.path.dirname(__file__), CONFIG_FILE)
-        if os.path.exists(config_path):
-            with open(config_path, 'r') as f:
-                return json.load(f)
-        else:
-            print("Config file not found. Returning empty state.")
-            return {}
-    except Exception as e:
-        print(f"Error loading app state: {e}")
-        return {}
+    return get_config_store().get()
 
 # Test function
 def test_device_detector():
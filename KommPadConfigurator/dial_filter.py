@@ -0,0 +1,104 @@
+"""
+Dial Filter Module for KommPad Configurator
+Turns noisy raw dial positions into a few quantized volume levels
+
+Each raw sample goes through:
+    1. an exponential moving average (smoothing), skipped for large jumps
+    2. a deadband around the last reported position (hysteresis)
+    3. quantization to the configured min..max range through a lookup table
+
+Only samples that change the quantized level are reported, so the mixer
+sees a small fraction of the samples the device sends.
+"""
+
+from functools import lru_cache
+
+# Largest raw dial value (10-bit ADC)
+RAW_MAX = 1023
+
+# Defaults, overridden by configure()
+DEFAULT_SMOOTHING = 0.3   # EMA weight of a new sample (1.0 disables smoothing)
+DEFAULT_DEADBAND = 4      # Raw units the smoothed position must move before a new level
+SNAP_DISTANCE = 64        # Jumps larger than this skip the smoothing, so fast turns don't lag
+
+@lru_cache(maxsize=32)
+def get_level_table(low, high, raw_max=RAW_MAX):
+    """
+    Get the lookup table from raw position to level
+
+    Args:
+        low (int): Level at raw position 0
+        high (int): Level at raw position raw_max
+
+    Returns:
+        tuple: Level for every raw position 0..raw_max
+    """
+    span = high - low
+    return tuple(int(round(low + raw * span / raw_max)) for raw in range(raw_max + 1))
+
+class _DialState:
+    """Filter state of one dial"""
+
+    __slots__ = ('average', 'anchor', 'level', 'table')
+
+    def __init__(self, raw):
+        self.average = float(raw)
+        self.anchor = float(raw)  # Smoothed position of the last reported level
+        self.level = None
+        self.table = None         # Level table of the last reported level
+
+class DialFilter:
+    """Smoothing, deadband and quantization for any number of dials"""
+
+    def __init__(self, smoothing=DEFAULT_SMOOTHING, deadband=DEFAULT_DEADBAND):
+        self.smoothing = smoothing
+        self.deadband = deadband
+        self._dials = {}
+
+    def configure(self, smoothing=None, deadband=None):
+        """Change the smoothing weight and the deadband"""
+        if smoothing is not None:
+            self.smoothing = min(max(float(smoothing), 0.01), 1.0)
+        if deadband is not None:
+            self.deadband = max(0, int(deadband))
+
+    def reset(self):
+        """Forget all dial positions, e.g. when the device reconnects"""
+        self._dials.clear()
+
+    def update(self, dial, raw, low=0, high=100):
+        """
+        Filter a raw dial sample
+
+        Args:
+            dial (str): Dial identifier (e.g., "dial1")
+            raw (int): Raw position from 0 to RAW_MAX
+            low (int): Level at the lowest position
+            high (int): Level at the highest position
+
+        Returns:
+            int: New level, or None if the level did not change
+        """
+        table = get_level_table(low, high)
+        state = self._dials.get(dial)
+        if state is None:
+            state = self._dials[dial] = _DialState(raw)
+        elif abs(raw - state.average) > SNAP_DISTANCE:
+            state.average = float(raw)
+        else:
+            state.average += self.smoothing * (raw - state.average)
+
+        if state.table is not table:
+            # A new range (e.g., after a layer change) always reports the level
+            state.table = table
+            state.level = None
+        elif abs(state.average - state.anchor) < self.deadband:
+            return None
+
+        position = int(state.average + 0.5)
+        level = table[min(max(position, 0), RAW_MAX)]
+        if level == state.level:
+            return None
+        state.anchor = state.average
+        state.level = level
+        return level
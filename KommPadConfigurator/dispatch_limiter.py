@@ -0,0 +1,144 @@
+"""
+Dispatch Limiter Module for KommPad Configurator
+Drops bounced and too frequent presses before they reach the action engines
+
+Every press is checked against:
+    - a debounce window per control: presses closer together than the
+      window are dropped (mapping field "debounce" in ms, or the default
+      of the action type)
+    - a token bucket per action type: at most "rate" actions per second,
+      with bursts of up to "burst" actions
+
+Defaults per action type are in ACTION_LIMITS and can be changed with
+settings.ActionLimits, e.g. {"Open_Web": {"debounce": 800, "rate": 0.5, "burst": 1}}.
+The action type is the function name for function actions ("Open_App")
+and the action otherwise ("key", "macro", "media").
+"""
+
+import threading
+import time
+import metrics
+
+# Default limits per action type: debounce (ms), rate (actions/s) and burst
+ACTION_LIMITS = {
+    "Open_App": {"debounce": 500, "rate": 1.0, "burst": 3},
+    "Open_Web": {"debounce": 500, "rate": 1.0, "burst": 3},
+    "Text": {"debounce": 200},
+}
+
+class TokenBucket:
+    """Allow rate events per second on average, with bursts of up to burst events"""
+
+    __slots__ = ('rate', 'burst', 'tokens', 'last_ms')
+
+    def __init__(self, rate, burst):
+        self.rate = rate / 1000.0   # Tokens per ms
+        self.burst = burst
+        self.tokens = float(burst)
+        self.last_ms = None
+
+    def take(self, now_ms):
+        """
+        Take a token
+
+        Returns:
+            bool: True if a token was available
+        """
+        if self.last_ms is not None and now_ms > self.last_ms:
+            self.tokens = min(self.burst, self.tokens + (now_ms - self.last_ms) * self.rate)
+        self.last_ms = now_ms  # Also follows a clock that restarted (device reset)
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return True
+        return False
+
+class DispatchLimiter:
+    """
+    First stage of event processing.
+
+    Suppressed presses and their releases are not forwarded. Every check is
+    a few dictionary lookups, independent of the number of controls.
+    """
+
+    def __init__(self, next_stage, limits=None):
+        self._next = next_stage
+        self._lock = threading.Lock()
+        self._limits = dict(ACTION_LIMITS)
+        self._last_press = {}    # control -> time of the last accepted press (ms)
+        self._buckets = {}       # action type -> TokenBucket
+        self._suppressed = set() # Controls whose next release belongs to a dropped press
+        if limits:
+            self.configure(limits)
+
+    def configure(self, limits):
+        """Change the limits of action types (settings.ActionLimits)"""
+        with self._lock:
+            self._limits = dict(ACTION_LIMITS)
+            for action_type, action_limits in (limits or {}).items():
+                self._limits[action_type] = dict(self._limits.get(action_type, {}), **action_limits)
+            self._buckets.clear()
+
+    def on_event(self, config, control, layer_key, state, event_ms=None):
+        """
+        Process an input event
+
+        Args:
+            config (ConfigModel): Compiled configuration
+            control (str): Control identifier (e.g., "button1", "encoder2")
+            layer_key (str): Layer identifier (e.g., "layer0")
+            state (str): "down", "up", or None for a single press event
+            event_ms (float): Event time in ms, preferably the device time (default: now)
+        """
+        if state == "up":
+            with self._lock:
+                if control in self._suppressed:
+                    self._suppressed.discard(control)
+                    return
+        elif not self._allow(config, control, layer_key, state, event_ms):
+            return
+        self._next.on_event(config, control, layer_key, state, event_ms)
+
+    def release_all(self):
+        """Forget dropped presses and release held controls"""
+        with self._lock:
+            self._suppressed.clear()
+            self._last_press.clear()
+        self._next.release_all()
+
+    def _allow(self, config, control, layer_key, state, event_ms):
+        action = config.get_action(control, layer_key) if config else None
+        if action is None:
+            return True
+        if event_ms is None:
+            event_ms = time.monotonic() * 1000.0
+
+        with self._lock:
+            action_type = action.action_type
+            limits = self._limits.get(action_type)
+            debounce = action.debounce
+            if debounce is None:
+                debounce = limits.get("debounce", 0) if limits else 0
+            if action.taps:
+                debounce = 0  # The taps themselves would be dropped
+
+            last = self._last_press.get(control)
+            if debounce and last is not None and 0 <= event_ms - last < debounce:
+                reason = 'debounce'
+            elif limits and "rate" in limits and not self._get_bucket(action_type, limits).take(event_ms):
+                reason = 'rate_limit'
+            else:
+                self._last_press[control] = event_ms
+                return True
+
+            if state == "down":
+                self._suppressed.add(control)
+        metrics.increment(f'dispatch_suppressed_{reason}')
+        metrics.increment(f'dispatch_suppressed_{control}')
+        return False
+
+    def _get_bucket(self, action_type, limits):
+        bucket = self._buckets.get(action_type)
+        if bucket is None:
+            rate = limits["rate"]
+            bucket = self._buckets[action_type] = TokenBucket(rate, limits.get("burst", max(1, rate)))
+        return bucket
@@ -0,0 +1,91 @@
+"""
+Encoder Accelerator Module for KommPad Configurator
+Repeats encoder rotation actions more often the faster the encoder turns
+
+Optional field of an encoder rotation mapping (encoder1 and encoder3):
+    "acceleration": true                           use the default curve
+    "acceleration": {"slow": 150, "fast": 20,      detent interval (ms) without acceleration
+                     "max": 8, "curve": 1.5}       and at full acceleration, the largest
+                                                   multiplier and the shape of the curve
+
+The multiplier grows from 1 at "slow" to "max" at "fast". A curve above 1
+keeps careful turns precise and only accelerates quick spins. config_model
+compiles the field into an Acceleration with the defaults filled in. The result
+is applied as one batched action (a key repeated while its modifiers stay
+down, or a larger volume step), not as separate presses.
+"""
+
+import time
+from button_handler import execute_action
+
+# Encoder controls that report rotation detents
+ROTATION_CONTROLS = ("encoder1", "encoder3")
+
+def get_multiplier(acceleration, interval_ms):
+    """
+    Get the multiplier of a detent
+
+    Args:
+        acceleration (Acceleration): Compiled "acceleration" field of the mapping (None for none)
+        interval_ms (float): Time since the previous detent in the same direction (None for the first)
+
+    Returns:
+        int: Number of times to run the action
+    """
+    if acceleration is None or interval_ms is None:
+        return 1
+    slow, fast = acceleration.slow, acceleration.fast
+    if interval_ms >= slow or slow <= fast:
+        return 1
+    speed = (slow - max(interval_ms, fast)) / (slow - fast)
+    return max(1, int(round(1 + (acceleration.max - 1) * speed ** acceleration.curve)))
+
+class EncoderAccelerator:
+    """
+    First stage of event processing, in front of the TapChordEngine.
+
+    Rotation events of mappings with an "acceleration" field are executed
+    here with a multiplier; everything else goes to the next stage.
+    """
+
+    def __init__(self, next_stage):
+        self._next = next_stage
+        self._last = {}  # control -> (event time in ms, previous interval)
+
+    def on_event(self, config, control, layer_key, state, event_ms=None):
+        """
+        Process an input event
+
+        Args:
+            config (ConfigModel): Compiled configuration
+            control (str): Control identifier (e.g., "button1", "encoder2")
+            layer_key (str): Layer identifier (e.g., "layer0")
+            state (str): "down", "up", or None for a single press event
+            event_ms (float): Event time in ms, preferably the device time (default: now)
+        """
+        if control not in ROTATION_CONTROLS or state is not None:
+            self._next.on_event(config, control, layer_key, state)
+            return
+
+        action = config.get_action(control, layer_key) if config else None
+        if action is None or action.acceleration is None:
+            self._next.on_event(config, control, layer_key, state)
+            return
+
+        if event_ms is None:
+            event_ms = time.monotonic() * 1000.0
+        interval = average = None
+        last = self._last.get(control)
+        if last is not None and event_ms >= last[0]:
+            interval = average = event_ms - last[0]
+            if last[1] is not None:
+                # Average two intervals so one uneven detent doesn't jump the multiplier
+                average = (interval + last[1]) / 2
+        self._last[control] = (event_ms, interval)
+
+        execute_action(action, get_multiplier(action.acceleration, average))
+
+    def release_all(self):
+        """Forget the rotation timing and release held controls"""
+        self._last.clear()
+        self._next.release_all()
@@ -0,0 +1,205 @@
+"""
+Event Bus Module for KommPad Configurator
+In-process publish/subscribe of daemon events
+
+Producers publish typed events (the constants below) and don't know who
+listens: the tray, the metrics, the event recorder and the control socket
+subscribe to the events they need. Subscribers are either callbacks, run
+in the thread of the publisher, or bounded queues read by a thread of the
+subscriber (the oldest event is dropped when a queue is full).
+
+Publishing an event type nobody subscribed to returns before the event is
+built, hot paths can also check has_subscribers() before collecting the
+fields.
+"""
+
+import threading
+import time
+from collections import deque
+import metrics
+
+# Event types and their fields
+DEVICE_CONNECTED = "device-connected"        # port
+DEVICE_DISCONNECTED = "device-disconnected"  # port, reason
+INPUT_EVENT = "input-event"                  # control, state, value, layer
+ACTION_DONE = "action-done"                  # action, value, duration_ms
+CONFIG_CHANGED = "config-changed"            # changes
+LAYER_CHANGED = "layer-changed"              # layer
+
+EVENT_TYPES = (DEVICE_CONNECTED, DEVICE_DISCONNECTED, INPUT_EVENT, ACTION_DONE, CONFIG_CHANGED, LAYER_CHANGED)
+
+# Default capacity of queue subscribers and the event recorder
+DEFAULT_QUEUE_SIZE = 256
+
+class Event:
+    """A published event"""
+
+    __slots__ = ('type', 'time', 'fields')
+
+    def __init__(self, event_type, fields):
+        self.type = event_type
+        self.time = time.time()  # Seconds since the epoch
+        self.fields = fields
+
+    def __getattr__(self, name):
+        try:
+            return self.fields[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def to_dict(self):
+        """Get the event as a JSON-compatible dictionary"""
+        data = {'event': self.type, 'time': self.time}
+        data.update(self.fields)
+        return data
+
+    def __repr__(self):
+        return f"Event({self.type!r}, {self.fields!r})"
+
+class Subscription:
+    """Handle of a subscriber, call unsubscribe() to stop receiving events"""
+
+    __slots__ = ('bus', 'callback', 'types')
+
+    def __init__(self, bus, callback, types):
+        self.bus = bus
+        self.callback = callback
+        self.types = types
+
+    def unsubscribe(self):
+        self.bus._remove(self)
+
+class EventQueue:
+    """Bounded queue of events for a subscriber with its own thread"""
+
+    def __init__(self, maxsize=DEFAULT_QUEUE_SIZE):
+        self._events = deque(maxlen=maxsize)
+        self._condition = threading.Condition()
+        self.dropped = 0
+        self.subscription = None
+
+    def put(self, event):
+        with self._condition:
+            if len(self._events) == self._events.maxlen:
+                self.dropped += 1
+                metrics.increment('event_queue_dropped')
+            self._events.append(event)
+            self._condition.notify()
+
+    def get(self, timeout=None):
+        """
+        Wait for the next event
+
+        Returns:
+            Event: Next event, None after the timeout
+        """
+        with self._condition:
+            if not self._events and not self._condition.wait_for(lambda: self._events, timeout):
+                return None
+            return self._events.popleft()
+
+    def unsubscribe(self):
+        if self.subscription:
+            self.subscription.unsubscribe()
+            self.subscription = None
+
+class EventBus:
+    """Deliver published events to the subscribers of their type"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # Subscribers by event type (None: all types), tuples are replaced on change
+        # so publish() reads them without the lock
+        self._subscribers = {}
+        self._all = ()
+
+    def subscribe(self, callback, types=None):
+        """
+        Call a function with every event of the given types
+
+        Args:
+            callback (callable): Called with the Event in the publishing thread, keep it short
+            types (iterable): Event types, None for all
+
+        Returns:
+            Subscription: Handle to unsubscribe
+        """
+        subscription = Subscription(self, callback, tuple(types) if types is not None else None)
+        with self._lock:
+            if subscription.types is None:
+                self._all = self._all + (subscription,)
+            else:
+                for event_type in subscription.types:
+                    self._subscribers[event_type] = self._subscribers.get(event_type, ()) + (subscription,)
+        return subscription
+
+    def subscribe_queue(self, types=None, maxsize=DEFAULT_QUEUE_SIZE):
+        """
+        Collect the events of the given types in a bounded queue
+
+        Returns:
+            EventQueue: Queue to read the events from
+        """
+        queue = EventQueue(maxsize)
+        queue.subscription = self.subscribe(queue.put, types)
+        return queue
+
+    def _remove(self, subscription):
+        with self._lock:
+            if subscription.types is None:
+                self._all = tuple(s for s in self._all if s is not subscription)
+                return
+            for event_type in subscription.types:
+                remaining = tuple(s for s in self._subscribers.get(event_type, ()) if s is not subscription)
+                if remaining:
+                    self._subscribers[event_type] = remaining
+                else:
+                    self._subscribers.pop(event_type, None)
+
+    def has_subscribers(self, event_type):
+        """Check if publishing an event type would reach anyone"""
+        return bool(self._all) or event_type in self._subscribers
+
+    def publish(self, event_type, **fields):
+        """
+        Deliver an event to its subscribers
+
+        Returns:
+            bool: True if anyone subscribed to the event
+        """
+        subscribers = self._subscribers.get(event_type, ())
+        if not subscribers and not self._all:
+            return False
+        event = Event(event_type, fields)
+        for subscription in subscribers + self._all:
+            try:
+                subscription.callback(event)
+            except Exception as e:
+                print(f"Error in {event_type} subscriber: {e}")
+        return True
+
+class EventRecorder:
+    """Keep the most recent events (shown by 'kommpadctl history')"""
+
+    def __init__(self, bus, types=None, size=DEFAULT_QUEUE_SIZE):
+        self._events = deque(maxlen=size)
+        self.subscription = bus.subscribe(self._events.append, types)
+
+    def get_events(self):
+        """Get the recorded events, oldest first"""
+        return list(self._events)
+
+    def close(self):
+        self.subscription.unsubscribe()
+
+# Shared bus of the daemon, created on first use
+_bus = None
+_bus_lock = threading.Lock()
+
+def get_event_bus():
+    """Get the event bus shared by the daemon modules"""
+    global _bus
+    with _bus_lock:
+        if _bus is None:
+            _bus = EventBus()
+        return _bus
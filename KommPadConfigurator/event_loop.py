@@ -0,0 +1,207 @@
+"""
+Event Loop Module for KommPad Configurator
+One thread that waits on every event source of the daemon
+
+The loop sleeps in select() until a file descriptor is readable (serial
+port, inotify, hotplug netlink socket) or the earliest timer is due. Timers
+only exist for real deadlines (hold, repeat, debounce, settle delays), so
+an idle daemon does not wake up at all.
+
+EventLoop offers the interface of scheduler.Scheduler (call_at,
+call_later, pending, stop); main.py installs it as the shared scheduler so
+hold, tap and macro timers run on the same thread as the serial reader.
+
+Every return from select() is counted (loop_wakeups), wakeups_per_minute()
+reports the recent rate.
+"""
+
+import heapq
+import itertools
+import selectors
+import socket
+import threading
+import time
+from collections import deque
+import metrics
+from scheduler import TimerHandle
+
+# Number of recent wakeup times kept for wakeups_per_minute()
+WAKEUP_WINDOW = 4096
+
+class EventLoop:
+    """Wait on file descriptors and timers on a single thread"""
+
+    def __init__(self, name="KommPadLoop"):
+        self.name = name
+        self._selector = selectors.DefaultSelector()
+        self._heap = []
+        self._counter = itertools.count()  # Tie breaker for equal deadlines
+        self._ready = deque()  # Callbacks from call_soon()
+        self._lock = threading.Lock()
+        self._wake_read, self._wake_write = socket.socketpair()
+        self._wake_read.setblocking(False)
+        self._wake_write.setblocking(False)
+        self._selector.register(self._wake_read, selectors.EVENT_READ, None)
+        self._wakeups = deque(maxlen=WAKEUP_WINDOW)
+        self._thread = None
+        self._running = False
+
+    def is_loop_thread(self):
+        """Check if the caller runs on the loop thread"""
+        return self._thread is threading.current_thread()
+
+    def add_reader(self, fd, callback, *args):
+        """
+        Call back whenever a file descriptor is readable (call on the loop thread)
+
+        Args:
+            fd (int): File descriptor (or object with fileno())
+            callback (callable): Called with args, must read the pending data
+        """
+        self._selector.register(fd, selectors.EVENT_READ, (callback, args))
+
+    def remove_reader(self, fd):
+        """Stop watching a file descriptor (call on the loop thread)"""
+        try:
+            self._selector.unregister(fd)
+        except (KeyError, ValueError):
+            pass
+
+    def call_soon(self, callback, *args):
+        """Run a callback on the loop thread (from any thread)"""
+        with self._lock:
+            self._ready.append((callback, args))
+        if not self.is_loop_thread():
+            self._wake()
+
+    def call_at(self, deadline, callback, *args):
+        """
+        Run a callback at a time.monotonic() deadline (from any thread)
+
+        Returns:
+            TimerHandle: Handle that can cancel the callback
+        """
+        handle = TimerHandle(deadline, callback, args)
+        with self._lock:
+            heapq.heappush(self._heap, (deadline, next(self._counter), handle))
+            earliest = self._heap[0][2] is handle
+        # Wake the loop only if it sleeps past the new deadline
+        if earliest and not self.is_loop_thread():
+            self._wake()
+        return handle
+
+    def call_later(self, delay, callback, *args):
+        """
+        Run a callback after a delay in seconds (from any thread)
+
+        Returns:
+            TimerHandle: Handle that can cancel the callback
+        """
+        return self.call_at(time.monotonic() + delay, callback, *args)
+
+    def run_in_thread(self, func, *args, done=None):
+        """
+        Run a blocking function (e.g., probing serial ports) in a worker thread
+
+        Args:
+            func (callable): Called with args in the worker thread
+            done (callable): Called with the result on the loop thread (None if func raised)
+        """
+        def work():
+            try:
+                result = func(*args)
+            except Exception as e:
+                print(f"Error in {getattr(func, '__name__', 'worker')}: {e}")
+                result = None
+            if done:
+                self.call_soon(done, result)
+
+        threading.Thread(target=work, name=f"{self.name}Worker", daemon=True).start()
+
+    def run_function(self, func, *args):
+        """Runner for button_handler.set_function_runner(): run a blocking action (launcher) in a worker thread"""
+        self.run_in_thread(func, *args)
+
+    def pending(self):
+        """Get the number of scheduled callbacks that were not cancelled"""
+        with self._lock:
+            return sum(1 for _, _, handle in self._heap if not handle.cancelled)
+
+    def wakeups_per_minute(self):
+        """Get the number of wakeups in the last minute"""
+        cutoff = time.monotonic() - 60.0
+        return sum(1 for wakeup in tuple(self._wakeups) if wakeup >= cutoff)
+
+    def start(self):
+        """Run the loop in a background thread"""
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def run(self):
+        """Run the loop in the calling thread until stop() is called"""
+        self._running = True
+        self._thread = threading.current_thread()
+        self._run()
+
+    def stop(self):
+        """Stop the loop and drop all pending callbacks"""
+        self._running = False
+        with self._lock:
+            self._heap.clear()
+        self._wake()
+        if self._thread and not self.is_loop_thread():
+            self._thread.join(timeout=1)
+
+    def _wake(self):
+        try:
+            self._wake_write.send(b'x')
+        except (BlockingIOError, OSError):
+            pass  # Already woken
+
+    def _get_timeout(self):
+        with self._lock:
+            if self._ready:
+                return 0
+            # Drop cancelled timers without waking up for them
+            while self._heap and self._heap[0][2].cancelled:
+                heapq.heappop(self._heap)
+            if not self._heap:
+                return None
+            return max(0.0, self._heap[0][0] - time.monotonic())
+
+    def _run(self):
+        while self._running:
+            events = self._selector.select(self._get_timeout())
+            self._wakeups.append(time.monotonic())
+            metrics.increment('loop_wakeups')
+            for key, _ in events:
+                if key.data is None:
+                    try:
+                        while self._wake_read.recv(4096):
+                            pass
+                    except (BlockingIOError, OSError):
+                        pass
+                    continue
+                callback, args = key.data
+                self._invoke(callback, args)
+            self._run_due()
+
+    def _run_due(self):
+        now = time.monotonic()
+        with self._lock:
+            ready, self._ready = self._ready, deque()
+            while self._heap and self._heap[0][0] <= now:
+                handle = heapq.heappop(self._heap)[2]
+                if not handle.cancelled:
+                    ready.append((handle.callback, handle.args))
+        for callback, args in ready:
+            if not self._running:
+                return
+            self._invoke(callback, args)
+
+    def _invoke(self, callback, args):
+        try:
+            callback(*args)
+        except Exception as e:
+            print(f"Error in event loop callback: {e}")
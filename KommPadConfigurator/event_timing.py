@@ -0,0 +1,105 @@
+"""
+Event Timing Module for KommPad Configurator
+Detects dropped events and splits input latency into device-to-host and host-internal parts
+"""
+
+import time
+from collections import deque
+import metrics
+
+# Sequence numbers sent by the firmware roll over at this value
+SEQUENCE_MODULO = 256
+
+def host_time_ms():
+    """Get the host monotonic clock in milliseconds"""
+    return time.monotonic() * 1000.0
+
+class ClockOffsetEstimator:
+    """
+    Estimate the offset between the device millis() clock and the host clock.
+
+    The offset is the minimum of (host receive time - device time) over a
+    sliding window: the fastest event seen is assumed to have travelled with
+    the minimal link delay. Transit times are then reported relative to that
+    floor, which also absorbs slow drift between the two clocks.
+    """
+
+    def __init__(self, window=256):
+        self.window = window
+        self._count = 0
+        self._minimums = deque()  # (index, value) pairs with increasing values
+
+    def reset(self):
+        """Forget all samples (call after a reconnect or a device reboot)"""
+        self._count = 0
+        self._minimums.clear()
+
+    def update(self, device_ms, host_ms):
+        """
+        Add a sample and return the current offset estimate
+
+        Args:
+            device_ms (int): Device timestamp of the event
+            host_ms (float): Host time at which the event was received
+
+        Returns:
+            float: Estimated host minus device clock offset in milliseconds
+        """
+        value = host_ms - device_ms
+        index = self._count
+        self._count += 1
+
+        # Monotonic deque gives the sliding window minimum in O(1) amortized
+        while self._minimums and self._minimums[-1][1] >= value:
+            self._minimums.pop()
+        self._minimums.append((index, value))
+        while self._minimums[0][0] <= index - self.window:
+            self._minimums.popleft()
+        return self._minimums[0][1]
+
+class EventTracker:
+    """Track sequence numbers and timestamps of the events of one device connection"""
+
+    def __init__(self, window=256):
+        self.clock = ClockOffsetEstimator(window)
+        self.last_seq = None
+        self.last_device_ms = None
+
+    def reset(self):
+        """Start over, e.g. after a reconnect"""
+        self.clock.reset()
+        self.last_seq = None
+        self.last_device_ms = None
+
+    def on_event(self, device_ms, seq, host_ms):
+        """
+        Account for a received event
+
+        Args:
+            device_ms (int): Device timestamp of the event, or None
+            seq (int): Sequence number of the event, or None
+            host_ms (float): Host time at which the event was received
+
+        Returns:
+            float: Device-to-host latency above the fastest observed event, or None
+        """
+        if device_ms is None:
+            return None
+
+        if self.last_device_ms is not None and device_ms < self.last_device_ms:
+            # The device rebooted (or millis() wrapped), older samples are meaningless
+            self.reset()
+        self.last_device_ms = device_ms
+
+        if seq is not None:
+            if self.last_seq is not None:
+                dropped = (seq - self.last_seq - 1) % SEQUENCE_MODULO
+                if dropped:
+                    metrics.increment('events_dropped', dropped)
+                    print(f"Warning: {dropped} event(s) lost before sequence {seq}")
+            self.last_seq = seq
+
+        offset = self.clock.update(device_ms, host_ms)
+        latency = host_ms - device_ms - offset
+        metrics.record_sample('latency_device_to_host_ms', latency)
+        return latency
@@ -0,0 +1,140 @@
+"""
+Hold Engine Module for KommPad Configurator
+Turns key-down/key-up events into hold-through, auto-repeat and long-press actions
+
+Optional fields of a button mapping (next to "action", "value", ...):
+    "hold": true                                   keep the keys pressed while the button is down
+    "repeat": {"delay": 500, "rate": 20}           repeat the action after delay (ms) at rate (Hz)
+    "long_press": {"time": 500, "action": ...,     run another action when held for time (ms),
+                   "value": ..., "modifiers": []}  the normal action then runs on release
+
+The fields are compiled into the Action (hold, repeat, long_press) by config_model.
+"""
+
+import threading
+import time
+from button_handler import execute_action, get_button_config, press_key_action, release_key_action
+from scheduler import get_scheduler
+
+class _HeldControl:
+    """State of a control that is currently pressed"""
+
+    __slots__ = ('action', 'mode', 'timer', 'interval', 'deadline', 'long_fired')
+
+    def __init__(self, action, mode):
+        self.action = action  # Captured on press, the layer may change while held
+        self.mode = mode
+        self.timer = None
+        self.interval = 0.0
+        self.deadline = 0.0
+        self.long_fired = False
+
+class HoldEngine:
+    """
+    Process press and release events of the buttons.
+
+    All timers run on the shared scheduler thread, there is no polling and
+    no thread per button. Buttons without any of the optional fields run
+    their action on press, exactly like single press events.
+    """
+
+    def __init__(self, scheduler=None):
+        self._scheduler = scheduler or get_scheduler()
+        self._lock = threading.Lock()
+        self._held = {}
+
+    def on_event(self, config, control, layer_key, state):
+        """
+        Process an input event
+
+        Args:
+            config (ConfigModel): Compiled configuration
+            control (str): Control identifier (e.g., "button1", "encoder2")
+            layer_key (str): Layer identifier (e.g., "layer0")
+            state (str): "down", "up", or None for a single press event
+        """
+        if state == "up":
+            self._on_up(control)
+            return
+
+        action = get_button_config(config, control, layer_key)
+        if action is None:
+            return
+        if state == "down":
+            self._on_down(control, action)
+        else:
+            execute_action(action)
+
+    def release_all(self):
+        """Release every held control, e.g. when the device disconnects"""
+        with self._lock:
+            controls = list(self._held)
+        for control in controls:
+            self._on_up(control, run_pending=False)
+
+    def _on_down(self, control, action):
+        if control in self._held:
+            # The release was lost, never leave keys stuck
+            self._on_up(control, run_pending=False)
+
+        if action.long_press:
+            mode = "long_press"
+        elif action.repeat:
+            mode = "repeat"
+        elif action.hold:
+            mode = "hold"
+        else:
+            execute_action(action)
+            return
+
+        # Register before arming timers so a callback always finds its state
+        held = _HeldControl(action, mode)
+        with self._lock:
+            self._held[control] = held
+
+        if mode == "long_press":
+            delay = action.long_press.time_ms / 1000.0
+            held.timer = self._scheduler.call_later(delay, self._on_long_press, control, held)
+        elif mode == "repeat":
+            rate = action.repeat.rate_hz
+            held.interval = 1.0 / rate if rate > 0 else 0.0
+            execute_action(action)
+            if held.interval:
+                held.deadline = time.monotonic() + action.repeat.delay_ms / 1000.0
+                held.timer = self._scheduler.call_at(held.deadline, self._on_repeat, control, held)
+        else:
+            press_key_action(action.value, action.modifiers)
+
+    def _on_up(self, control, run_pending=True):
+        with self._lock:
+            held = self._held.pop(control, None)
+        if held is None:
+            return
+        if held.timer:
+            held.timer.cancel()
+
+        action = held.action
+        if held.mode == "hold":
+            release_key_action(action.value, action.modifiers)
+        elif held.mode == "long_press" and not held.long_fired and run_pending:
+            # Released before the long-press time: normal action
+            execute_action(action)
+
+    def _is_current(self, control, held):
+        with self._lock:
+            return self._held.get(control) is held
+
+    def _on_long_press(self, control, held):
+        if not self._is_current(control, held):
+            return
+        held.long_fired = True
+        execute_action(held.action.long_press.action)
+
+    def _on_repeat(self, control, held):
+        if not self._is_current(control, held):
+            return
+        execute_action(held.action)
+        # Schedule from the previous deadline so the rate does not drift,
+        # but never try to catch up after a stall
+        held.deadline = max(held.deadline + held.interval, time.monotonic())
+        held.timer = self._scheduler.call_at(held.deadline, self._on_repeat, control, held)
@@ -0,0 +1,160 @@
+"""
+Hotplug Module for KommPad Configurator
+Reports new serial ports without polling where the platform allows it
+
+On Linux the monitor listens to the kernel's device events (uevent
+netlink socket) on the event loop; a socket filter drops everything but
+"add" events in the kernel, so unrelated device changes (e.g., battery
+updates) don't wake the daemon. Elsewhere it lists the serial ports
+periodically, but only while it is active (disconnected and device
+monitoring enabled).
+"""
+
+import ctypes
+import socket
+import struct
+import sys
+import serial.tools.list_ports
+import metrics
+
+# Interval of the port list comparison where no hotplug events are available (seconds)
+DEFAULT_POLL_INTERVAL = 3.0
+
+# Netlink family and multicast group of kernel uevents (linux/netlink.h)
+NETLINK_KOBJECT_UEVENT = 15
+UEVENT_KERNEL_GROUP = 1
+
+# setsockopt option attaching a classic BPF program (asm-generic/socket.h)
+SO_ATTACH_FILTER = 26
+
+# BPF program: accept messages starting with "add@", drop the rest
+_ADD_FILTER = (
+    (0x20, 0, 0, 0x00000000),  # ld  [0]          (first 4 bytes, big-endian)
+    (0x15, 0, 1, 0x61646440),  # jeq #"add@"      jt next, jf drop
+    (0x06, 0, 0, 0x0000ffff),  # ret #0xffff      accept
+    (0x06, 0, 0, 0x00000000),  # ret #0           drop
+)
+
+def _attach_add_filter(sock):
+    """Let only "add" uevents through (best effort, events are filtered again in Python)"""
+    program = (ctypes.c_ubyte * (8 * len(_ADD_FILTER)))()
+    for index, (code, jt, jf, k) in enumerate(_ADD_FILTER):
+        struct.pack_into('HBBI', program, 8 * index, code, jt, jf, k)
+    fprog = struct.pack('HP', len(_ADD_FILTER), ctypes.addressof(program))
+    try:
+        sock.setsockopt(socket.SOL_SOCKET, SO_ATTACH_FILTER, fprog)
+    except OSError:
+        pass
+
+def parse_uevent(message):
+    """
+    Parse a kernel uevent ("add@/devices/...\\0ACTION=add\\0SUBSYSTEM=tty\\0...")
+
+    Returns:
+        dict: Environment of the event (ACTION, SUBSYSTEM, DEVNAME, ...)
+    """
+    fields = {}
+    for part in message.split(b'\0')[1:]:
+        key, sep, value = part.partition(b'=')
+        if sep:
+            fields[key.decode('ascii', 'replace')] = value.decode('utf-8', 'replace')
+    return fields
+
+def _list_ports():
+    return set(port.device for port in serial.tools.list_ports.comports())
+
+class HotplugMonitor:
+    """Call back when a serial port appears"""
+
+    def __init__(self, loop, callback, poll_interval=DEFAULT_POLL_INTERVAL):
+        """
+        Args:
+            loop (EventLoop): Loop the monitor runs on
+            callback (callable): Called on the loop thread with the new port ("/dev/ttyACM0", "COM5")
+            poll_interval (float): Check interval if hotplug events are not available (seconds)
+        """
+        self.loop = loop
+        self.callback = callback
+        self.poll_interval = poll_interval
+        self.mode = None  # "netlink" or "polling" once started
+        self.active = False
+        self._sock = None
+        self._timer = None
+        self._known_ports = set()
+
+    def start(self):
+        """Start listening (call on the loop thread)"""
+        if sys.platform.startswith('linux') and hasattr(socket, 'AF_NETLINK'):
+            try:
+                sock = socket.socket(socket.AF_NETLINK, socket.SOCK_DGRAM, NETLINK_KOBJECT_UEVENT)
+                _attach_add_filter(sock)
+                sock.bind((0, UEVENT_KERNEL_GROUP))
+                sock.setblocking(False)
+                self._sock = sock
+                self.mode = "netlink"
+                self.loop.add_reader(sock.fileno(), self._on_uevents)
+                return
+            except OSError:
+                self._sock = None
+        self.mode = "polling"
+        try:
+            self._known_ports = _list_ports()
+        except Exception as e:
+            print(f"Error getting initial COM ports: {e}")
+
+    def stop(self):
+        """Stop listening (call on the loop thread)"""
+        self.set_active(False)
+        if self._sock:
+            self.loop.remove_reader(self._sock.fileno())
+            self._sock.close()
+            self._sock = None
+
+    def set_active(self, active):
+        """
+        Report new ports only while active (call on the loop thread)
+
+        The polling fallback only runs while active, kernel events are always
+        received but ignored while inactive.
+        """
+        self.active = active
+        if self.mode != "polling":
+            return
+        if active and self._timer is None:
+            self._known_ports = _list_ports()
+            self._timer = self.loop.call_later(self.poll_interval, self._poll)
+        elif not active and self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def _on_uevents(self):
+        while True:
+            try:
+                message = self._sock.recv(65536)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError:
+                return
+            if not message.startswith(b'add@'):
+                continue
+            event = parse_uevent(message)
+            if event.get('SUBSYSTEM') != 'tty' or 'DEVNAME' not in event:
+                continue
+            metrics.increment('hotplug_events')
+            if self.active:
+                self.callback("/dev/" + event['DEVNAME'])
+
+    def _poll(self):
+        self._timer = None
+        try:
+            ports = _list_ports()
+        except Exception as e:
+            print(f"Error in device monitor: {e}")
+            ports = self._known_ports
+        new_ports = ports - self._known_ports
+        self._known_ports = ports
+        if self.active:
+            for port in sorted(new_ports):
+                metrics.increment('hotplug_events')
+                self.callback(port)
+            self._timer = self.loop.call_later(self.poll_interval, self._poll)
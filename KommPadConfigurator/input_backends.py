@@ -0,0 +1,293 @@
+"""
+Input Backends Module for KommPad Configurator
+Sends key events to the operating system through a selectable backend
+
+Backends (settings.InputBackend):
+    "pynput"     pynput keyboard controller, works everywhere pynput does (default)
+    "uinput"     Linux virtual keyboard through /dev/uinput (python-evdev), no X11 round trips
+    "recording"  keeps the events in memory, for tests and benchmarks
+
+Every backend has press(key), release(key), type(text) and tap(keys, count).
+tap() presses the keys in order and releases them in reverse; with a count
+the last key is tapped that many times while the others (the modifiers)
+stay down. Backends that can batch send the whole sequence at once. Keys
+are pynput Key objects, single characters or key names as used in the
+configuration (e.g., "ctrl", "f5").
+"""
+
+import os
+import struct
+
+try:
+    import evdev  # Optional, only needed by the uinput backend
+    from evdev import ecodes
+except ImportError:
+    evdev = None
+    ecodes = None
+
+# Backend used when the configuration doesn't choose one
+DEFAULT_BACKEND = "pynput"
+
+# Tried in order when a backend is not available (pynput needs a desktop session).
+# Never "recording": a daemon that can't send keys fails instead of swallowing them.
+FALLBACK_BACKENDS = (DEFAULT_BACKEND, "uinput")
+
+class PynputBackend:
+    """Inject keys through a pynput keyboard controller"""
+
+    name = "pynput"
+
+    def __init__(self):
+        from pynput.keyboard import Controller
+        self._controller = Controller()
+
+    def press(self, key):
+        self._controller.press(key)
+
+    def release(self, key):
+        self._controller.release(key)
+
+    def type(self, text):
+        self._controller.type(text)
+
+    def tap(self, keys, count=1):
+        if not keys:
+            return
+        for key in keys[:-1]:
+            self._controller.press(key)
+        for _ in range(count):
+            self._controller.press(keys[-1])
+            self._controller.release(keys[-1])
+        for key in reversed(keys[:-1]):
+            self._controller.release(key)
+
+class RecordingBackend:
+    """Keep injected events in memory instead of sending them"""
+
+    name = "recording"
+
+    def __init__(self):
+        self.events = []   # ('press', key), ('release', key) or ('type', text)
+        self.batches = 0   # Number of tap() sequences
+
+    def press(self, key):
+        self.events.append(('press', key))
+
+    def release(self, key):
+        self.events.append(('release', key))
+
+    def type(self, text):
+        self.events.append(('type', text))
+
+    def tap(self, keys, count=1):
+        if not keys:
+            return
+        self.batches += 1
+        self.events.extend(('press', key) for key in keys[:-1])
+        for _ in range(count):
+            self.events.extend((('press', keys[-1]), ('release', keys[-1])))
+        self.events.extend(('release', key) for key in reversed(keys[:-1]))
+
+    def clear(self):
+        """Forget the recorded events"""
+        self.events.clear()
+        self.batches = 0
+
+# Key names (pynput Key names and configuration names, lower case) whose evdev
+# code is not simply "KEY_" + NAME
+UINPUT_KEY_NAMES = {
+    'ctrl': 'KEY_LEFTCTRL', 'ctrl_l': 'KEY_LEFTCTRL', 'ctrl_r': 'KEY_RIGHTCTRL',
+    'alt': 'KEY_LEFTALT', 'alt_l': 'KEY_LEFTALT', 'alt_r': 'KEY_RIGHTALT', 'alt_gr': 'KEY_RIGHTALT',
+    'shift': 'KEY_LEFTSHIFT', 'shift_l': 'KEY_LEFTSHIFT', 'shift_r': 'KEY_RIGHTSHIFT',
+    'cmd': 'KEY_LEFTMETA', 'cmd_l': 'KEY_LEFTMETA', 'cmd_r': 'KEY_RIGHTMETA', 'win': 'KEY_LEFTMETA',
+    'page_up': 'KEY_PAGEUP', 'page_down': 'KEY_PAGEDOWN',
+    'caps_lock': 'KEY_CAPSLOCK', 'num_lock': 'KEY_NUMLOCK', 'scroll_lock': 'KEY_SCROLLLOCK',
+    'print_screen': 'KEY_SYSRQ', 'menu': 'KEY_COMPOSE',
+    'media_volume_up': 'KEY_VOLUMEUP', 'media_volume_down': 'KEY_VOLUMEDOWN',
+    'media_volume_mute': 'KEY_MUTE', 'media_play_pause': 'KEY_PLAYPAUSE',
+    'media_next': 'KEY_NEXTSONG', 'media_previous': 'KEY_PREVIOUSSONG', 'media_stop': 'KEY_STOPCD',
+}
+
+# Characters on a US layout: character -> (evdev code name, needs shift)
+UINPUT_CHARACTERS = {
+    ' ': ('KEY_SPACE', False), '\n': ('KEY_ENTER', False), '\t': ('KEY_TAB', False),
+    '-': ('KEY_MINUS', False), '=': ('KEY_EQUAL', False), '[': ('KEY_LEFTBRACE', False),
+    ']': ('KEY_RIGHTBRACE', False), '\\': ('KEY_BACKSLASH', False), ';': ('KEY_SEMICOLON', False),
+    "'": ('KEY_APOSTROPHE', False), '`': ('KEY_GRAVE', False), ',': ('KEY_COMMA', False),
+    '.': ('KEY_DOT', False), '/': ('KEY_SLASH', False),
+    '!': ('KEY_1', True), '@': ('KEY_2', True), '#': ('KEY_3', True), '$': ('KEY_4', True),
+    '%': ('KEY_5', True), '^': ('KEY_6', True), '&': ('KEY_7', True), '*': ('KEY_8', True),
+    '(': ('KEY_9', True), ')': ('KEY_0', True), '_': ('KEY_MINUS', True), '+': ('KEY_EQUAL', True),
+    '{': ('KEY_LEFTBRACE', True), '}': ('KEY_RIGHTBRACE', True), '|': ('KEY_BACKSLASH', True),
+    ':': ('KEY_SEMICOLON', True), '"': ('KEY_APOSTROPHE', True), '~': ('KEY_GRAVE', True),
+    '<': ('KEY_COMMA', True), '>': ('KEY_DOT', True), '?': ('KEY_SLASH', True),
+}
+
+# struct input_event: struct timeval, type, code, value (the kernel sets the time)
+_INPUT_EVENT = struct.Struct('llHHi')
+
+class UinputBackend:
+    """
+    Inject keys through a Linux uinput virtual keyboard.
+
+    Events are packed into one buffer and written with a single system call
+    per tap() or typed chunk. Characters follow the US layout; characters it
+    can't produce (e.g., accented letters or emoji) are typed by the
+    fallback backend.
+    """
+
+    name = "uinput"
+
+    def __init__(self, fallback=None):
+        """
+        Args:
+            fallback: Backend typing characters without a key on the US layout (optional)
+        """
+        if evdev is None:
+            raise RuntimeError("python-evdev is not installed")
+        self._device = evdev.UInput({ecodes.EV_KEY: list(ecodes.keys)}, name="KommPad Virtual Keyboard")
+        self._fd = self._device.fd
+        self._fallback = fallback
+        self._codes = {}  # key -> (code, shift), None if there is no code
+        self._shift = ecodes.KEY_LEFTSHIFT
+        self._syn = _INPUT_EVENT.pack(0, 0, ecodes.EV_SYN, ecodes.SYN_REPORT, 0)
+
+    def close(self):
+        """Remove the virtual keyboard"""
+        self._device.close()
+
+    def press(self, key):
+        code = self._get_code(key)
+        if code:
+            os.write(self._fd, self._down_events(*code) + self._syn)
+
+    def release(self, key):
+        code = self._get_code(key)
+        if code:
+            os.write(self._fd, self._up_events(*code) + self._syn)
+
+    def tap(self, keys, count=1):
+        codes = [self._get_code(key) for key in keys]
+        if not codes or None in codes:
+            # Don't send a partial combination (e.g., the modifiers without the key)
+            return
+        *modifiers, code = codes
+        down = b"".join(self._down_events(*modifier) for modifier in modifiers)
+        up = b"".join(self._up_events(*modifier) for modifier in reversed(modifiers))
+        repeat = self._char_events(*code)
+        os.write(self._fd, (down + self._syn if down else b"") + repeat * count + (up + self._syn if up else b""))
+
+    def type(self, text):
+        buffer = []
+        unmapped = []
+        for char in text:
+            code = self._get_code(char)
+            if code is None:
+                unmapped.append(char)
+                continue
+            if unmapped:
+                self._flush(buffer)
+                self._type_fallback("".join(unmapped))
+                unmapped.clear()
+            buffer.append(self._char_events(*code))
+        self._flush(buffer)
+        if unmapped:
+            self._type_fallback("".join(unmapped))
+
+    def _flush(self, buffer):
+        if buffer:
+            os.write(self._fd, b"".join(buffer))
+            buffer.clear()
+
+    def _type_fallback(self, text):
+        if self._fallback:
+            self._fallback.type(text)
+        else:
+            print(f"Can't type with uinput: {text!r}")
+
+    def _key_event(self, code, value):
+        return _INPUT_EVENT.pack(0, 0, ecodes.EV_KEY, code, value)
+
+    def _down_events(self, code, shift):
+        if shift:
+            return self._key_event(self._shift, 1) + self._key_event(code, 1)
+        return self._key_event(code, 1)
+
+    def _up_events(self, code, shift):
+        if shift:
+            return self._key_event(code, 0) + self._key_event(self._shift, 0)
+        return self._key_event(code, 0)
+
+    def _char_events(self, code, shift):
+        return self._down_events(code, shift) + self._syn + self._up_events(code, shift) + self._syn
+
+    def _get_code(self, key):
+        try:
+            return self._codes[key]
+        except KeyError:
+            pass
+        code = self._lookup_code(key)
+        self._codes[key] = code
+        if code is None and not (isinstance(key, str) and len(key) == 1):
+            print(f"No uinput key code for: {key}")
+        return code
+
+    def _lookup_code(self, key):
+        """Get (code, shift) of a pynput key, character or key name"""
+        name = getattr(key, 'name', key)
+        if not isinstance(name, str):
+            return None
+        if len(name) == 1:
+            if name.isascii() and name.isalnum():
+                return getattr(ecodes, 'KEY_' + name.upper()), name.isupper()
+            if name in UINPUT_CHARACTERS:
+                code_name, shift = UINPUT_CHARACTERS[name]
+                return getattr(ecodes, code_name), shift
+            return None
+        name = name.lower()
+        code = getattr(ecodes, UINPUT_KEY_NAMES.get(name, 'KEY_' + name.upper()), None)
+        return (code, False) if code is not None else None
+
+# Backend classes, by configuration name
+BACKENDS = {
+    "pynput": PynputBackend,
+    "uinput": UinputBackend,
+    "recording": RecordingBackend,
+}
+
+def create_backend(name=None, strict=False):
+    """
+    Create an input backend
+
+    Args:
+        name (str): Backend name (default: DEFAULT_BACKEND)
+        strict (bool): Raise instead of falling back to another backend (FALLBACK_BACKENDS)
+
+    Returns:
+        Backend object
+    """
+    name = name or DEFAULT_BACKEND
+    try:
+        if name not in BACKENDS:
+            raise ValueError(f"Unknown input backend: {name}")
+        if name == "uinput":
+            # Keep pynput for characters the virtual keyboard can't type
+            try:
+                fallback = PynputBackend()
+            except Exception:
+                fallback = None
+            return UinputBackend(fallback)
+        return BACKENDS[name]()
+    except Exception as e:
+        if strict:
+            raise
+        for fallback in FALLBACK_BACKENDS:
+            if fallback == name:
+                continue
+            try:
+                backend = create_backend(fallback, strict=True)
+            except Exception:
+                continue
+            print(f"Input backend {name} not available ({e}), using {fallback}")
+            return backend
+        raise
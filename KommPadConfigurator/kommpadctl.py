@@ -0,0 +1,103 @@
+"""
+kommpadctl - Command line client of the KommPad Configurator daemon
+
+Talks to the running daemon over its control socket (see control_socket.py).
+
+Usage:
+    python kommpadctl.py status
+    python kommpadctl.py metrics
+    python kommpadctl.py reload
+    python kommpadctl.py push config.json [--force]
+    python kommpadctl.py layer 2|up|down
+    python kommpadctl.py trigger button3 [--layer 1]
+    python kommpadctl.py subscribe
+    python kommpadctl.py history
+    python kommpadctl.py ping
+"""
+
+import argparse
+import json
+import sys
+import time
+from control_socket import ControlClient
+
+def print_reply(reply, elapsed_ms):
+    """Print a reply and the round trip time"""
+    fields = {key: value for key, value in reply.items() if key != 'ok'}
+    if not reply.get('ok'):
+        print(f"Error: {reply.get('error', 'unknown error')}", file=sys.stderr)
+        fields.pop('error', None)
+    for key, value in fields.items():
+        if isinstance(value, (dict, list)):
+            value = json.dumps(value, indent=2)
+        print(f"{key}: {value}")
+    print(f"({elapsed_ms:.2f} ms)")
+
+def subscribe(client):
+    """Print events until interrupted"""
+    reply = client.request("subscribe")
+    if not reply.get('ok'):
+        return reply
+    client.sock.settimeout(None)
+    try:
+        while True:
+            print(json.dumps(client.receive()), flush=True)
+    except KeyboardInterrupt:
+        return None
+
+def build_request(args):
+    """Get the command and fields of the request for the parsed arguments"""
+    if args.command == "push":
+        with open(args.file, 'r', encoding='utf-8') as f:
+            return "push_config", {'config': json.load(f), 'force': args.force}
+    if args.command == "layer":
+        layer = args.layer if args.layer in ("up", "down") else int(args.layer)
+        return "layer", {'layer': layer}
+    if args.command == "trigger":
+        return "trigger", {'control': args.control, 'layer': args.layer}
+    return args.command, {}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="kommpadctl", description="Control the KommPad Configurator daemon")
+    parser.add_argument("--socket", help="control socket path (default: per-user runtime directory)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("status", help="show connection state, layer and config errors")
+    commands.add_parser("metrics", help="show the daemon metrics")
+    commands.add_parser("reload", help="reload config.json now")
+    push = commands.add_parser("push", help="replace the configuration with a file")
+    push.add_argument("file")
+    push.add_argument("--force", action="store_true", help="push even if the configuration has errors")
+    layer = commands.add_parser("layer", help="switch layers")
+    layer.add_argument("layer", help="layer index, 'up' or 'down'")
+    trigger = commands.add_parser("trigger", help="run the action mapped to a control")
+    trigger.add_argument("control", help="e.g. button1, encoder1, encoder3")
+    trigger.add_argument("--layer", type=int, help="layer of the mapping (default: current layer)")
+    commands.add_parser("subscribe", help="print events as they happen (see event_bus.py)")
+    commands.add_parser("history", help="show recent connection, action, config and layer events")
+    commands.add_parser("ping", help="check that the daemon is running")
+    args = parser.parse_args(argv)
+
+    try:
+        command, fields = build_request(args)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+
+    try:
+        with ControlClient(args.socket) as client:
+            if command == "subscribe":
+                reply = subscribe(client)
+                if reply is None:
+                    return 0
+                print_reply(reply, 0.0)
+                return 1
+            start = time.perf_counter()
+            reply = client.request(command, **fields)
+            print_reply(reply, (time.perf_counter() - start) * 1000.0)
+            return 0 if reply.get('ok') else 1
+    except (OSError, ConnectionError) as e:
+        print(f"Daemon not reachable: {e}", file=sys.stderr)
+        return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
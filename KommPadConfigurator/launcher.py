@@ -0,0 +1,252 @@
+"""
+Launcher Module for KommPad Configurator
+Starts applications (Open_App) and opens web pages (Open_Web) without blocking the caller
+
+Open_App with the modifier "mode:focus" brings an already running instance
+to the front instead of starting another one.
+
+Executable lookups and the browser controller are cached until the next
+configuration load (reset()), commands that were not found are looked up
+again every time. Applications are started without a shell whenever the
+command can be resolved, and finished children are reaped in the
+background so no zombie processes are left behind.
+"""
+
+import os
+import selectors
+import shlex
+import shutil
+import subprocess
+import threading
+import time
+import webbrowser
+from process_index import ProcessIndex, focus_process
+import metrics
+
+# Protocols kept as they are, anything else gets https://
+URL_PROTOCOLS = ('http://', 'https://', 'ftp://', 'file://')
+
+# Characters that need a shell to be interpreted (quotes are handled by shlex)
+SHELL_CHARACTERS = set('|&;<>()$`*?[]~!{}')
+
+_lock = threading.Lock()
+_commands = {}   # Command string from the config -> (args, use_shell)
+_browser = None  # webbrowser controller, looked up once per config load
+_reaper = None
+_process_index = None
+
+def reset():
+    """Forget cached executable lookups and the browser (call when the configuration is loaded)"""
+    global _browser
+    with _lock:
+        _commands.clear()
+        _browser = None
+
+def normalize_url(url):
+    """Add https:// to URLs without a protocol (e.g., "youtube.com")"""
+    if not url.startswith(URL_PROTOCOLS):
+        return 'https://' + url
+    return url
+
+def resolve_command(command):
+    """
+    Get how to start a command from the configuration
+
+    Args:
+        command (str): Executable path, name, or command line
+
+    Returns:
+        tuple: (args, use_shell), args is None if the command can't be found
+    """
+    with _lock:
+        cached = _commands.get(command)
+    if cached is not None:
+        return cached
+
+    resolved = _resolve_command(command)
+    if resolved[0] is not None:
+        # Not found is not cached, the application may be installed later
+        with _lock:
+            _commands[command] = resolved
+    return resolved
+
+def _resolve_command(command):
+    if os.path.isabs(command) and os.path.exists(command):
+        return [command], False
+
+    try:
+        # Windows paths keep their backslashes, only the quotes are removed
+        args = [arg.strip('"') for arg in shlex.split(command, posix=(os.name != 'nt'))]
+    except ValueError:
+        args = []
+    executable = shutil.which(args[0]) if args else None
+    if executable and not SHELL_CHARACTERS.intersection("".join(args[1:])):
+        return [executable] + args[1:], False
+
+    # Shell built-ins, pipes, command lines the shell has to split (e.g., "VAR=1 app"),
+    # and on Windows things like "start ms-settings:"
+    if os.name == 'nt' or SHELL_CHARACTERS.intersection(command) or len(command.split()) > 1:
+        return command, True
+    return None, False
+
+def get_browser():
+    """Get the browser controller, looked up on first use after a configuration load"""
+    global _browser
+    with _lock:
+        browser = _browser
+    if browser is None:
+        browser = webbrowser.get()
+        with _lock:
+            _browser = browser
+    return browser
+
+def open_url(url):
+    """
+    Open a URL in the default browser
+
+    Returns:
+        bool: True if the browser was started
+    """
+    url = normalize_url(url)
+    start = time.perf_counter()
+    try:
+        opened = get_browser().open(url)
+    except Exception as e:
+        print(f"Error opening URL: {e}")
+        print(f"Tried to open: {url}")
+        metrics.increment('launch_errors')
+        return False
+    metrics.record_sample('launch_web_ms', (time.perf_counter() - start) * 1000.0)
+    print(f"Opening URL in default browser: {url}")
+    return bool(opened)
+
+def launch_app(command):
+    """
+    Start an application without waiting for it
+
+    Args:
+        command (str): Executable path, name, or command line
+
+    Returns:
+        bool: True if the application was started
+    """
+    start = time.perf_counter()
+    args, use_shell = resolve_command(command)
+    if args is None:
+        print(f"Application not found: {command}")
+        print("Make sure the executable path is correct or the application is installed")
+        metrics.increment('launch_errors')
+        return False
+
+    try:
+        process = subprocess.Popen(
+            args, shell=use_shell,
+            stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            # Keep the application running when the daemon stops
+            start_new_session=(os.name != 'nt')
+        )
+    except Exception as e:
+        print(f"Error opening application: {e}")
+        print(f"Tried to open: {command}")
+        metrics.increment('launch_errors')
+        with _lock:
+            _commands.pop(command, None)  # The executable may have moved
+        return False
+
+    _get_reaper().add(process)
+    metrics.record_sample('launch_app_ms', (time.perf_counter() - start) * 1000.0)
+    print(f"Opening application{' via shell' if use_shell else ''}: {command}")
+    return True
+
+def focus_or_launch(command):
+    """
+    Bring the application to the front if it is running, otherwise start it
+
+    The process scan (the first one reads all of /proc) and the window tools
+    block, button_handler runs Open_App off the event loop.
+
+    Args:
+        command (str): Executable path, name, or command line
+
+    Returns:
+        bool: True if the application was focused or started
+    """
+    start = time.perf_counter()
+    index = get_process_index()
+    pids = index.find(command) if index.is_available() else []
+    if pids and focus_process(pids):
+        metrics.record_sample('launch_focus_ms', (time.perf_counter() - start) * 1000.0)
+        print(f"Focused running application: {command}")
+        return True
+    return launch_app(command)
+
+def get_process_index():
+    """Get the index of running processes, created on first use"""
+    global _process_index
+    with _lock:
+        if _process_index is None:
+            _process_index = ProcessIndex()
+        return _process_index
+
+class ChildReaper:
+    """
+    Collect the exit status of started applications on one background thread.
+
+    On Linux the thread waits on process file descriptors and only wakes
+    up when a child exits. Elsewhere each child gets a small waiting thread.
+    """
+
+    def __init__(self):
+        self._selector = None
+        self._new = []
+        self._new_lock = threading.Lock()
+        self._wake_r = self._wake_w = None
+        if hasattr(os, 'pidfd_open'):
+            self._selector = selectors.DefaultSelector()
+            self._wake_r, self._wake_w = os.pipe()
+            self._selector.register(self._wake_r, selectors.EVENT_READ)
+            threading.Thread(target=self._run, name="KommPadChildReaper", daemon=True).start()
+
+    def add(self, process):
+        """Reap a started process once it exits"""
+        if self._selector is None:
+            threading.Thread(target=self._wait, args=(process,), daemon=True).start()
+            return
+        with self._new_lock:
+            self._new.append(process)
+        os.write(self._wake_w, b'\0')
+
+    def _wait(self, process):
+        process.wait()
+        metrics.increment('launch_children_reaped')
+
+    def _run(self):
+        while True:
+            for key, _ in self._selector.select():
+                if key.fd == self._wake_r:
+                    os.read(self._wake_r, 512)
+                    self._register_new()
+                else:
+                    self._selector.unregister(key.fd)
+                    os.close(key.fd)
+                    key.data.wait()
+                    metrics.increment('launch_children_reaped')
+
+    def _register_new(self):
+        with self._new_lock:
+            processes, self._new = self._new, []
+        for process in processes:
+            try:
+                pidfd = os.pidfd_open(process.pid)
+            except OSError:
+                # Not supported by the kernel, wait on a thread instead
+                threading.Thread(target=self._wait, args=(process,), daemon=True).start()
+                continue
+            self._selector.register(pidfd, selectors.EVENT_READ, process)
+
+def _get_reaper():
+    global _reaper
+    with _lock:
+        if _reaper is None:
+            _reaper = ChildReaper()
+        return _reaper
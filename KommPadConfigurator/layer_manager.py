@@ -0,0 +1,142 @@
+"""
+Layer Manager Module for KommPad Configurator
+The host owns the current layer and tells the device with absolute 'setLayer' commands
+"""
+
+import threading
+from serial_utils import write_serial
+import metrics
+
+# Prefix of the firmware reply to 'setLayer' and 'layerUp'
+LAYER_CHANGED_PREFIX = "Layer changed to:"
+
+# Layer state, the host is the single source of truth
+_lock = threading.Lock()
+_current_layer = 0
+_max_layers = 2
+_in_flight = 0  # 'setLayer' commands sent but not yet confirmed
+_layer_key = "layer0"  # Pre-built mapping key of the current layer
+_listeners = []
+
+def add_layer_listener(callback):
+    """
+    Register a function called with the new layer index whenever the layer changes
+
+    Args:
+        callback (callable): Function taking the layer index (int)
+    """
+    _listeners.append(callback)
+
+def _notify(layer):
+    for callback in _listeners:
+        try:
+            callback(layer)
+        except Exception as e:
+            print(f"Error in layer listener: {e}")
+
+def get_current_layer():
+    """Get the current layer index (0-3)"""
+    return _current_layer
+
+def get_layer_key():
+    """Get the mapping key of the current layer (e.g., "layer0")"""
+    return _layer_key
+
+def get_max_layers():
+    """Get the number of layers in use"""
+    return _max_layers
+
+def set_max_layers(max_layers):
+    """
+    Set the number of layers in use, clamping the current layer if needed
+
+    Args:
+        max_layers (int): Number of layers (1-4)
+    """
+    global _max_layers, _current_layer, _layer_key
+    with _lock:
+        _max_layers = max(1, min(4, int(max_layers)))
+        if _current_layer >= _max_layers:
+            _current_layer = _max_layers - 1
+            _layer_key = f"layer{_current_layer}"
+            changed = True
+        else:
+            changed = False
+    if changed:
+        _notify(_current_layer)
+
+def set_layer(layer, send=True):
+    """
+    Switch to an absolute layer
+
+    Args:
+        layer (int): Layer index, must be below the number of layers in use
+        send (bool): Send a 'setLayer' command to the device (default: True)
+
+    Returns:
+        bool: True if the layer was valid, False otherwise
+    """
+    global _current_layer, _in_flight, _layer_key
+    with _lock:
+        if not 0 <= layer < _max_layers:
+            print(f"Invalid layer {layer} (max layers: {_max_layers})")
+            return False
+        _current_layer = layer
+        _layer_key = f"layer{layer}"
+        if send:
+            _in_flight += 1
+    _notify(layer)
+    if send and not write_serial(get_set_layer_command()):
+        with _lock:
+            _in_flight = max(0, _in_flight - 1)
+    return True
+
+def reset_in_flight():
+    """Forget unconfirmed commands (call after the device was reconnected)"""
+    global _in_flight
+    with _lock:
+        _in_flight = 0
+
+def get_set_layer_command():
+    """Get the command that sets the device to the current layer"""
+    return f"setLayer {_current_layer}"
+
+def layer_up():
+    """Switch to the next layer, wrapping around to the first one"""
+    return set_layer((_current_layer + 1) % _max_layers)
+
+def layer_down():
+    """Switch to the previous layer, wrapping around to the last one"""
+    return set_layer((_current_layer - 1) % _max_layers)
+
+def handle_layer_reply(line):
+    """
+    Process a 'Layer changed to: N' reply from the device
+
+    Args:
+        line (str): Line received from the device
+
+    Returns:
+        bool: True if the line was a layer reply, False otherwise
+    """
+    global _current_layer, _in_flight, _layer_key
+    if not line.startswith(LAYER_CHANGED_PREFIX):
+        return False
+    try:
+        device_layer = int(line[len(LAYER_CHANGED_PREFIX):].strip())
+    except ValueError:
+        print(f"Invalid layer reply: {line}")
+        return True
+
+    with _lock:
+        if _in_flight > 0:
+            _in_flight -= 1
+        if device_layer == _current_layer or _in_flight > 0:
+            # Confirmed, or a reply to an older request while a newer one is in flight
+            return True
+        # The device disagrees (rejected layer or local change), follow it
+        metrics.increment('layer_mismatches')
+        _current_layer = device_layer
+        _layer_key = f"layer{device_layer}"
+    _notify(device_layer)
+    return True
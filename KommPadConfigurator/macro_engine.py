@@ -0,0 +1,215 @@
+"""
+Macro Engine Module for KommPad Configurator
+Plays timed macro sequences on the scheduler thread without blocking the serial reader
+
+A macro is a list of steps:
+    {"press": "ctrl"}                       press and hold a key
+    {"release": "ctrl"}                     release a held key
+    {"tap": "c", "modifiers": ["ctrl"]}     press and release a key with optional modifiers
+    {"type": "Hello"}                       type a text
+    {"delay": 50}                           wait in milliseconds
+    {"repeat": 3, "steps": [...]}           play the nested steps several times
+    {"function": "Layer_Up", "modifiers": []}  run a function action
+
+Recorded macros are stored compactly as {"encoded": "+CTRL +c -c -CTRL 120+a -a"}:
+space separated "<delta_ms><op><key>" tokens, op '+' press and '-' release.
+They are decoded the first time they are played, not when the config loads.
+
+The older format, a list of key names, is still played as a key combination.
+"""
+
+import threading
+import time
+from functools import lru_cache
+from scheduler import get_scheduler
+import metrics
+
+def is_timed_macro(macro):
+    """Check if a macro value uses the step format (and not a list of key names)"""
+    if isinstance(macro, dict):
+        return "steps" in macro or "encoded" in macro
+    return isinstance(macro, list) and any(isinstance(step, dict) for step in macro)
+
+def get_macro_steps(macro):
+    """Get the steps of a macro value (a list of steps, {"steps": [...]} or {"encoded": "..."})"""
+    if isinstance(macro, dict):
+        if "encoded" in macro:
+            return decode_macro(macro["encoded"])
+        return macro.get("steps", [])
+    return macro
+
+@lru_cache(maxsize=64)
+def decode_macro(encoded):
+    """
+    Decode a recorded macro into steps
+
+    Args:
+        encoded (str): Space separated "<delta_ms><op><key>" tokens
+
+    Returns:
+        tuple: Macro steps
+    """
+    steps = []
+    for token in encoded.split():
+        index = 0
+        while index < len(token) and token[index].isdigit():
+            index += 1
+        if index + 1 >= len(token) or token[index] not in "+-":
+            print(f"Invalid recorded macro token: {token}")
+            continue
+        if index:
+            steps.append({"delay": int(token[:index])})
+        action = "press" if token[index] == "+" else "release"
+        steps.append({action: token[index + 1:]})
+    return tuple(steps)
+
+class _Playback:
+    """State of a running macro"""
+
+    __slots__ = ('key', 'steps', 'pressed', 'timer', 'deadline')
+
+    def __init__(self, key, steps):
+        self.key = key
+        self.steps = steps      # Generator yielding the delays between steps
+        self.pressed = []       # Keys held by the macro, released when it ends
+        self.timer = None
+        self.deadline = 0.0
+
+class MacroEngine:
+    """
+    Play macros on the shared scheduler thread.
+
+    Steps between two delays run back to back, then playback continues at
+    the next deadline. Deadlines are computed from the previous deadline so
+    long macros don't drift. Starting a macro that is already running
+    cancels it instead.
+    """
+
+    def __init__(self, keyboard, resolve_key, run_function, scheduler=None):
+        """
+        Args:
+            keyboard: Input backend with press(key), release(key), tap(keys) and type(text)
+            resolve_key (callable): Converts a key name to a key for the keyboard
+            run_function (callable): Runs a function action (name, modifiers)
+            scheduler (Scheduler): Timer thread (default: the shared scheduler)
+        """
+        self._keyboard = keyboard
+        self._resolve_key = resolve_key
+        self._run_function = run_function
+        self._scheduler = scheduler or get_scheduler()
+        self._lock = threading.Lock()
+        self._playing = {}
+
+    def play(self, key, steps):
+        """
+        Start a macro, or cancel it if it is already running
+
+        Args:
+            key: Identifies the macro (e.g., the mapping it comes from)
+            steps (list): Macro steps
+
+        Returns:
+            bool: True if the macro was started, False if it was cancelled
+        """
+        if self.cancel(key):
+            print("Macro cancelled")
+            return False
+
+        playback = _Playback(key, None)
+        playback.steps = self._iter_steps(steps, playback.pressed)
+        playback.deadline = time.monotonic()
+        with self._lock:
+            self._playing[key] = playback
+        playback.timer = self._scheduler.call_at(playback.deadline, self._advance, playback)
+        return True
+
+    def is_playing(self, key):
+        """Check if a macro is running"""
+        with self._lock:
+            return key in self._playing
+
+    def cancel(self, key):
+        """
+        Stop a running macro and release the keys it holds
+
+        Returns:
+            bool: True if the macro was running
+        """
+        with self._lock:
+            playback = self._playing.pop(key, None)
+        if playback is None:
+            return False
+        if playback.timer:
+            playback.timer.cancel()
+        # Finish on the scheduler thread, a step may be running right now
+        self._scheduler.call_later(0, self._finish, playback)
+        return True
+
+    def cancel_all(self):
+        """Stop every running macro"""
+        with self._lock:
+            keys = list(self._playing)
+        for key in keys:
+            self.cancel(key)
+
+    def _advance(self, playback):
+        with self._lock:
+            if self._playing.get(playback.key) is not playback:
+                return
+        metrics.record_sample('macro_timer_jitter_ms', (time.monotonic() - playback.deadline) * 1000.0)
+
+        try:
+            delay = next(playback.steps)
+        except StopIteration:
+            delay = None
+        except Exception as e:
+            print(f"Error in macro step: {e}")
+            delay = None
+
+        if delay is None:
+            with self._lock:
+                if self._playing.get(playback.key) is playback:
+                    del self._playing[playback.key]
+            self._finish(playback)
+            return
+
+        playback.deadline += delay
+        playback.timer = self._scheduler.call_at(playback.deadline, self._advance, playback)
+
+    def _finish(self, playback):
+        playback.steps.close()
+        for key in reversed(playback.pressed):
+            self._keyboard.release(key)
+        playback.pressed.clear()
+
+    def _iter_steps(self, steps, pressed):
+        """Run the steps, yielding the delay (in seconds) wherever the macro waits"""
+        for step in steps:
+            if not isinstance(step, dict):
+                # Plain key name inside a step list: tap it
+                step = {"tap": step}
+
+            if "delay" in step:
+                yield max(0.0, step["delay"] / 1000.0)
+            elif "repeat" in step:
+                for _ in range(int(step["repeat"])):
+                    yield from self._iter_steps(step.get("steps", []), pressed)
+            elif "press" in step:
+                key = self._resolve_key(step["press"])
+                self._keyboard.press(key)
+                pressed.append(key)
+            elif "release" in step:
+                key = self._resolve_key(step["release"])
+                self._keyboard.release(key)
+                if key in pressed:
+                    pressed.remove(key)
+            elif "tap" in step:
+                keys = [self._resolve_key(mod) for mod in step.get("modifiers", [])]
+                keys.append(self._resolve_key(step["tap"]))
+                self._keyboard.tap(keys)
+            elif "type" in step:
+                self._keyboard.type(step["type"])
+            elif "function" in step:
+                self._run_function(step["function"], step.get("modifiers", []))
+            else:
+                print(f"Unknown macro step: {step}")
@@ -1,24 +1,32 @@
+import argparse
 import serial
-import serial.tools.list_ports
+import signal
 import time
 import threading
-import json
 import os
 import sys
-from pynput.keyboard import Key, Controller
 import subprocess
-from device_detector import find_kommpad, get_last_port_info, ping_device, get_device_info
-from button_handler import handle_button_press, handle_encoder_press, handle_encoder_rotation
-from serial_utils import write_serial, set_serial_connection
-import pystray
-from PIL import Image
-import webbrowser
+from device_detector import find_kommpad, get_last_port_info, try_connect_to_port
+from serial_utils import set_serial_connection
+from button_handler import configure_text_injector, set_input_backend, dial_filter, execute_action, set_function_runner
+from mixer_engine import get_mixer_engine
+from event_timing import host_time_ms
+from config_store import get_config_store, classify_changes, CONFIG_PATH
+from config_watcher import ConfigWatcher
+from config_model import compile_config, Action
+from control_socket import ControlServer
+from serial_session import SerialSession
+from event_loop import EventLoop
+from hotplug import HotplugMonitor
+from scheduler import set_scheduler
+from event_bus import (get_event_bus, EventRecorder, DEVICE_CONNECTED, DEVICE_DISCONNECTED, INPUT_EVENT,
+                       ACTION_DONE, CONFIG_CHANGED, LAYER_CHANGED, EVENT_TYPES)
+import layer_manager
+import launcher
+import metrics
 
-# Initialize keyboard controller
-keyboard = Controller()
-
-# Global config path
-CONFIG_PATH = os.path.join(os.path.dirname(__file__), 'config.json')
+# Time a new serial port gets to settle before it is checked for a KommPad (seconds)
+PORT_SETTLE_DELAY = 0.5
 
 # Global variables for the application state
 app_state = {
@@ -27,21 +35,34 @@ app_state = {
     'device_info': None,
     'serial_connection': None,
     'config': None, 
-    'tray_icon': None,
+    'tray_icon': None,  # None when headless
+    'headless': False,  # No tray icon, status in the log and on the control socket (--headless)
     'current_layer': 0,  # Current layer (0-3)
     'device_monitoring_enabled': True,  # Toggle for device monitoring
-    'monitoring_thread_running': False  # Flag to control monitoring thread
+    'event_loop': None,  # Loop waiting on the serial port, config file and hotplug events
+    'asyncio': False,  # The loop is the asyncio core (--asyncio, see async_core.py)
+    'serial_session': None,  # Input processing of the current connection
+    'hotplug_monitor': None,  # New serial ports (see hotplug.py)
+    'probing': False,  # A new port is being checked for a KommPad
+    'event_engine': None,  # First event processing stage of the current connection
+    'control_server': None,  # Control socket (see control_socket.py)
+    'event_recorder': None  # Recent events (see event_bus.py)
 }
 
+# Connection, input, action, config and layer events (see event_bus.py)
+bus = get_event_bus()
+
 # Load the configuration file
 def load_config():
     try:
-        with open(CONFIG_PATH, 'r') as f:
-            config = json.load(f)
+        # The only place the daemon parses config.json, everything else reads the store
+        store = get_config_store()
+        if not store.reload():
+            raise ValueError("empty or missing configuration")
+        config = store.get_model()
+        report_config_errors(config)
         
-        # Load device monitoring setting
-        settings = config.get("settings", {})
-        app_state['device_monitoring_enabled'] = settings.get("EnableDeviceMonitoring", True)
+        apply_settings(config)
         
         return config
     except Exception as e:
@@ -50,6 +71,26 @@ def load_config():
         app_state['device_monitoring_enabled'] = True
         return None
 
+def report_config_errors(config):
+    """Print the problems found while compiling the configuration"""
+    for error in config.errors:
+        print(f"Config error: {error}")
+    metrics.increment('config_errors', len(config.errors))
+
+def apply_settings(config):
+    """Configure the subsystems from the settings of a compiled configuration"""
+    settings = config.settings
+    # Load device monitoring setting
+    app_state['device_monitoring_enabled'] = settings.enable_device_monitoring
+    layer_manager.set_max_layers(settings.max_layers)
+    set_input_backend(settings.input_backend)
+    launcher.reset()
+    get_mixer_engine().set_backend(settings.audio_backend)
+    dial_filter.configure(settings.dial_smoothing, settings.dial_deadband)
+    configure_text_injector(settings.text_mode, settings.text_rate)
+    if app_state['event_engine']:
+        app_state['event_engine'].configure(settings.action_limits)
+
 def get_config_path():
     """Get the path to the config.json file"""
     return CONFIG_PATH
@@ -58,119 +99,310 @@ def force_config_reload():
     """Force a reload of the configuration (can be called by UI)"""
     reload_config()
 
+def on_layer_changed(layer):
+    """Keep the application state in sync with the host-owned layer"""
+    app_state['current_layer'] = layer
+    bus.publish(LAYER_CHANGED, layer=layer)
+
+layer_manager.add_layer_listener(on_layer_changed)
+
+def create_serial_session(ser, config):
+    """Create the input processing of a connection, following config reloads"""
+    session = SerialSession(ser, config, lambda: app_state['config'], device_disconnected)
+    app_state['event_engine'] = session.engine
+    return session
+
 def read_serial(ser, config):
-    """Continuously read from the serial port and process commands"""
+    """
+    Read the serial port on a thread of its own
+
+    Used where the port has no file descriptor for the event loop (Windows). The
+    read blocks until a line arrives or the port timeout expires.
+    """
+    session = app_state['serial_session'] = create_serial_session(ser, config)
     try:
-        while app_state['connected'] and ser.is_open:
-            if ser.in_waiting > 0:
-                line = ser.readline().decode('utf-8', errors='replace').strip()
-                if line:
-                    # Handle button press messages in the style "button1 layer0"
-                    parts = line.split()
-                    if parts[0].startswith("button"):
-                        try:
-                            handle_button_press(config, parts[0], parts[1])
-                        except ValueError:
-                            print(f"Invalid button or layer: {line}")
-                    elif parts[0].startswith("encoder"):
-                        try:
-                            handle_encoder_press(config, parts[0], parts[1])
-                        except ValueError:
-                            print(f"Invalid encoder or layer: {line}")
-
-            time.sleep(0.1)
+        while app_state['connected'] and ser.is_open and not session.closed:
+            line = ser.readline()
+            if line:
+                session.handle_line(line, host_time_ms())
     except serial.SerialException as e:
         print(f"Device disconnected: {e}")
-        app_state['connected'] = False
-        update_tray_status(False)
+        device_disconnected(str(e))
     except PermissionError as e:
         print("Device disconnected (unplugged)")
-        app_state['connected'] = False
-        update_tray_status(False)
-    except UnicodeDecodeError:
-        pass  # Ignore decode errors
+        device_disconnected("unplugged")
+    finally:
+        session.close()
+
+def device_connected(ser):
+    """
+    Make a found device the current connection
 
-def main():
-    print("Starting KommPad Configurator...")
+    Subscribers of device-connected send the settings, start reading and update the tray.
+    """
+    app_state['serial_connection'] = ser
+    set_serial_connection(ser)  # Update serial_utils
+    app_state['device_port'] = ser.port
+    app_state['connected'] = True
+    app_state['device_info'] = app_state['config'].device
+    bus.publish(DEVICE_CONNECTED, port=ser.port)
+
+def device_disconnected(reason):
+    """Mark the current connection as lost"""
+    if not app_state['connected']:
+        return
+    app_state['connected'] = False
+    bus.publish(DEVICE_DISCONNECTED, port=app_state['device_port'], reason=reason)
+
+def start_device_session(event):
+    """device-connected: send the configuration and start reading the device"""
+    ser = app_state['serial_connection']
+    loop = app_state['event_loop']
+    if app_state['asyncio']:
+        from async_core import send_settings_async
+        loop.run_coroutine(send_settings_async(ser, app_state['config']))
+    else:
+        try:
+            from device_detector import send_settings_to_macropad
+            send_settings_to_macropad(ser, app_state['config'])
+            print("Configuration sent to macropad")
+        except Exception as e:
+            print(f"Error sending configuration to device: {e}")
+    
+    if loop and hasattr(ser, 'fileno'):
+        session = app_state['serial_session'] = create_serial_session(ser, app_state['config'])
+        loop.call_soon(session.attach, loop)
+    else:
+        read_thread = threading.Thread(target=read_serial, args=(ser, app_state['config']), daemon=True)
+        read_thread.start()
+
+def end_device_session(event):
+    """device-disconnected: stop reading the lost device"""
+    session = app_state['serial_session']
+    loop = app_state['event_loop']
+    if session and loop:
+        loop.call_soon(session.close)
+
+def update_device_monitoring(event=None):
+    """Look for new ports only while disconnected and device monitoring is enabled"""
+    loop = app_state['event_loop']
+    if loop and not loop.is_loop_thread():
+        loop.call_soon(update_device_monitoring)
+        return
+    monitor = app_state['hotplug_monitor']
+    if monitor:
+        monitor.set_active(app_state['device_monitoring_enabled'] and not app_state['connected'])
+
+def on_new_port(port):
+    """Hotplug: check a new serial port for a KommPad"""
+    if app_state['probing'] or app_state['connected']:
+        return
+    print(f"New COM port detected: {port}")
+    app_state['probing'] = True
+    # Give the system a moment to set up the port (permissions, driver)
+    app_state['event_loop'].call_later(PORT_SETTLE_DELAY, probe_port, port)
+
+def probe_port(port):
+    """Ping a port in a worker thread (a coroutine with --asyncio), the loop keeps running meanwhile"""
+    print(f"Checking if {port} is a KommPad...")
+    loop = app_state['event_loop']
+    if app_state['asyncio']:
+        from async_core import probe_port as probe_port_async
+        loop.run_coroutine(probe_port_async(port, 9600), done=on_probe_done)
+    else:
+        loop.run_in_thread(try_connect_to_port, port, 9600, 0.3, False, done=on_probe_done)
+
+def on_probe_done(ser):
+    app_state['probing'] = False
+    if not ser:
+        return
+    if app_state['connected'] or not app_state['device_monitoring_enabled']:
+        ser.close()
+        return
+    print(f"KommPad detected on new port: {ser.port}")
+    device_connected(ser)
+    print(f"Auto-connected to KommPad on {ser.port}")
+
+def search_device(done):
+    """
+    Look for the KommPad on all ports in a worker thread (a coroutine with --asyncio)
+
+    Args:
+        done (callable): Called with the open port (None if not found) on the loop thread
+    """
+    app_state['probing'] = True
+    loop = app_state['event_loop']
+    if app_state['asyncio']:
+        from async_core import find_kommpad_async
+        loop.run_coroutine(find_kommpad_async(9600), done=done)
+    else:
+        loop.run_in_thread(find_kommpad, 9600, 1, False, done=done)
+
+def start_event_sources(loop):
+    """Register the config watcher and the hotplug monitor on the event loop"""
+    ConfigWatcher(CONFIG_PATH, on_config_file_changed).attach(loop)
+    monitor = app_state['hotplug_monitor'] = HotplugMonitor(loop, on_new_port)
+    monitor.start()
+    print(f"Device monitor started ({monitor.mode}) - Monitoring: "
+          f"{'Enabled' if app_state['device_monitoring_enabled'] else 'Disabled'}")
+    update_device_monitoring()
+
+def push_config_changes(event):
+    """config-changed: send changed settings and display names, reconnect after device changes"""
+    changes = event.changes
+    if app_state['connected'] and app_state['serial_connection']:
+        # Mapping changes are picked up by read_serial, only settings and display names reach the device
+        try:
+            # Import here to avoid circular imports
+            from device_detector import send_settings_to_macropad, send_display_names
+            if "settings" in changes:
+                send_settings_to_macropad(app_state['serial_connection'], app_state['config'])
+                print("Updated settings sent to macropad")
+            elif "display_names" in changes:
+                send_display_names(app_state['serial_connection'], app_state['config'])
+                print("Updated display names sent to macropad")
+        except Exception as e:
+            print(f"Error sending updated settings: {e}")
+            # Only reconnect if sending settings failed
+            print("Attempting to reconnect due to settings update failure...")
+            reconnect_device()
+    elif "port" in changes or "device" in changes:
+        # Only try to reconnect if we're not connected and the device configuration changed
+        print("Device not connected, attempting to reconnect...")
+        reconnect_device()
+
+def record_event_metrics(event):
+    """Count connection and config events and time actions"""
+    if event.type == ACTION_DONE:
+        metrics.record_sample('action_ms', event.duration_ms)
+    elif event.type == DEVICE_CONNECTED:
+        metrics.increment('device_connects')
+    elif event.type == DEVICE_DISCONNECTED:
+        metrics.increment('device_disconnects')
+    else:
+        metrics.increment('config_reloads')
+
+def on_connection_event(event):
+    """device-connected/device-disconnected: show the connection state in the tray (in the log when headless)"""
+    if app_state['headless']:
+        if event.type == DEVICE_CONNECTED:
+            print(f"Status: connected ({event.port})")
+        else:
+            print(f"Status: disconnected ({event.reason})")
+        return
+    update_tray_status(event.type == DEVICE_CONNECTED)
+
+def subscribe_event_handlers():
+    """Wire the daemon subsystems to the event bus"""
+    bus.subscribe(start_device_session, (DEVICE_CONNECTED,))
+    bus.subscribe(push_config_changes, (CONFIG_CHANGED,))
+    bus.subscribe(record_event_metrics, (DEVICE_CONNECTED, DEVICE_DISCONNECTED, CONFIG_CHANGED, ACTION_DONE))
+    bus.subscribe(on_connection_event, (DEVICE_CONNECTED, DEVICE_DISCONNECTED))
+    bus.subscribe(end_device_session, (DEVICE_DISCONNECTED,))
+    bus.subscribe(update_device_monitoring, (DEVICE_CONNECTED, DEVICE_DISCONNECTED, CONFIG_CHANGED))
+    # Input events are left out, they would be recorded for every key press
+    app_state['event_recorder'] = EventRecorder(bus, [t for t in EVENT_TYPES if t != INPUT_EVENT])
+
+def create_event_loop(use_asyncio):
+    """
+    Create the loop of the daemon core
+
+    Args:
+        use_asyncio (bool): Use the asyncio core (see async_core.py) instead of event_loop.EventLoop
+    """
+    app_state['asyncio'] = use_asyncio
+    if use_asyncio:
+        from async_core import AsyncioEventLoop
+        loop = AsyncioEventLoop()
+    else:
+        loop = EventLoop()
+    # Launchers may block (process scan, window tools), run them next to the loop
+    set_function_runner(loop.run_function)
+    return loop
+
+def parse_args(argv=None):
+    """Parse the command line of the daemon"""
+    parser = argparse.ArgumentParser(description="KommPad Configurator daemon")
+    parser.add_argument("--headless", action="store_true",
+                        help="run without the tray icon (servers, CI, kiosks), see kommpadctl status")
+    parser.add_argument("--asyncio", action="store_true", help="run the asyncio core (see async_core.py)")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    app_state['headless'] = args.headless
+    print("Starting KommPad Configurator" + (" (headless)..." if args.headless else "..."))
     
     # Load configuration
     config = load_config()
     if not config:
         print("Failed to load configuration. Using default settings.")
-        config = {}
+        config = compile_config({})
     else:
-        print(f"Loaded configuration for {config.get('device', {}).get('name', 'Unknown device')}")
+        print(f"Loaded configuration for {config.device.name or 'Unknown device'}")
     
     # Store config in global state
     app_state['config'] = config
-      # Setup tray icon first
-    tray_icon = setup_tray_icon()
+    subscribe_event_handlers()
+    
+    # One thread waits on the device, the config file, hotplug events and all timers
+    loop = app_state['event_loop'] = create_event_loop(args.asyncio)
+    set_scheduler(loop)
+    if not args.headless:
+        loop.start()
+        # Setup tray icon first
+        tray_icon = setup_tray_icon()
     # Show last connection info if available
     last_info = get_last_port_info()
     if last_info:
         print(f"Last connected to {last_info['port']}")
     
-    # Try to connect to device in a separate thread
+    # Try to connect to device in a worker thread
     def connect_to_device():
-        # Wait a moment for tray icon to be fully initialized
-        time.sleep(1)
-        
-        ser = find_kommpad(baudrate=9600, timeout=1, debug=False)
-        
+        search_device(on_connect_done)
+    
+    def on_connect_done(ser):
+        app_state['probing'] = False
         if ser:
-            app_state['serial_connection'] = ser
-            set_serial_connection(ser)  # Update serial_utils
-            app_state['device_port'] = ser.port
-            app_state['connected'] = True
-            app_state['device_info'] = config.get('device', {})
-            
             print(f"Connected to KommPad on {ser.port}")
-            update_tray_status(True)
-            
-            # Send current configuration immediately after initial connection
-            try:
-                from device_detector import send_settings_to_macropad
-                send_settings_to_macropad(ser, app_state['config'])
-                print("Initial configuration sent to macropad")
-            except Exception as e:
-                print(f"Error sending initial configuration to device: {e}")
-            
-            # Start serial reading thread
-            read_thread = threading.Thread(target=read_serial, args=(ser, config), daemon=True)
-            read_thread.start()
+            device_connected(ser)
+        elif app_state['headless']:
+            print("KommPad not found. Waiting for it to be plugged in.")
         else:
             print("KommPad not found. Use tray icon to reconnect.")
-            app_state['connected'] = False
-            update_tray_status(False)
-    
-    # Start connection attempt in background
-    connect_thread = threading.Thread(target=connect_to_device, daemon=True)
-    connect_thread.start()
     
-    # Start config file watcher
-    config_watcher_thread = threading.Thread(target=watch_config_file, daemon=True)
-    config_watcher_thread.start()
+    # Wait a moment for tray icon to be fully initialized
+    loop.call_later(0.0 if args.headless else 1.0, connect_to_device)
     
-    # Start device monitor for automatic reconnection when new devices are plugged in
-    device_monitor_thread = threading.Thread(target=monitor_for_new_devices, daemon=True)
-    device_monitor_thread.start()
+    # Accept requests from kommpadctl and the configurator UI
+    start_control_server()
     
-    print("Running in system tray. Right-click tray icon for options.")
+    # Watch the config file and listen for new devices being plugged in
+    loop.call_soon(start_event_sources, loop)
     
-    # Run the tray icon (this blocks until quit)
+    # Run the tray icon or, when headless, the event loop (this blocks until quit)
     try:
-        tray_icon.run()
+        if args.headless:
+            print("Running headless. Use kommpadctl for status and control, Ctrl+C or SIGTERM to quit.")
+            signal.signal(signal.SIGTERM, lambda signum, frame: loop.stop())
+            loop.run()
+        else:
+            print("Running in system tray. Right-click tray icon for options.")
+            tray_icon.run()
     except KeyboardInterrupt:
         print("\nShutting down...")
     finally:
         # Cleanup
-        app_state['monitoring_thread_running'] = False  # Stop monitoring thread
+        loop.stop()
+        stop_control_server()
         if app_state['serial_connection'] and app_state['serial_connection'].is_open:
             app_state['serial_connection'].close()
         print("KommPad Configurator stopped.")
 
 def load_tray_image(connected=False):
     """Load the appropriate tray icon image"""
+    # Imported here so the headless daemon runs without GUI libraries
+    from PIL import Image
     try:
         if connected:
             image_path = os.path.join(os.path.dirname(__file__), 'assets', 'Logo.png')
@@ -193,7 +425,7 @@ def get_device_info_text():
     """Get formatted device information for the tray menu"""
     if app_state['connected'] and app_state['device_info']:
         info = app_state['device_info']
-        return f"Device: {info.get('name', 'KommPad')}\nPort: {app_state['device_port']}\nStatus: Connected"
+        return f"Device: {info.name or 'KommPad'}\nPort: {app_state['device_port']}\nStatus: Connected"
     else:
         return "Device: KommPad\nStatus: Disconnected"
 
@@ -224,68 +456,173 @@ def open_config_file():
         print(f"DEBUG: Exception details: {type(e).__name__}: {str(e)}")
 
 def reload_config():
-    """Reload the configuration file"""
+    """Reload the configuration file (tray menu), the same way as a change seen by the config watcher"""
+    loop = app_state['event_loop']
+    if loop and not loop.is_loop_thread():
+        loop.call_soon(reload_config)
+        return
     try:
         print("Reloading configuration...")
-        config = load_config()
-        if config:
-            app_state['config'] = config
-            # Device monitoring setting is updated in load_config()
-            print(f"Configuration reloaded successfully for {config.get('device', {}).get('name', 'Unknown device')}")
-            print(f"Device monitoring: {'Enabled' if app_state['device_monitoring_enabled'] else 'Disabled'}")
-        else:
-            print("Failed to reload configuration - using existing settings")
+        changes = on_config_file_changed()
+        if changes is None:
+            print("Configuration unchanged or not readable - using existing settings")
+            return
+        config = app_state['config']
+        print(f"Configuration reloaded successfully for {config.device.name or 'Unknown device'}")
+        print(f"Device monitoring: {'Enabled' if app_state['device_monitoring_enabled'] else 'Disabled'}")
     except Exception as e:
         print(f"Error reloading config: {e}")
         # Attempt to reconnect
         reconnect_device()
 
-def watch_config_file():
-    """Watch for changes to the config file and reload when modified"""
-    import time
-    last_modified = 0
-    
-    try:
-        if os.path.exists(CONFIG_PATH):
-            last_modified = os.path.getmtime(CONFIG_PATH)
-    except:
-        pass
-    
-    while True:
-        try:
-            if os.path.exists(CONFIG_PATH):
-                current_modified = os.path.getmtime(CONFIG_PATH)
-                if current_modified > last_modified:
-                    time.sleep(0.1)  # Small delay to ensure file write is complete
-                    reload_config()
-                    
-                    # Only send new settings if device is connected, don't reconnect unnecessarily
-                    if app_state['connected'] and app_state['serial_connection']:
-                        try:
-                            # Import here to avoid circular imports
-                            from device_detector import send_settings_to_macropad
-                            send_settings_to_macropad(app_state['serial_connection'], app_state['config'])
-                            print("Updated settings sent to macropad")
-                        except Exception as e:
-                            print(f"Error sending updated settings: {e}")
-                            # Only reconnect if sending settings failed
-                            print("Attempting to reconnect due to settings update failure...")
-                            reconnect_device()
-                    elif not app_state['connected']:
-                        # Only try to reconnect if we're not connected
-                        print("Device not connected, attempting to reconnect...")
-                        reconnect_device()
-                    
-                    last_modified = current_modified
-            time.sleep(1)  # Check every second
-        except Exception as e:
-            print(f"Error watching config file: {e}")
-            time.sleep(5)  # Wait longer on error
+def on_config_file_changed():
+    """Reload the config file after it changed and update only the affected subsystems"""
+    store = get_config_store()
+    result = store.refresh()
+    if result is None:
+        return None  # Same content (e.g., our own write) or not parseable
+    _, changes = result
+    apply_config_changes(changes)
+    return changes
+
+def apply_config_changes(changes):
+    """
+    Switch to the current snapshot of the config store
+
+    Args:
+        changes (set): Changed parts of the configuration (see config_store.classify_changes())
+    """
+    config = app_state['config'] = get_config_store().get_model()
+    if not changes:
+        return
+    report_config_errors(config)
+    print(f"Configuration changed: {', '.join(sorted(changes))}")
+
+    if "settings" in changes:
+        apply_settings(config)
+    if "device" in changes:
+        app_state['device_info'] = config.device
+    bus.publish(CONFIG_CHANGED, changes=sorted(changes))
+
+def handle_status_request(request):
+    """Control socket: connection state, layer and configuration"""
+    config = app_state['config']
+    return {
+        'connected': bool(app_state['connected']),
+        'port': app_state['device_port'],
+        'device': config.device.name if config else None,
+        'layer': layer_manager.get_current_layer(),
+        'max_layers': layer_manager.get_max_layers(),
+        'device_monitoring': app_state['device_monitoring_enabled'],
+        'headless': app_state['headless'],
+        'hotplug': app_state['hotplug_monitor'].mode if app_state['hotplug_monitor'] else None,
+        'loop_wakeups_per_minute': app_state['event_loop'].wakeups_per_minute() if app_state['event_loop'] else None,
+        'config_errors': list(config.errors) if config else []
+    }
+
+def handle_metrics_request(request):
+    """Control socket: all metrics"""
+    return {'metrics': metrics.snapshot()}
+
+def handle_reload_request(request):
+    """
+    Control socket: reload config.json now instead of waiting for the watcher
+
+    The UI sends this after each save with the time of the save ("saved_ms",
+    milliseconds since the epoch), the time until the device is updated is
+    recorded as config_save_to_device_ms.
+    """
+    changes = on_config_file_changed()
+    if request.get('saved_ms') is not None:
+        metrics.record_sample('config_save_to_device_ms', time.time() * 1000.0 - request['saved_ms'])
+    return {'changes': sorted(changes or ())}
+
+def handle_push_config_request(request):
+    """
+    Control socket: replace the configuration ("config") and apply it
+
+    Like reload, the time since "saved_ms" is recorded as config_save_to_device_ms.
+    """
+    data = request.get('config')
+    if not isinstance(data, dict):
+        raise ValueError("'config' must be an object")
+    model = compile_config(data)
+    errors = model.errors
+    if errors and not request.get('force'):
+        return {'ok': False, 'error': "invalid configuration", 'config_errors': errors}
+    # The store keeps the compiled model, apply_config_changes() doesn't compile it again
+    changes = get_config_store().replace(data, model)
+    apply_config_changes(changes)
+    if request.get('saved_ms') is not None:
+        metrics.record_sample('config_save_to_device_ms', time.time() * 1000.0 - request['saved_ms'])
+    return {'changes': sorted(changes), 'config_errors': errors}
+
+def handle_layer_request(request):
+    """Control socket: switch to a layer ("layer": index, "up" or "down")"""
+    layer = request.get('layer')
+    if layer == "up":
+        layer_manager.layer_up()
+    elif layer == "down":
+        layer_manager.layer_down()
+    elif not isinstance(layer, int) or not layer_manager.set_layer(layer):
+        raise ValueError(f"invalid layer: {layer}")
+    return {'layer': layer_manager.get_current_layer()}
+
+def handle_trigger_request(request):
+    """Control socket: run the action mapped to a control ("control", optional "layer")"""
+    config = app_state['config']
+    layer = request.get('layer')
+    layer_key = f"layer{layer}" if layer is not None else layer_manager.get_layer_key()
+    action = config.get_action(request.get('control'), layer_key) if config else None
+    if not isinstance(action, Action):
+        raise ValueError(f"no action mapped to {request.get('control')} on {layer_key}")
+    # On the loop like device events: macros and text run in the background, launchers in a worker
+    execute_action(action)
+    return {'action': action.action, 'value': action.value}
+
+def handle_history_request(request):
+    """Control socket: recent connection, action, config and layer events"""
+    recorder = app_state['event_recorder']
+    return {'events': [event.to_dict() for event in recorder.get_events()] if recorder else []}
+
+def start_control_server():
+    """Serve the control socket (kommpadctl, configurator UI)"""
+    loop = app_state['event_loop']
+    # The handlers run on the loop, which owns the daemon state (the asyncio core serves the socket there)
+    server = ControlServer(bus=bus, call_soon=None if app_state['asyncio'] else loop.call_soon)
+    server.register("status", handle_status_request)
+    server.register("metrics", handle_metrics_request)
+    server.register("reload", handle_reload_request)
+    server.register("push_config", handle_push_config_request)
+    server.register("layer", handle_layer_request)
+    server.register("trigger", handle_trigger_request)
+    server.register("history", handle_history_request)
+    if app_state['asyncio']:
+        # Served by the loop thread instead of a thread of its own
+        from async_core import AsyncControlServer
+        async_server = AsyncControlServer(server)
+
+        def on_started(started):
+            if started:
+                app_state['control_server'] = async_server
+                print(f"Control socket: {server.path}")
+
+        loop.run_coroutine(async_server.start(), done=on_started)
+    elif server.start():
+        app_state['control_server'] = server
+        print(f"Control socket: {server.path}")
+
+def stop_control_server():
+    """Stop the control socket"""
+    server = app_state['control_server']
+    if server:
+        app_state['control_server'] = None
+        server.stop()
 
 def reconnect_device():
     """Attempt to reconnect to the KommPad device"""
     print("Reconnecting to device...")
-    update_tray_status(False)  # Show disconnected status
+    device_disconnected("reconnect")
     
     # Stop current connection if exists
     if app_state['serial_connection'] and app_state['serial_connection'].is_open:
@@ -295,150 +632,40 @@ def reconnect_device():
             pass  # Ignore errors when closing
         app_state['serial_connection'] = None
     
-    # Try to find device again (with reduced timeout for faster reconnection)
-    ser = find_kommpad(baudrate=9600, timeout=1, debug=False)
-
-    if ser:
-        app_state['serial_connection'] = ser
-        set_serial_connection(ser)  # Update serial_utils
-        app_state['device_port'] = ser.port
-        app_state['connected'] = True
-        update_tray_status(True)
-        
-        # Send current configuration immediately after reconnection
-        try:
-            from device_detector import send_settings_to_macropad
-            send_settings_to_macropad(ser, app_state['config'])
-            print("Configuration sent to newly connected device")
-        except Exception as e:
-            print(f"Error sending configuration to device: {e}")
-        
-        # Start serial reading thread
-        read_thread = threading.Thread(target=read_serial, args=(ser, app_state['config']), daemon=True)
-        read_thread.start()
+    if app_state['probing']:
+        print("Already looking for the device")
+        return
+    # Search off the calling thread (event bus subscriber, tray, control socket)
+    search_device(on_reconnect_done)
 
-        print(f"Reconnected to KommPad on {ser.port}")
-    else:
-        app_state['connected'] = False
+def on_reconnect_done(ser):
+    app_state['probing'] = False
+    if not ser:
         app_state['device_port'] = None
         print("Reconnection failed - device not found")
+        return
+    if app_state['connected']:
+        # Plugged in and connected while searching
+        ser.close()
+        return
+    device_connected(ser)
+    print(f"Reconnected to KommPad on {ser.port}")
 
-def monitor_for_new_devices():
-    """Monitor for new devices being plugged in when disconnected"""
-    import time
-    last_ports = set()
-    consecutive_errors = 0
-    max_errors = 3
-    
-    # Set monitoring thread as running
-    app_state['monitoring_thread_running'] = True
-    
-    # Get initial list of COM ports
-    try:
-        current_ports = set(port.device for port in serial.tools.list_ports.comports())
-        last_ports = current_ports.copy()
-        consecutive_errors = 0
-    except Exception as e:
-        print(f"Error getting initial COM ports: {e}")
-        current_ports = set()
-        last_ports = set()
-        consecutive_errors += 1
-    
-    print(f"Device monitor started - Monitoring: {'Enabled' if app_state['device_monitoring_enabled'] else 'Disabled'}")
-    
-    while app_state['monitoring_thread_running']:
-        try:
-            # Only monitor if enabled in settings and when disconnected
-            if app_state['device_monitoring_enabled'] and not app_state['connected']:
-                # Get current COM ports (this is the main performance impact)
-                current_ports = set(port.device for port in serial.tools.list_ports.comports())
-                
-                # Check if any new ports have been added
-                new_ports = current_ports - last_ports
-                
-                if new_ports:
-                    print(f"New COM port(s) detected: {', '.join(new_ports)}")
-                    
-                    # Try to connect to new ports, but limit to prevent excessive attempts
-                    for port in list(new_ports)[:3]:  # Limit to 3 new ports max per cycle
-                        # Check if monitoring is still enabled before attempting connection
-                        if not app_state['device_monitoring_enabled']:
-                            break
-                            
-                        try:
-                            print(f"Checking if {port} is a KommPad...")
-                            # Use a very short timeout for quick detection
-                            ser = find_kommpad(baudrate=9600, timeout=0.3, debug=False)
-                            
-                            if ser:
-                                print(f"KommPad detected on new port: {ser.port}")
-                                
-                                # Update app state
-                                app_state['serial_connection'] = ser
-                                set_serial_connection(ser)
-                                app_state['device_port'] = ser.port
-                                app_state['connected'] = True
-                                update_tray_status(True)
-                                
-                                # Send current configuration
-                                try:
-                                    from device_detector import send_settings_to_macropad
-                                    send_settings_to_macropad(ser, app_state['config'])
-                                    print("Configuration sent to newly detected device")
-                                except Exception as e:
-                                    print(f"Error sending configuration to newly detected device: {e}")
-                                
-                                # Start serial reading thread
-                                read_thread = threading.Thread(target=read_serial, args=(ser, app_state['config']), daemon=True)
-                                read_thread.start()
-                                
-                                print(f"Auto-connected to KommPad on {ser.port}")
-                                break  # Stop checking other new ports
-                                
-                        except Exception:
-                            # Silently continue if this port isn't a KommPad
-                            pass
-                
-                # Update the list of known ports
-                last_ports = current_ports.copy()
-                consecutive_errors = 0  # Reset error counter on success
-                
-                # Dynamic sleep interval based on connection state and monitoring enabled
-                time.sleep(3)  # Check every 3 seconds when monitoring is enabled and disconnected
-                
-            elif app_state['device_monitoring_enabled'] and app_state['connected']:
-                # If connected and monitoring enabled, check less frequently and just update port list
-                try:
-                    current_ports = set(port.device for port in serial.tools.list_ports.comports())
-                    last_ports = current_ports.copy()
-                    consecutive_errors = 0
-                except:
-                    consecutive_errors += 1
-                
-                # Much longer sleep when connected (device monitoring not critical)
-                time.sleep(10)  # Check every 10 seconds when connected
-            
-            else:
-                # Monitoring is disabled - sleep longer and just check if it gets re-enabled
-                time.sleep(5)  # Check every 5 seconds if monitoring gets re-enabled
-            
-        except Exception as e:
-            consecutive_errors += 1
-            if consecutive_errors <= max_errors:
-                print(f"Error in device monitor: {e}")
-            
-            # Exponential backoff on repeated errors
-            error_sleep = min(10 + (consecutive_errors * 2), 30)  # Max 30 seconds
-            time.sleep(error_sleep)
-    
-    print("Device monitoring thread stopped")
+def show_metrics():
+    """Print the collected metrics (serial traffic counters, ...)"""
+    print("KommPad metrics:")
+    print(metrics.format_report())
 
 def quit_application(icon, item):
     """Quit the application"""
     print("Shutting down KommPad Configurator...")
     
-    # Stop device monitoring thread
-    app_state['monitoring_thread_running'] = False
+    # Stop the event loop (device, config watcher, hotplug)
+    if app_state['event_loop']:
+        app_state['event_loop'].stop()
+    
+    # Stop accepting control requests
+    stop_control_server()
     
     # Close serial connection
     if app_state['serial_connection'] and app_state['serial_connection'].is_open:
@@ -450,7 +677,6 @@ def quit_application(icon, item):
 def update_tray_status(connected):
     """Update the tray icon to reflect connection status"""
     if app_state['tray_icon']:
-        app_state['connected'] = connected
         new_image = load_tray_image(connected)
         app_state['tray_icon'].icon = new_image
         
@@ -461,31 +687,27 @@ def update_tray_status(connected):
         tooltip += "\nRight-click for menu"
         app_state['tray_icon'].title = tooltip
 
-def toggle_device_monitoring(icon, item):
+def toggle_device_monitoring(icon=None, item=None):
     """Toggle device monitoring on/off"""
-    app_state['device_monitoring_enabled'] = not app_state['device_monitoring_enabled']
+    loop = app_state['event_loop']
+    if loop and not loop.is_loop_thread():
+        loop.call_soon(toggle_device_monitoring)
+        return
+    enabled = not app_state['device_monitoring_enabled']
     
-    # Update the config file with the new setting
+    # Update the config file with the new setting, then apply it like any other change
     try:
-        config = {}
-        if os.path.exists(CONFIG_PATH):
-            with open(CONFIG_PATH, 'r') as f:
-                config = json.load(f)
-        
-        # Update settings section
-        if "settings" not in config:
-            config["settings"] = {}
-        
-        config["settings"]["EnableDeviceMonitoring"] = app_state['device_monitoring_enabled']
-        
-        # Save config file
-        with open(CONFIG_PATH, 'w') as f:
-            json.dump(config, f, indent=2)
-        
-        # Update app config
-        app_state['config'] = config
+        def set_monitoring(config):
+            config.setdefault("settings", {})["EnableDeviceMonitoring"] = enabled
+
+        store = get_config_store()
+        previous = store.get()
+        store.update(set_monitoring)
+        # No changes if another process changed the file first: the store keeps its
+        # snapshot and the config watcher then applies both changes
+        apply_config_changes(classify_changes(previous, store.get()))
         
-        status = "enabled" if app_state['device_monitoring_enabled'] else "disabled"
+        status = "enabled" if enabled else "disabled"
         print(f"Device monitoring {status}")
         
         # Update the tray menu to reflect new state
@@ -496,6 +718,7 @@ def toggle_device_monitoring(icon, item):
 
 def create_tray_menu():
     """Create the context menu for the tray icon"""
+    import pystray
     monitoring_text = "🔍 Disable Auto-Detection" if app_state['device_monitoring_enabled'] else "🔍 Enable Auto-Detection"
     
     return pystray.Menu(
@@ -504,12 +727,14 @@ def create_tray_menu():
         pystray.MenuItem("🔄 Reconnect Device", lambda icon, item: reconnect_device()),
         pystray.MenuItem("🔃 Reload Config", lambda icon, item: reload_config()),
         pystray.MenuItem(monitoring_text, toggle_device_monitoring),
+        pystray.MenuItem("📊 Show Metrics", lambda icon, item: show_metrics()),
         pystray.Menu.SEPARATOR,
         pystray.MenuItem("❌ Quit", quit_application)
     )
 
 def setup_tray_icon():
     """Setup and run the system tray icon"""
+    import pystray
     # Load initial image (disconnected)
     image = load_tray_image(False)
     
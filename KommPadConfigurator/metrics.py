@@ -0,0 +1,109 @@
+"""
+Metrics Module for KommPad Configurator
+Lightweight in-process counters and timing samples used for diagnostics and tuning
+"""
+
+import threading
+from collections import deque
+
+# Number of recent samples kept per timing metric for percentiles
+SAMPLE_WINDOW = 1024
+
+# Metric storage shared by every module of the daemon
+_lock = threading.Lock()
+_counters = {}
+_samples = {}
+
+def increment(name, amount=1):
+    """
+    Increase a named counter
+
+    Args:
+        name (str): Counter name (e.g., 'serial_event_lines')
+        amount (int): Value to add (default: 1)
+    """
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + amount
+
+def get_counter(name):
+    """Get the current value of a named counter (0 if never incremented)"""
+    with _lock:
+        return _counters.get(name, 0)
+
+def record_sample(name, value):
+    """
+    Record a timing sample (e.g., a latency in milliseconds)
+
+    Args:
+        name (str): Metric name (e.g., 'latency_device_to_host_ms')
+        value (float): Sample value
+    """
+    with _lock:
+        samples = _samples.get(name)
+        if samples is None:
+            samples = _samples[name] = deque(maxlen=SAMPLE_WINDOW)
+        samples.append(value)
+
+def get_sample_stats(name):
+    """
+    Get statistics of the recent samples of a timing metric
+
+    Args:
+        name (str): Metric name
+
+    Returns:
+        dict: count, min, avg, p50, p95 and max, or None if there are no samples
+    """
+    with _lock:
+        values = sorted(_samples.get(name, ()))
+    if not values:
+        return None
+    count = len(values)
+    return {
+        'count': count,
+        'min': values[0],
+        'avg': sum(values) / count,
+        'p50': values[count // 2],
+        'p95': values[min(count - 1, int(count * 0.95))],
+        'max': values[-1]
+    }
+
+def snapshot():
+    """
+    Get a copy of all metrics
+
+    Returns:
+        dict: Counter names mapped to their values and timing metrics mapped to their statistics
+    """
+    with _lock:
+        data = dict(_counters)
+        names = list(_samples)
+    for name in names:
+        stats = get_sample_stats(name)
+        if stats:
+            data[name] = stats
+    return data
+
+def reset():
+    """Reset all metrics (useful for benchmarks and troubleshooting)"""
+    with _lock:
+        _counters.clear()
+        _samples.clear()
+
+def format_report():
+    """
+    Format all metrics as a human readable report
+
+    Returns:
+        str: One metric per line, sorted by name
+    """
+    data = snapshot()
+    if not data:
+        return "No metrics recorded yet."
+    lines = []
+    for name, value in sorted(data.items()):
+        if isinstance(value, dict):
+            value = (f"n={value['count']} min={value['min']:.2f} avg={value['avg']:.2f} "
+                     f"p50={value['p50']:.2f} p95={value['p95']:.2f} max={value['max']:.2f}")
+        lines.append(f"{name}: {value}")
+    return "\n".join(lines)
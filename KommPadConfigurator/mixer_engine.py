@@ -0,0 +1,179 @@
+"""
+Mixer Engine Module for KommPad Configurator
+Maps dial positions and encoder steps onto the volume of single applications
+
+Dial mappings (dial1..dial3) name the application and the volume range:
+    "dial1": {"layer0": {"exe": "Spotify.exe", "min": 0, "max": 80}}
+
+Encoders use the function actions App_Volume_Up and App_Volume_Down with
+the modifiers "exe:<application>" and optionally "step:<percent>".
+
+Volume changes are applied on a worker thread, at most once per
+MIN_UPDATE_INTERVAL per application. Changes arriving in between are
+merged, so turning fast never queues up outdated volumes.
+"""
+
+import threading
+import time
+from audio_backends import create_audio_backend
+import metrics
+
+# Minimum seconds between two volume updates of an application
+MIN_UPDATE_INTERVAL = 0.03
+
+class _PendingVolume:
+    """Volume change of an application waiting to be applied"""
+
+    __slots__ = ('absolute', 'delta', 'low', 'high')
+
+    def __init__(self, low, high):
+        self.absolute = None  # Target volume, None for a change relative to the current one
+        self.delta = 0.0      # Change on top of the target or current volume
+        self.low = low
+        self.high = high
+
+class MixerEngine:
+    """Apply application volumes through an audio backend"""
+
+    def __init__(self, backend=None, interval=MIN_UPDATE_INTERVAL):
+        """
+        Args:
+            backend: Audio backend (default: created on first use)
+            interval (float): Minimum seconds between two updates of an application
+        """
+        self._backend = backend
+        self._interval = interval
+        self._condition = threading.Condition()
+        self._pending = {}     # Application -> _PendingVolume
+        self._next_time = {}   # Application -> earliest time of the next update
+        self._levels = {}      # Application -> last volume set
+        self._applying = False
+        self._thread = None
+
+    def set_backend(self, name):
+        """Select the audio backend by name (settings.AudioBackend)"""
+        backend = create_audio_backend(name)
+        with self._condition:
+            self._backend = backend
+            self._levels.clear()
+
+    def set_volume(self, app, volume, low=0, high=100):
+        """
+        Set the volume of an application
+
+        Args:
+            app (str): Application name
+            volume (float): Volume in percent, limited to low..high
+        """
+        if app:
+            self._request(app, low, high, absolute=volume)
+
+    def step(self, app, delta, low=0, high=100):
+        """
+        Change the volume of an application relative to its current volume
+
+        Args:
+            app (str): Application name
+            delta (float): Change in percent
+        """
+        if app:
+            self._request(app, low, high, delta=delta)
+
+    def flush(self, timeout=1.0):
+        """Wait until every pending change was applied (used by benchmarks)"""
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while (self._pending or self._applying) and time.monotonic() < deadline:
+                self._condition.wait(0.005)
+
+    def _request(self, app, low, high, absolute=None, delta=0.0):
+        metrics.increment('mixer_requests')
+        with self._condition:
+            pending = self._pending.get(app)
+            if pending is None:
+                pending = self._pending[app] = _PendingVolume(low, high)
+            else:
+                metrics.increment('mixer_coalesced')
+            pending.low, pending.high = low, high
+            if absolute is not None:
+                pending.absolute = absolute
+                pending.delta = 0.0
+            pending.delta += delta
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="KommPadMixer", daemon=True)
+                self._thread.start()
+            self._condition.notify()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                app, pending = self._next_due()
+                backend = self._backend
+                self._applying = True
+            try:
+                self._apply(backend, app, pending)
+            except Exception as e:
+                # A failing backend must not end the thread, later changes still apply
+                print(f"Error changing the volume of {app}: {e}")
+                metrics.increment('mixer_errors')
+            finally:
+                with self._condition:
+                    self._applying = False
+                    self._condition.notify_all()
+
+    def _next_due(self):
+        """Wait for the application whose update is due first, and take its change"""
+        while True:
+            now = time.monotonic()
+            due = min(self._pending, key=lambda app: self._next_time.get(app, 0.0), default=None)
+            if due is None:
+                self._condition.wait()
+                continue
+            wait = self._next_time.get(due, 0.0) - now
+            if wait > 0:
+                self._condition.wait(wait)
+                continue
+            self._next_time[due] = now + self._interval
+            return due, self._pending.pop(due)
+
+    def _apply(self, backend, app, pending):
+        if backend is None:
+            with self._condition:
+                self._backend = backend = create_audio_backend()
+
+        start = time.perf_counter()
+        volume = pending.absolute
+        if volume is None:
+            volume = self._levels.get(app)
+            if volume is None:
+                volume = backend.get_volume(app)
+            if volume is None:
+                print(f"Volume of {app} unknown, is it playing?")
+                return
+        volume = min(max(volume + pending.delta, pending.low), pending.high)
+        if volume == self._levels.get(app):
+            return
+
+        try:
+            applied = backend.set_volume(app, volume)
+        except Exception as e:
+            print(f"Error setting volume of {app}: {e}")
+            applied = False
+        if applied:
+            self._levels[app] = volume
+            metrics.increment('mixer_updates')
+            metrics.record_sample('mixer_update_ms', (time.perf_counter() - start) * 1000.0)
+        else:
+            self._levels.pop(app, None)
+
+# Shared mixer engine, created on first use
+_mixer_engine = None
+_mixer_lock = threading.Lock()
+
+def get_mixer_engine():
+    """Get the mixer engine shared by dials and encoders"""
+    global _mixer_engine
+    with _mixer_lock:
+        if _mixer_engine is None:
+            _mixer_engine = MixerEngine()
+        return _mixer_engine
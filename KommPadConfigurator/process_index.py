@@ -0,0 +1,161 @@
+"""
+Process Index Module for KommPad Configurator
+Finds running applications for the focus-or-launch mode of Open_App
+
+On Linux the index is built from /proc and updated incrementally: each
+refresh lists the PIDs and only reads the entries of PIDs that appeared
+since the last refresh. Exited PIDs are dropped without reading anything.
+Without /proc, psutil is used when it is installed.
+"""
+
+import os
+import shutil
+import subprocess
+import threading
+
+try:
+    import psutil  # Optional, used where there is no /proc
+except ImportError:
+    psutil = None
+
+# Length of the process name in /proc/<pid>/comm (the kernel truncates it)
+COMM_LENGTH = 15
+
+def get_process_names(command):
+    """
+    Get the names to look up for a command from the configuration
+
+    Args:
+        command (str): Executable path, name, or command line (e.g., "firefox --private-window")
+
+    Returns:
+        tuple: Lower-case names, e.g. ("firefox",)
+    """
+    command = command.strip()
+    if command.startswith('"'):
+        executable = command[1:].split('"')[0]
+    elif os.path.exists(command) or not command:
+        executable = command
+    else:
+        executable = command.split()[0]
+    name = os.path.basename(executable.replace('\\', '/')).lower()
+    if name.endswith('.exe'):
+        name = name[:-4]
+    return (name, name[:COMM_LENGTH]) if len(name) > COMM_LENGTH else (name,)
+
+class ProcessIndex:
+    """Index of running processes by lower-case executable name"""
+
+    def __init__(self, proc_root="/proc"):
+        self._proc_root = proc_root
+        self._use_proc = os.path.isdir(os.path.join(proc_root, "self"))
+        self._lock = threading.Lock()
+        self._names = {}    # pid -> names of the process
+        self._pids = {}     # name -> set of pids
+        self.scanned = 0    # Number of /proc entries read, for benchmarks
+
+    def is_available(self):
+        """Check if running processes can be listed on this system"""
+        return self._use_proc or psutil is not None
+
+    def refresh(self):
+        """Update the index: read new PIDs, drop exited ones"""
+        if self._use_proc:
+            current = {int(entry) for entry in os.listdir(self._proc_root) if entry.isdigit()}
+        elif psutil is not None:
+            current = set(psutil.pids())
+        else:
+            return
+
+        with self._lock:
+            known = self._names.keys()
+            for pid in known - current:
+                self._remove(pid)
+            for pid in current - known:
+                names = self._read_names(pid)
+                self._names[pid] = names
+                for name in names:
+                    self._pids.setdefault(name, set()).add(pid)
+
+    def find(self, command):
+        """
+        Get the PIDs running a command
+
+        Args:
+            command (str): Executable path, name, or command line
+
+        Returns:
+            list: PIDs, empty if the application is not running
+        """
+        self.refresh()
+        pids = set()
+        with self._lock:
+            for name in get_process_names(command):
+                pids.update(self._pids.get(name, ()))
+        # A PID can be reused between two refreshes, check that it still matches
+        return sorted(pid for pid in pids if self._still_matches(pid))
+
+    def _remove(self, pid):
+        for name in self._names.pop(pid, ()):
+            pids = self._pids.get(name)
+            if pids is not None:
+                pids.discard(pid)
+                if not pids:
+                    del self._pids[name]
+
+    def _read_names(self, pid):
+        """Get the names of a process: its comm and the file name of its executable"""
+        names = set()
+        if self._use_proc:
+            self.scanned += 1
+            base = os.path.join(self._proc_root, str(pid))
+            try:
+                with open(os.path.join(base, "comm")) as f:
+                    names.add(f.read().strip().lower())
+                names.add(os.path.basename(os.readlink(os.path.join(base, "exe"))).lower())
+            except OSError:
+                pass  # Exited, or the executable of another user
+        else:
+            try:
+                process = psutil.Process(pid)
+                names.add(os.path.splitext(process.name())[0].lower())
+            except Exception:
+                pass
+        return tuple(names)
+
+    def _still_matches(self, pid):
+        if not self._use_proc:
+            return psutil is None or psutil.pid_exists(pid)
+        try:
+            with open(os.path.join(self._proc_root, str(pid), "comm")) as f:
+                comm = f.read().strip().lower()
+        except OSError:
+            return False
+        with self._lock:
+            return comm in self._names.get(pid, ())
+
+def focus_process(pids):
+    """
+    Bring a window of one of the processes to the front
+
+    Returns:
+        bool: True if a window was activated
+    """
+    xdotool = shutil.which("xdotool")
+    if xdotool:
+        for pid in pids:
+            result = subprocess.run([xdotool, "search", "--onlyvisible", "--pid", str(pid), "windowactivate"],
+                                    stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=2)
+            if result.returncode == 0:
+                return True
+        return False
+
+    wmctrl = shutil.which("wmctrl")
+    if wmctrl:
+        result = subprocess.run([wmctrl, "-lp"], capture_output=True, text=True, timeout=2)
+        wanted = {str(pid) for pid in pids}
+        for line in result.stdout.splitlines():
+            fields = line.split(None, 3)
+            if len(fields) >= 3 and fields[2] in wanted:
+                return subprocess.run([wmctrl, "-ia", fields[0]], timeout=2).returncode == 0
+    return False
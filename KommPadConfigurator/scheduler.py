@@ -0,0 +1,134 @@
+"""
+Scheduler Module for KommPad Configurator
+One timer thread shared by every time-based feature (hold, repeat, long-press, ...)
+"""
+
+import heapq
+import itertools
+import threading
+import time
+
+class TimerHandle:
+    """Handle of a scheduled callback, used to cancel it"""
+
+    __slots__ = ('deadline', 'callback', 'args', 'cancelled')
+
+    def __init__(self, deadline, callback, args):
+        self.deadline = deadline
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+    def cancel(self):
+        """Cancel the callback if it did not run yet"""
+        self.cancelled = True
+
+class Scheduler:
+    """
+    Run callbacks at a deadline on a single background thread.
+
+    The thread sleeps until the next deadline (or indefinitely when nothing is
+    scheduled), so there are no periodic wakeups and no thread per timer.
+    Callbacks must be short, anything slow should be handed to another thread.
+    """
+
+    def __init__(self, name="KommPadScheduler"):
+        self.name = name
+        self._heap = []
+        self._counter = itertools.count()  # Tie breaker for equal deadlines
+        self._condition = threading.Condition()
+        self._thread = None
+        self._running = False
+
+    def call_at(self, deadline, callback, *args):
+        """
+        Run a callback at a time.monotonic() deadline
+
+        Returns:
+            TimerHandle: Handle that can cancel the callback
+        """
+        handle = TimerHandle(deadline, callback, args)
+        with self._condition:
+            heapq.heappush(self._heap, (deadline, next(self._counter), handle))
+            if not self._running:
+                self._start()
+            # Wake the thread only if the new timer is the earliest one
+            if self._heap[0][2] is handle:
+                self._condition.notify()
+        return handle
+
+    def call_later(self, delay, callback, *args):
+        """
+        Run a callback after a delay in seconds
+
+        Returns:
+            TimerHandle: Handle that can cancel the callback
+        """
+        return self.call_at(time.monotonic() + delay, callback, *args)
+
+    def pending(self):
+        """Get the number of scheduled callbacks that were not cancelled"""
+        with self._condition:
+            return sum(1 for _, _, handle in self._heap if not handle.cancelled)
+
+    def stop(self):
+        """Stop the scheduler thread and drop all pending callbacks"""
+        with self._condition:
+            self._running = False
+            self._heap.clear()
+            self._condition.notify()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=1)
+        self._thread = None
+
+    def _start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while self._running:
+                    # Drop cancelled timers without waking up for them
+                    while self._heap and self._heap[0][2].cancelled:
+                        heapq.heappop(self._heap)
+                    if not self._heap:
+                        self._condition.wait()
+                        continue
+                    delay = self._heap[0][0] - time.monotonic()
+                    if delay <= 0:
+                        break
+                    self._condition.wait(delay)
+                if not self._running:
+                    return
+                handle = heapq.heappop(self._heap)[2]
+                if handle.cancelled:
+                    continue
+
+            try:
+                handle.callback(*handle.args)
+            except Exception as e:
+                print(f"Error in scheduled callback: {e}")
+
+# Scheduler shared by the whole daemon
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+def get_scheduler():
+    """Get the shared scheduler, creating it on first use"""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = Scheduler()
+        return _scheduler
+
+def set_scheduler(scheduler):
+    """
+    Replace the shared scheduler (e.g., with the daemon's event loop, see event_loop.py)
+
+    Only timers created afterwards use the new scheduler.
+    """
+    global _scheduler
+    with _scheduler_lock:
+        _scheduler = scheduler
@@ -0,0 +1,129 @@
+"""
+Serial Session Module for KommPad Configurator
+Input processing of one device connection
+
+A session turns the lines received from the device into actions: input
+events go through the event pipeline (debounce and rate limits, encoder
+acceleration, multi-tap and chords, hold, repeat and long-press), layer
+replies go to the layer manager. The session is fed either by an event
+loop (attach(), the port's file descriptor is watched) or by a thread that
+reads lines and calls handle_line().
+"""
+
+import serial
+from button_handler import handle_dial_event, dial_filter
+from event_timing import EventTracker, host_time_ms
+from hold_engine import HoldEngine
+from tap_chord_engine import TapChordEngine
+from encoder_accelerator import EncoderAccelerator
+from dispatch_limiter import DispatchLimiter
+from serial_utils import parse_event_line
+from event_bus import get_event_bus, INPUT_EVENT
+import layer_manager
+import metrics
+
+class SerialSession:
+    """Input processing of one device connection"""
+
+    def __init__(self, ser, config, get_config=None, on_disconnect=None):
+        """
+        Args:
+            ser (serial.Serial): Open connection to the device
+            config (ConfigModel): Compiled configuration
+            get_config (callable): Returns the current configuration (follows reloads)
+            on_disconnect (callable): Called with the reason when reading fails
+        """
+        self.ser = ser
+        self.config = config
+        self.get_config = get_config
+        self.on_disconnect = on_disconnect
+        # Drop detection and latency attribution for this connection
+        self.tracker = EventTracker()
+        # Event handling: debounce and rate limits, encoder acceleration, multi-tap and chords,
+        # then hold, repeat and long-press
+        self.engine = DispatchLimiter(EncoderAccelerator(TapChordEngine(HoldEngine())),
+                                      config.settings.action_limits if config else None)
+        self.loop = None
+        self.fd = None
+        self.buffer = bytearray()
+        self.closed = False
+        self.bus = get_event_bus()
+        # Dial positions start over with every connection
+        dial_filter.reset()
+
+    def attach(self, loop):
+        """Read the device whenever the event loop reports data (call on the loop thread)"""
+        if self.closed:
+            return
+        self.loop = loop
+        self.fd = self.ser.fileno()
+        loop.add_reader(self.fd, self.on_readable)
+        # Lines that arrived before the reader was registered
+        if self.ser.in_waiting:
+            self.on_readable()
+
+    def on_readable(self):
+        """Process the complete lines available on the port"""
+        try:
+            data = self.ser.read(self.ser.in_waiting or 1)
+        except (serial.SerialException, OSError) as e:
+            print(f"Device disconnected: {e}")
+            self.close()
+            if self.on_disconnect:
+                self.on_disconnect(str(e))
+            return
+        self.buffer += data
+        received_ms = host_time_ms()
+        while True:
+            end = self.buffer.find(b'\n')
+            if end < 0:
+                break
+            line = bytes(self.buffer[:end])
+            del self.buffer[:end + 1]
+            self.handle_line(line, received_ms)
+
+    def handle_line(self, line, received_ms):
+        """Process one line received from the device"""
+        line = line.decode('utf-8', errors='replace').strip()
+        if not line:
+            return
+        # Handle input events in the style "button1 layer0 [t<millis> s<seq>]"
+        # The host owns the layer, the layer echoed by the device is ignored
+        event = parse_event_line(line)
+        if event:
+            metrics.increment('serial_event_lines')
+            self.tracker.on_event(event['device_ms'], event['seq'], received_ms)
+            self.bus.publish(INPUT_EVENT, control=event['control'], state=event['state'],
+                             value=event['value'], layer=layer_manager.get_current_layer())
+            # Follow config reloads, the connection may outlive many of them
+            if self.get_config:
+                self.config = self.get_config() or self.config
+            config = self.config
+            try:
+                if event['control'].startswith("dial"):
+                    handle_dial_event(config, event['control'], layer_manager.get_layer_key(), event['value'])
+                else:
+                    self.engine.on_event(config, event['control'], layer_manager.get_layer_key(), event['state'],
+                                         event['device_ms'])
+            except ValueError:
+                print(f"Invalid button or encoder: {line}")
+            except Exception as e:
+                # One failing action (e.g., no input backend) must not end the session
+                print(f"Error handling {line}: {e}")
+            metrics.record_sample('latency_host_internal_ms', host_time_ms() - received_ms)
+        elif layer_manager.handle_layer_reply(line):
+            metrics.increment('serial_other_lines')
+        else:
+            # Replies and debug chatter from the firmware
+            metrics.increment('serial_other_lines')
+            metrics.increment('serial_other_bytes', len(line))
+
+    def close(self):
+        """Stop reading and release held keys"""
+        if self.closed:
+            return
+        self.closed = True
+        if self.loop and self.fd is not None:
+            self.loop.remove_reader(self.fd)
+        # Never leave keys stuck down when the device goes away
+        self.engine.release_all()
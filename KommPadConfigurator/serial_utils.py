@@ -38,3 +38,47 @@ def write_serial(command):
     else:
         print(f"No serial connection available to send command: {command.strip()}")
         return False
+
+def parse_event_line(line):
+    """
+    Parse an input event sent by the device
+
+    Events look like "button1 layer0", optionally followed by the key state
+    ("d" pressed, "u" released), the device timestamp and a rolling
+    sequence number: "button1 layer0 d t12345 s17". Dial events carry the
+    raw position instead of a key state: "dial1 layer0 v512"
+
+    Args:
+        line (str): Line received from the device
+
+    Returns:
+        dict: 'control', 'layer', 'state' ("down", "up"), 'value', 'device_ms'
+              and 'seq' (None when not sent), or None if the line is not an event
+    """
+    parts = line.split()
+    if not parts or not parts[0].startswith(("button", "encoder", "dial")):
+        return None
+
+    event = {
+        'control': parts[0],
+        'layer': parts[1] if len(parts) > 1 else None,
+        'state': None,
+        'value': None,
+        'device_ms': None,
+        'seq': None
+    }
+    for part in parts[2:]:
+        try:
+            if part == 'd':
+                event['state'] = "down"
+            elif part == 'u':
+                event['state'] = "up"
+            elif part[0] == 'v':
+                event['value'] = int(part[1:])
+            elif part[0] == 't':
+                event['device_ms'] = int(part[1:])
+            elif part[0] == 's':
+                event['seq'] = int(part[1:])
+        except ValueError:
+            pass  # Ignore malformed optional fields
+    return event
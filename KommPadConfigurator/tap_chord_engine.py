@@ -0,0 +1,198 @@
+"""
+Tap/Chord Engine Module for KommPad Configurator
+Resolves multi-tap (tap-dance) and two-button chord mappings before the hold engine
+
+Multi-tap fields of a button mapping (next to "action", "value", ...):
+    "double_tap": {"action": ..., "value": ..., "modifiers": []}
+    "triple_tap": {"action": ..., "value": ..., "modifiers": []}
+    "tap_window": 200                  ms to wait for the next tap (optional)
+
+Chords are mappings whose key joins two controls with '+', next to the
+button mappings and with the usual layerN entries:
+    "button1+button2": {"layer0": {"action": ..., "value": ..., "window": 50}}
+
+Only buttons that take part in a multi-tap or chord mapping are delayed,
+by at most the chord window plus the tap window. Every other event goes
+straight to the next stage. config_model compiles the tap actions into
+Action.taps and indexes the chords by control (ConfigModel.chords).
+"""
+
+import threading
+from button_handler import execute_action
+from scheduler import get_scheduler
+
+class _PendingDown:
+    """A key-down held back while waiting for a chord partner"""
+
+    __slots__ = ('config', 'layer_key', 'timer', 'released')
+
+    def __init__(self, config, layer_key):
+        self.config = config
+        self.layer_key = layer_key
+        self.timer = None
+        self.released = False
+
+class _TapState:
+    """Taps counted so far on a multi-tap button"""
+
+    __slots__ = ('config', 'layer_key', 'action', 'count', 'timer')
+
+    def __init__(self, config, layer_key, action):
+        self.config = config
+        self.layer_key = layer_key
+        self.action = action
+        self.count = 0
+        self.timer = None
+
+def _get_multi_tap(config, control, layer_key):
+    """Get the action of a control if it is a multi-tap button"""
+    action = config.get_action(control, layer_key) if config else None
+    return action if getattr(action, 'taps', None) else None
+
+class TapChordEngine:
+    """
+    First stage of event processing, in front of a HoldEngine.
+
+    Events of buttons without multi-tap or chord mappings are forwarded
+    untouched, so they keep their latency. All timers run on the shared
+    scheduler thread.
+    """
+
+    def __init__(self, next_stage, scheduler=None):
+        self._next = next_stage
+        self._scheduler = scheduler or get_scheduler()
+        self._lock = threading.RLock()  # Events are forwarded in order while holding it
+        self._pending = {}    # control -> _PendingDown
+        self._taps = {}       # control -> _TapState
+        self._swallow = set() # Controls whose next key-up belongs to a resolved chord/tap
+
+    def on_event(self, config, control, layer_key, state):
+        """
+        Process an input event
+
+        Args:
+            config (ConfigModel): Compiled configuration
+            control (str): Control identifier (e.g., "button1", "encoder2")
+            layer_key (str): Layer identifier (e.g., "layer0")
+            state (str): "down", "up", or None for a single press event
+        """
+        with self._lock:
+            if state is None:
+                if not self._is_delayed(config, control, layer_key):
+                    self._next.on_event(config, control, layer_key, None)
+                    return
+                # Older firmware: a single press is a full tap
+                self._on_down(config, control, layer_key)
+                self._on_up(config, control, layer_key)
+            elif state == "down":
+                self._on_down(config, control, layer_key)
+            else:
+                self._on_up(config, control, layer_key)
+
+    def release_all(self):
+        """Drop pending taps and chords and release held controls"""
+        with self._lock:
+            for pending in self._pending.values():
+                pending.timer.cancel()
+            for tap in self._taps.values():
+                if tap.timer:
+                    tap.timer.cancel()
+            self._pending.clear()
+            self._taps.clear()
+            self._swallow.clear()
+        self._next.release_all()
+
+    def _get_chords(self, config, control, layer_key):
+        return config.chords.get((control, layer_key), ()) if config else ()
+
+    def _is_delayed(self, config, control, layer_key):
+        return bool(self._get_chords(config, control, layer_key)) or \
+            _get_multi_tap(config, control, layer_key) is not None
+
+    def _on_down(self, config, control, layer_key):
+        chords = self._get_chords(config, control, layer_key)
+        if not chords:
+            self._tap_down(config, control, layer_key)
+            return
+
+        # Chord when a partner is still waiting
+        for partner, chord_action in chords:
+            pending = self._pending.get(partner)
+            if pending and not pending.released:
+                pending.timer.cancel()
+                del self._pending[partner]
+                self._swallow.update((control, partner))
+                execute_action(chord_action)
+                return
+
+        # Otherwise wait for a partner during the chord window
+        window = max(chord_action.window for _, chord_action in chords)
+        pending = _PendingDown(config, layer_key)
+        self._pending[control] = pending
+        pending.timer = self._scheduler.call_later(window / 1000.0, self._flush_pending, control, pending)
+
+    def _on_up(self, config, control, layer_key):
+        if control in self._swallow:
+            self._swallow.discard(control)
+            return
+        pending = self._pending.get(control)
+        if pending:
+            # Released before any partner: no chord is possible any more
+            pending.released = True
+            self._flush_pending(control, pending)
+            return
+        self._tap_up(control, layer_key, config)
+
+    def _flush_pending(self, control, pending):
+        with self._lock:
+            if self._pending.get(control) is not pending:
+                return
+            del self._pending[control]
+            pending.timer.cancel()
+            self._tap_down(pending.config, control, pending.layer_key)
+            if pending.released:
+                self._tap_up(control, pending.layer_key, pending.config)
+
+    def _tap_down(self, config, control, layer_key):
+        tap = self._taps.get(control)
+        if tap is None:
+            action = _get_multi_tap(config, control, layer_key)
+            if action is None:
+                self._next.on_event(config, control, layer_key, "down")
+                return
+            tap = self._taps[control] = _TapState(config, layer_key, action)
+
+        if tap.timer:
+            tap.timer.cancel()
+            tap.timer = None
+        tap.count += 1
+
+        # Resolve at once when no further tap can change the result
+        if tap.count >= tap.action.max_taps:
+            self._swallow.add(control)
+            self._resolve_taps(control, tap)
+
+    def _tap_up(self, control, layer_key, config):
+        tap = self._taps.get(control)
+        if tap is None:
+            self._next.on_event(config, control, layer_key, "up")
+            return
+        tap.timer = self._scheduler.call_later(tap.action.tap_window / 1000.0, self._resolve_taps, control, tap)
+
+    def _resolve_taps(self, control, tap):
+        with self._lock:
+            if self._taps.get(control) is not tap:
+                return
+            del self._taps[control]
+
+            if tap.count == 1:
+                execute_action(tap.action)
+                return
+            # Use the largest configured tap count not above the number of taps
+            for taps in sorted(tap.action.taps, reverse=True):
+                if taps <= tap.count:
+                    execute_action(tap.action.taps[taps])
+                    return
+            # Fewer taps than any configured count: the base action once per tap
+            for _ in range(tap.count):
+                execute_action(tap.action)
@@ -0,0 +1,68 @@
+"""
+Test setup for KommPad Configurator
+The daemon modules import each other by name, like when main.py runs
+"""
+
+import heapq
+import itertools
+import os
+import sys
+import time
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import metrics
+from scheduler import TimerHandle
+
+
+class ManualScheduler:
+    """Scheduler whose clock only moves when a test calls advance()"""
+
+    def __init__(self):
+        self.now = time.monotonic()
+        self._heap = []
+        self._counter = itertools.count()
+
+    def call_at(self, deadline, callback, *args):
+        handle = TimerHandle(deadline, callback, args)
+        heapq.heappush(self._heap, (deadline, next(self._counter), handle))
+        return handle
+
+    def call_later(self, delay, callback, *args):
+        return self.call_at(self.now + delay, callback, *args)
+
+    def pending(self):
+        return sum(1 for _, _, handle in self._heap if not handle.cancelled)
+
+    def advance(self, seconds):
+        """Move the clock and run the timers that are due, in deadline order"""
+        end = self.now + seconds
+        while self._heap and self._heap[0][0] <= end:
+            deadline, _, handle = heapq.heappop(self._heap)
+            self.now = max(self.now, deadline)
+            if not handle.cancelled:
+                handle.callback(*handle.args)
+        self.now = end
+
+
+@pytest.fixture
+def scheduler():
+    return ManualScheduler()
+
+
+@pytest.fixture
+def keyboard():
+    """Send key actions to a RecordingBackend"""
+    import button_handler
+    previous = button_handler.get_input_backend()
+    button_handler.set_input_backend("recording")
+    yield button_handler.get_keyboard()
+    button_handler.set_input_backend(previous)
+
+
+@pytest.fixture(autouse=True)
+def clean_metrics():
+    metrics.reset()
+    yield
+    metrics.reset()
@@ -0,0 +1,120 @@
+"""Tests of async_core: the asyncio event loop and the concurrent port search"""
+
+import asyncio
+import threading
+import types
+import pytest
+
+pytest.importorskip("serial")
+
+import async_core
+from async_core import AsyncioEventLoop, find_kommpad_async
+
+
+@pytest.fixture
+def loop():
+    loop = AsyncioEventLoop("TestAsyncio")
+    loop.start()
+    yield loop
+    loop.stop()
+
+
+def test_timers_run_in_deadline_order(loop):
+    order = []
+    done = threading.Event()
+    loop.call_later(0.03, order.append, 3)
+    loop.call_later(0.01, order.append, 1)
+    loop.call_later(0.02, order.append, 2)
+    loop.call_later(0.02, order.append, "cancelled").cancel()
+    loop.call_later(0.05, done.set)
+    assert done.wait(1.0)
+    assert order == [1, 2, 3]
+    assert loop.pending() == 0
+
+
+def test_cancel_on_the_loop_thread(loop):
+    fired = []
+    done = threading.Event()
+
+    def schedule_and_cancel():
+        loop.call_later(0.01, fired.append, "cancelled").cancel()
+        loop.call_later(0.02, done.set)
+    loop.call_soon(schedule_and_cancel)
+    assert done.wait(1.0)
+    assert fired == []
+    assert loop.pending() == 0
+
+
+def test_run_coroutine_calls_done_on_the_loop(loop):
+    result = []
+    done = threading.Event()
+
+    async def answer():
+        await asyncio.sleep(0.01)
+        return 42
+
+    def on_done(value):
+        result.append((value, loop.is_loop_thread()))
+        done.set()
+    loop.run_coroutine(answer(), on_done)
+    assert done.wait(1.0)
+    assert result == [(42, True)]
+
+
+class FakePort:
+    def __init__(self, name):
+        self.name = name
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def ports(monkeypatch):
+    """Fake serial ports: name -> (delay in seconds, answers 'KommPong')"""
+    ports = {}
+    opened = {}
+    cancelled = []
+
+    async def probe_port(port, baudrate=9600, timeout=None):
+        delay, answers = ports[port]
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            cancelled.append(port)
+            raise
+        if not answers:
+            return None
+        opened[port] = FakePort(port)
+        return opened[port]
+    monkeypatch.setattr(async_core, "probe_port", probe_port)
+    monkeypatch.setattr(async_core, "load_last_port", lambda: None)
+    monkeypatch.setattr(async_core.serial.tools.list_ports, "comports",
+                        lambda: [types.SimpleNamespace(device=name) for name in ports])
+    return ports, opened, cancelled
+
+
+def test_search_keeps_the_first_answer(ports):
+    ports, opened, cancelled = ports
+    ports.update({"/dev/ttyACM0": (0.05, True), "/dev/ttyACM1": (0.0, True),
+                  "/dev/ttyACM2": (0.0, False), "/dev/ttyACM3": (1.0, True)})
+    found = asyncio.run(find_kommpad_async())
+    assert found.name == "/dev/ttyACM1" and not found.closed
+    # The other probes are stopped, nothing they opened stays open
+    assert sorted(cancelled) == ["/dev/ttyACM0", "/dev/ttyACM3"]
+    assert [port.name for port in opened.values() if not port.closed] == ["/dev/ttyACM1"]
+
+
+def test_search_closes_losing_ports_that_answered_too(ports):
+    ports, opened, _ = ports
+    ports.update({"/dev/ttyACM0": (0.0, True), "/dev/ttyACM1": (0.0, True)})
+    found = asyncio.run(find_kommpad_async())
+    assert len(opened) == 2
+    assert [port for port in opened.values() if not port.closed] == [found]
+
+
+def test_search_without_a_kommpad(ports):
+    ports, _, _ = ports
+    ports.update({"/dev/ttyS0": (0.0, False), "/dev/ttyS1": (0.01, False)})
+    assert asyncio.run(find_kommpad_async()) is None
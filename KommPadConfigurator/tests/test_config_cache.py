@@ -0,0 +1,43 @@
+"""Tests of config_cache"""
+
+import os
+import metrics
+import config_cache
+from config_cache import get_artifact_path, load_artifact, save_artifact
+from config_model import compile_config, get_model_state
+
+RAW = {
+    "settings": {"MaxLayers": 3},
+    "mappings": {
+        "button1": {"layer0": {"action": "macro", "value": {"encoded": "+ctrl +c -c -ctrl"}}},
+        "button1+button2": {"layer0": {"action": "key", "value": "x"}},
+    },
+}
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / "config.json")
+    model = compile_config(RAW)
+    save_artifact(path, "hash1", model)
+    assert os.path.exists(get_artifact_path(path))
+    loaded = load_artifact(path, "hash1")
+    assert get_model_state(loaded) == get_model_state(model)
+    assert metrics.get_counter('config_artifact_hits') == 1
+
+
+def test_other_content_is_a_miss(tmp_path):
+    path = str(tmp_path / "config.json")
+    save_artifact(path, "hash1", compile_config(RAW))
+    assert load_artifact(path, "hash2") is None
+    with open(get_artifact_path(path), 'wb') as f:
+        f.write(b"not marshal data")
+    assert load_artifact(path, "hash1") is None
+    assert metrics.get_counter('config_artifact_misses') == 2
+
+
+def test_fingerprint_covers_the_compiler_modules():
+    directory = os.path.dirname(os.path.abspath(config_cache.__file__))
+    for name in ("config_store.py", "config_model.py", "device_detector.py", "layer_manager.py"):
+        assert name in config_cache._COMPILER_MODULES
+    for name in config_cache._COMPILER_MODULES:
+        assert os.path.exists(os.path.join(directory, name)), name
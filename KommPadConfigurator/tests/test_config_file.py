@@ -0,0 +1,75 @@
+"""Tests of config_file: atomic writes and ConfigWriter coalescing"""
+
+import json
+import os
+import threading
+import pytest
+import config_file
+import metrics
+from config_file import ConfigWriter, read_config, write_config
+
+
+@pytest.fixture
+def path(tmp_path):
+    path = tmp_path / "config.json"
+    path.write_text(json.dumps({"settings": {"MaxLayers": 4}}))
+    return str(path)
+
+
+def leftovers(path):
+    """Temporary files left next to the configuration"""
+    return [name for name in os.listdir(os.path.dirname(path)) if name.endswith(".tmp")]
+
+
+def test_write_replaces_the_file(path):
+    os.chmod(path, 0o640)
+    inode = os.stat(path).st_ino
+    write_config(path, {"settings": {"MaxLayers": 2}})
+    assert read_config(path) == {"settings": {"MaxLayers": 2}}
+    # A new file renamed over the old one, with the same mode
+    assert os.stat(path).st_ino != inode
+    assert os.stat(path).st_mode & 0o777 == 0o640
+    assert leftovers(path) == []
+    write_config(path, {"settings": {"MaxLayers": 2}})
+    assert metrics.get_counter('config_writes') == 1
+    assert metrics.get_counter('config_writes_skipped') == 1
+
+
+def test_failed_write_keeps_the_old_file(path, monkeypatch):
+    def fail(source, target):
+        raise OSError("disk full")
+    monkeypatch.setattr(config_file, "_replace", fail)
+    with pytest.raises(OSError):
+        write_config(path, {"settings": {"MaxLayers": 2}})
+    assert read_config(path) == {"settings": {"MaxLayers": 4}}
+    assert leftovers(path) == []
+
+
+def test_changes_are_coalesced(path):
+    writes = []
+    writer = ConfigWriter(path, delay=60)
+    writer.add_listener(writes.append)
+    for layers in (1, 2, 3):
+        writer.update(lambda config, layers=layers: config["settings"].update(MaxLayers=layers), coalesce=True)
+    writer.replace({"settings": {"MaxLayers": 5}, "mappings": {}}, coalesce=True)
+    assert read_config(path) == {"settings": {"MaxLayers": 4}}
+    # read() writes the pending changes first
+    assert writer.read() == {"settings": {"MaxLayers": 5}, "mappings": {}}
+    assert len(writes) == 1
+    assert metrics.get_counter('config_writes') == 1
+    assert metrics.get_counter('config_writes_coalesced') == 4
+
+
+def test_coalesced_changes_are_written_after_the_delay(path):
+    written = threading.Event()
+    writer = ConfigWriter(path, delay=0.05)
+    writer.add_listener(lambda when: written.set())
+    writer.update(lambda config: config["settings"].update(MaxLayers=2), coalesce=True)
+    assert written.wait(1.0)
+    assert read_config(path) == {"settings": {"MaxLayers": 2}}
+
+
+def test_update_without_coalescing_writes_now(path):
+    writer = ConfigWriter(path, delay=60)
+    writer.update(lambda config: config["settings"].update(MaxLayers=2))
+    assert read_config(path) == {"settings": {"MaxLayers": 2}}
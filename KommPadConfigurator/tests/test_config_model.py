@@ -0,0 +1,117 @@
+"""Tests of config_model.compile_config"""
+
+from config_model import compile_config, get_model_state, restore_model
+from macro_engine import decode_macro, get_macro_steps
+
+
+def compile_mapping(mapping, control="button1", layer="layer1"):
+    model = compile_config({"mappings": {control: {layer: mapping}}})
+    return model, model.mappings.get((control, layer))
+
+
+def test_key_mapping():
+    model, action = compile_mapping({"action": "key", "value": "a", "modifiers": ["ctrl"], "display": "A"})
+    assert not model.errors
+    assert action.action == "key"
+    assert action.value == "a"
+    assert action.modifiers == ["ctrl"]
+    assert action.display == "A"
+
+
+def test_invalid_mappings_are_left_out():
+    model, action = compile_mapping({"action": "jump", "value": "a"})
+    assert action is None
+    assert model.errors == ["mappings.button1.layer1: unknown action type 'jump'"]
+
+
+def test_function_needs_its_modifier():
+    model, action = compile_mapping({"action": "function", "value": "Open_App", "modifiers": []})
+    assert action is None
+    assert "Open_App needs the 'exe:' modifier" in model.errors[0]
+
+    model, action = compile_mapping({"action": "function", "value": "Layer_Set", "modifiers": ["layer:2"]})
+    assert not model.errors
+    assert action.params == {"layer": 2}
+
+
+def test_key_list_macro():
+    model, action = compile_mapping({"action": "macro", "value": ["ctrl", "c"]})
+    assert not model.errors
+    assert action.value == ["ctrl", "c"]
+
+
+def test_step_macros():
+    steps = [{"press": "ctrl"}, {"tap": "c"}, {"delay": 50}, {"release": "ctrl"},
+             {"repeat": 2, "steps": [{"type": "x"}]}, {"function": "Layer_Up"}]
+    for value in (steps, {"steps": steps}):
+        model, action = compile_mapping({"action": "macro", "value": value})
+        assert not model.errors
+        assert action.value == value
+
+
+def test_recorded_macro():
+    recorded = {"encoded": "+ctrl +c -c -ctrl 120+a 30-a"}
+    model, action = compile_mapping({"action": "macro", "value": recorded})
+    assert not model.errors
+    assert action.value == recorded
+    assert get_macro_steps(action.value) == decode_macro(recorded["encoded"])
+
+    # Recorded macros survive the compiled artifact
+    restored = restore_model(get_model_state(model))
+    assert restored.mappings[("button1", "layer1")].value == recorded
+
+
+def test_invalid_macros():
+    invalid = [
+        "ctrl+c",
+        {},
+        {"encoded": ""},
+        {"encoded": "+ctrl 50ctrl"},
+        {"steps": []},
+        [{"delay": -1}],
+        [{"repeat": 0, "steps": [{"tap": "a"}]}],
+        [{"repeat": 2}],
+        [{"jump": "a"}],
+        [{"function": "Open_App"}],
+        [42],
+    ]
+    for value in invalid:
+        model, action = compile_mapping({"action": "macro", "value": value})
+        assert action is None, value
+        assert len(model.errors) == 1, value
+
+
+def test_settings():
+    model = compile_config({"settings": {"MaxLayers": 2, "InputBackend": "uinput", "TextRate": 300,
+                                         "ActionLimits": {"Open_App": {"rate": 2}}}})
+    assert not model.errors
+    assert model.settings.max_layers == 2
+    assert model.settings.input_backend == "uinput"
+    assert model.settings.text_rate == 300
+    assert model.settings.action_limits == {"Open_App": {"rate": 2}}
+
+    model = compile_config({"settings": {"MaxLayers": 9}})
+    assert model.errors == ["settings.MaxLayers: expected 1 to 4, got 9"]
+
+
+def test_behavior_fields():
+    model, action = compile_mapping({
+        "action": "key", "value": "a", "hold": True, "repeat": {"delay": 300, "rate": 10},
+        "long_press": {"time": 700, "action": "key", "value": "b"},
+        "double_tap": {"action": "media", "value": "Media_Next"}, "tap_window": 150})
+    assert not model.errors
+    assert action.hold
+    assert (action.repeat.delay_ms, action.repeat.rate_hz) == (300, 10)
+    assert action.long_press.time_ms == 700
+    assert action.long_press.action.value == "b"
+    assert action.taps[2].value == "Media_Next"
+    assert (action.max_taps, action.tap_window) == (2, 150)
+
+
+def test_chords_are_indexed_by_both_controls():
+    model = compile_config({"mappings": {"button1+button2": {"layer0": {"action": "key", "value": "x"}}}})
+    assert not model.errors
+    (partner, chord), = model.chords[("button1", "layer0")]
+    assert partner == "button2"
+    assert model.chords[("button2", "layer0")] == (("button1", chord),)
+    assert ("button1+button2", "layer0") not in model.mappings
@@ -0,0 +1,72 @@
+"""Tests of config_store"""
+
+import json
+import metrics
+from config_model import compile_config
+from config_store import ConfigStore, classify_changes
+
+BASE = {
+    "device": {"name": "KommPad", "COM": "/dev/ttyACM0"},
+    "settings": {"MaxLayers": 4},
+    "mappings": {"button1": {"layer0": {"action": "key", "value": "a", "display": "A"}}},
+}
+
+
+def changed(**sections):
+    config = json.loads(json.dumps(BASE))
+    for name, update in sections.items():
+        config[name] = update(config.get(name))
+    return config
+
+
+def test_equal_configurations():
+    assert classify_changes(BASE, json.loads(json.dumps(BASE))) == set()
+
+
+def test_port_and_device():
+    assert classify_changes(BASE, changed(device=lambda d: dict(d, COM="COM3"))) == {"port"}
+    assert classify_changes(BASE, changed(device=lambda d: dict(d, name="Pad"))) == {"device"}
+
+
+def test_settings():
+    assert classify_changes(BASE, changed(settings=lambda s: {"MaxLayers": 2})) == {"settings"}
+
+
+def test_mappings_and_display_names():
+    def new_value(mappings):
+        mappings["button1"]["layer0"]["value"] = "b"
+        return mappings
+
+    def new_display(mappings):
+        mappings["button1"]["layer0"]["display"] = "B"
+        return mappings
+    assert classify_changes(BASE, changed(mappings=new_value)) == {"mappings"}
+    assert classify_changes(BASE, changed(mappings=new_display)) == {"mappings", "display_names"}
+
+
+def test_other_sections():
+    assert classify_changes(BASE, changed(notes=lambda _: "x")) == {"other"}
+
+
+def test_refresh_reports_the_changes(tmp_path):
+    path = tmp_path / "config.json"
+    path.write_text(json.dumps(BASE))
+    store = ConfigStore(str(path))
+    store.get()
+    assert store.refresh() is None  # Unchanged
+    path.write_text(json.dumps(changed(settings=lambda s: {"MaxLayers": 3})))
+    data, changes = store.refresh()
+    assert changes == {"settings"}
+    assert store.get() is data
+
+
+def test_replace_keeps_the_compiled_model(tmp_path):
+    path = tmp_path / "config.json"
+    path.write_text(json.dumps(BASE))
+    store = ConfigStore(str(path))
+    data = changed(settings=lambda s: {"MaxLayers": 2})
+    model = compile_config(data)
+    assert store.replace(data, model) == {"settings"}
+    assert store.get_model() is model
+    assert metrics.get_counter('config_compiles') == 0
+    assert json.loads(path.read_text()) == data
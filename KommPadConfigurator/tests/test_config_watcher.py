@@ -0,0 +1,63 @@
+"""Tests of config_watcher.ConfigWatcher in polling mode"""
+
+import threading
+import time
+import pytest
+import config_watcher
+import metrics
+from config_watcher import ConfigWatcher
+
+
+@pytest.fixture
+def config_path(tmp_path, monkeypatch):
+    # As on a system without inotify
+    monkeypatch.setattr(config_watcher, "_open_inotify", lambda directory: None)
+    path = tmp_path / "config.json"
+    path.write_text("{}")
+    return path
+
+
+def test_burst_on_the_loop_is_one_callback(config_path, scheduler):
+    calls = []
+    watcher = ConfigWatcher(str(config_path), lambda: calls.append(1), debounce=0.2, poll_interval=1.0)
+    watcher.attach(scheduler)
+    assert watcher.mode == "polling"
+    scheduler.advance(1.0)
+    assert calls == []
+
+    config_path.write_text('{"a": 1}')
+    scheduler.advance(1.0)
+    # Still changing when checked again after the debounce time
+    config_path.write_text('{"a": 12}')
+    scheduler.advance(0.2)
+    assert calls == []
+    scheduler.advance(0.2)
+    assert calls == [1]
+    assert metrics.get_counter('config_watch_events') == 2
+
+    scheduler.advance(5.0)
+    assert calls == [1]
+    watcher.detach()
+    assert scheduler.pending() == 0
+
+
+def test_burst_on_a_thread_is_one_callback(config_path):
+    called = threading.Event()
+    calls = []
+
+    def callback():
+        calls.append(1)
+        called.set()
+    watcher = ConfigWatcher(str(config_path), callback, debounce=0.1, poll_interval=0.02)
+    watcher.start()
+    try:
+        time.sleep(0.05)
+        for index in range(5):
+            config_path.write_text('{"a": %s}' % ("1" * (index + 1)))
+            time.sleep(0.01)
+        assert called.wait(1.0)
+        time.sleep(0.2)
+        assert watcher.mode == "polling"
+        assert calls == [1]
+    finally:
+        watcher.stop()
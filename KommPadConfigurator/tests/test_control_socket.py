@@ -0,0 +1,79 @@
+"""Tests of control_socket: message framing and the server"""
+
+import queue
+import struct
+import threading
+import pytest
+from control_socket import ControlClient, ControlServer, MAX_MESSAGE_SIZE, decode_messages, encode_message
+
+
+def test_message_round_trip():
+    message = {"cmd": "trigger", "control": "button1", "text": "Grüße 🎛️"}
+    data = encode_message(message)
+    assert struct.unpack('>I', data[:4])[0] == len(data) - 4
+    assert decode_messages(bytearray(data)) == [message]
+
+
+def test_partial_messages_stay_in_the_buffer():
+    data = encode_message({"cmd": "status"}) + encode_message({"cmd": "ping"})
+    buffer = bytearray()
+    received = []
+    for index in range(len(data)):
+        buffer += data[index:index + 1]
+        received.extend(decode_messages(buffer))
+    assert received == [{"cmd": "status"}, {"cmd": "ping"}]
+    assert buffer == bytearray()
+
+
+def test_oversized_and_invalid_messages():
+    with pytest.raises(ValueError):
+        decode_messages(bytearray(struct.pack('>I', MAX_MESSAGE_SIZE + 1)))
+    with pytest.raises(ValueError):
+        decode_messages(bytearray(struct.pack('>I', 3) + b"{x}"))
+
+
+def serve(tmp_path, call_soon=None):
+    server = ControlServer(str(tmp_path / "kommpad.sock"), call_soon=call_soon)
+    server.register("echo", lambda request: {"echo": request.get("value"), "thread": threading.current_thread().name})
+    server.register("fail", lambda request: 1 / 0)
+    assert server.start()
+    return server
+
+
+def test_server_replies(tmp_path):
+    server = serve(tmp_path)
+    try:
+        with ControlClient(server.path) as client:
+            assert client.request("ping") == {"ok": True}
+            assert client.request("echo", value=3)["echo"] == 3
+            assert client.request("fail") == {"ok": False, "error": "division by zero"}
+            assert client.request("nope") == {"ok": False, "error": "unknown command: nope"}
+    finally:
+        server.stop()
+
+
+def test_handlers_run_where_call_soon_runs_them(tmp_path):
+    # Stand-in for the event loop: one thread running the callbacks in order
+    calls = queue.Queue()
+
+    def run():
+        while True:
+            callback, args = calls.get()
+            if callback is None:
+                return
+            callback(*args)
+    worker = threading.Thread(target=run, name="TestLoop")
+    worker.start()
+    server = serve(tmp_path, call_soon=lambda callback, *args: calls.put((callback, args)))
+    try:
+        with ControlClient(server.path) as client:
+            # Several requests in one write are answered in order
+            client.sock.sendall(b"".join(encode_message({"cmd": "echo", "value": index}) for index in range(5)))
+            replies = [client.receive() for _ in range(5)]
+            assert [reply["echo"] for reply in replies] == list(range(5))
+            assert {reply["thread"] for reply in replies} == {"TestLoop"}
+            assert client.request("subscribe") == {"ok": True}
+    finally:
+        server.stop()
+        calls.put((None, ()))
+        worker.join()
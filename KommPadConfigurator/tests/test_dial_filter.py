@@ -0,0 +1,49 @@
+"""Tests of dial_filter.DialFilter"""
+
+from dial_filter import DialFilter, RAW_MAX, get_level_table
+
+
+def test_first_sample_reports_the_level():
+    dials = DialFilter()
+    assert dials.update("dial1", 512) == 50
+    assert dials.update("dial2", RAW_MAX) == 100
+
+
+def test_noise_inside_the_deadband_is_dropped():
+    dials = DialFilter(smoothing=1.0, deadband=4)
+    dials.update("dial1", 500)
+    assert [dials.update("dial1", raw) for raw in (501, 499, 502, 498, 500)] == [None] * 5
+
+
+def test_same_level_is_not_reported_again():
+    dials = DialFilter(smoothing=1.0, deadband=0)
+    assert dials.update("dial1", 0) == 0
+    assert dials.update("dial1", 3) is None  # Still 0%
+    assert dials.update("dial1", 20) == 2
+
+
+def test_smoothing_and_snap_on_large_jumps():
+    dials = DialFilter(smoothing=0.5, deadband=0)
+    dials.update("dial1", 0)
+    assert dials.update("dial1", 40) == 2    # Averaged to 20
+    assert dials.update("dial1", RAW_MAX) == 100  # A fast turn is not smoothed
+
+
+def test_new_range_always_reports():
+    dials = DialFilter()
+    dials.update("dial1", 512)
+    assert dials.update("dial1", 512, 0, 10) == 5
+    assert dials.update("dial1", 512, 0, 10) is None
+
+
+def test_configure_limits_the_values():
+    dials = DialFilter()
+    dials.configure(smoothing=5, deadband=-3)
+    assert (dials.smoothing, dials.deadband) == (1.0, 0)
+
+
+def test_level_table_covers_every_raw_position():
+    table = get_level_table(20, 80)
+    assert len(table) == RAW_MAX + 1
+    assert (table[0], table[RAW_MAX]) == (20, 80)
+    assert list(table) == sorted(table)
@@ -0,0 +1,76 @@
+"""Tests of dispatch_limiter.DispatchLimiter"""
+
+import metrics
+from config_model import compile_config
+from dispatch_limiter import DispatchLimiter, TokenBucket
+
+
+class Collector:
+    """Next stage that keeps the forwarded events"""
+
+    def __init__(self):
+        self.events = []
+        self.released = False
+
+    def on_event(self, config, control, layer_key, state, event_ms=None):
+        self.events.append((control, state))
+
+    def release_all(self):
+        self.released = True
+
+
+CONFIG = compile_config({"mappings": {
+    "button1": {"layer0": {"action": "key", "value": "a", "debounce": 50}},
+    "button2": {"layer0": {"action": "function", "value": "Open_App", "modifiers": ["exe:editor"]}},
+    "button3": {"layer0": {"action": "key", "value": "c"}},
+}})
+
+
+def test_debounce_drops_the_press_and_its_release():
+    collector = Collector()
+    limiter = DispatchLimiter(collector)
+    limiter.on_event(CONFIG, "button1", "layer0", "down", 1000)
+    limiter.on_event(CONFIG, "button1", "layer0", "up", 1010)
+    limiter.on_event(CONFIG, "button1", "layer0", "down", 1030)  # Bounce
+    limiter.on_event(CONFIG, "button1", "layer0", "up", 1035)
+    limiter.on_event(CONFIG, "button1", "layer0", "down", 1100)
+    assert collector.events == [("button1", "down"), ("button1", "up"), ("button1", "down")]
+    assert metrics.get_counter('dispatch_suppressed_debounce') == 1
+
+
+def test_rate_limit_of_an_action_type():
+    collector = Collector()
+    limiter = DispatchLimiter(collector, {"Open_App": {"debounce": 0, "rate": 1, "burst": 2}})
+    for event_ms in (1000, 1100, 1200, 2200):
+        limiter.on_event(CONFIG, "button2", "layer0", None, event_ms)
+    # The burst is used up by the first two, the fourth comes after a refill
+    assert len(collector.events) == 3
+    assert metrics.get_counter('dispatch_suppressed_rate_limit') == 1
+
+
+def test_configured_limits_replace_the_defaults():
+    collector = Collector()
+    limiter = DispatchLimiter(collector, {"key": {"debounce": 100}})
+    limiter.on_event(CONFIG, "button3", "layer0", None, 1000)
+    limiter.on_event(CONFIG, "button3", "layer0", None, 1050)
+    limiter.configure({})
+    limiter.on_event(CONFIG, "button3", "layer0", None, 1100)
+    assert collector.events == [("button3", None), ("button3", None)]
+
+
+def test_unmapped_controls_pass():
+    collector = Collector()
+    limiter = DispatchLimiter(collector)
+    limiter.on_event(CONFIG, "button9", "layer0", None, 1000)
+    limiter.on_event(CONFIG, "button9", "layer0", None, 1001)
+    limiter.release_all()
+    assert len(collector.events) == 2
+    assert collector.released
+
+
+def test_token_bucket_refills_at_its_rate():
+    bucket = TokenBucket(rate=2, burst=2)
+    assert bucket.take(0) and bucket.take(0)
+    assert not bucket.take(100)
+    assert bucket.take(600)  # 0.5 s at 2 tokens per second
+    assert not bucket.take(600)
@@ -0,0 +1,64 @@
+"""Tests of encoder_accelerator"""
+
+from config_model import compile_config
+from encoder_accelerator import EncoderAccelerator, get_multiplier
+
+CONFIG = compile_config({"mappings": {
+    "encoder1": {"layer0": {"action": "key", "value": "a", "acceleration": True}},
+    "encoder3": {"layer0": {"action": "key", "value": "b",
+                            "acceleration": {"slow": 200, "fast": 50, "max": 4, "curve": 1}}},
+    "button1": {"layer0": {"action": "key", "value": "c"}},
+}})
+
+DEFAULT = CONFIG.get_action("encoder1", "layer0").acceleration
+LINEAR = CONFIG.get_action("encoder3", "layer0").acceleration
+
+
+class NextStage:
+    def __init__(self):
+        self.events = []
+
+    def on_event(self, config, control, layer_key, state, event_ms=None):
+        self.events.append((control, state))
+
+    def release_all(self):
+        pass
+
+
+def test_multiplier_curve():
+    assert get_multiplier(None, 10) == 1
+    assert get_multiplier(DEFAULT, None) == 1
+    # Slow turns are not accelerated, quick spins get the maximum
+    assert get_multiplier(DEFAULT, 150) == 1
+    assert get_multiplier(DEFAULT, 500) == 1
+    assert get_multiplier(DEFAULT, 20) == 8
+    assert get_multiplier(DEFAULT, 5) == 8
+    # Half speed: 1 + 7 * 0.5 ** 1.5
+    assert get_multiplier(DEFAULT, 85) == 3
+    assert get_multiplier(LINEAR, 140) == 2
+    assert get_multiplier(LINEAR, 80) == 3
+
+
+def test_multiplier_grows_with_speed():
+    multipliers = [get_multiplier(DEFAULT, interval) for interval in range(200, 0, -5)]
+    assert multipliers == sorted(multipliers)
+    assert multipliers[0] == 1 and multipliers[-1] == 8
+
+
+def test_rotation_is_one_batched_action(keyboard):
+    next_stage = NextStage()
+    accelerator = EncoderAccelerator(next_stage)
+    for event_ms in (1000, 1010, 1020):
+        accelerator.on_event(CONFIG, "encoder1", "layer0", None, event_ms)
+    assert keyboard.batches == 3
+    assert [key for kind, key in keyboard.events if kind == "press"] == ["a"] * (1 + 8 + 8)
+    assert next_stage.events == []
+
+
+def test_other_events_go_to_the_next_stage(keyboard):
+    next_stage = NextStage()
+    accelerator = EncoderAccelerator(next_stage)
+    accelerator.on_event(CONFIG, "button1", "layer0", "down", 1000)
+    accelerator.on_event(CONFIG, "encoder2", "layer0", None, 1000)
+    assert next_stage.events == [("button1", "down"), ("encoder2", None)]
+    assert keyboard.events == []
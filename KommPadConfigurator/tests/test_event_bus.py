@@ -0,0 +1,67 @@
+"""Tests of event_bus"""
+
+import event_bus
+import metrics
+from event_bus import CONFIG_CHANGED, INPUT_EVENT, LAYER_CHANGED, EventBus, EventRecorder
+
+
+def count_events(monkeypatch):
+    """Count the Event objects built from now on"""
+    built = []
+
+    class CountedEvent(event_bus.Event):
+        __slots__ = ()
+
+        def __init__(self, event_type, fields):
+            built.append(event_type)
+            super().__init__(event_type, fields)
+    monkeypatch.setattr(event_bus, "Event", CountedEvent)
+    return built
+
+
+def test_no_event_without_subscribers(monkeypatch):
+    built = count_events(monkeypatch)
+    bus = EventBus()
+    layers = []
+    subscription = bus.subscribe(lambda event: layers.append(event.layer), (LAYER_CHANGED,))
+    assert not bus.publish(INPUT_EVENT, control="button1", state="down", value=None, layer=0)
+    assert not bus.has_subscribers(INPUT_EVENT)
+    assert bus.publish(LAYER_CHANGED, layer=2)
+    assert built == [LAYER_CHANGED]
+    assert layers == [2]
+    subscription.unsubscribe()
+    assert not bus.publish(LAYER_CHANGED, layer=3)
+    assert built == [LAYER_CHANGED]
+
+
+def test_subscribers_of_all_types():
+    bus = EventBus()
+    recorder = EventRecorder(bus)
+    assert bus.has_subscribers(INPUT_EVENT)
+    bus.publish(LAYER_CHANGED, layer=1)
+    bus.publish(CONFIG_CHANGED, changes=["settings"])
+    assert [event.to_dict()['event'] for event in recorder.get_events()] == [LAYER_CHANGED, CONFIG_CHANGED]
+    recorder.close()
+    assert not bus.has_subscribers(INPUT_EVENT)
+
+
+def test_failing_subscriber_does_not_stop_delivery():
+    bus = EventBus()
+    received = []
+    bus.subscribe(lambda event: 1 / 0, (LAYER_CHANGED,))
+    bus.subscribe(received.append, (LAYER_CHANGED,))
+    bus.publish(LAYER_CHANGED, layer=1)
+    assert len(received) == 1
+
+
+def test_full_queue_drops_the_oldest():
+    bus = EventBus()
+    queue = bus.subscribe_queue((LAYER_CHANGED,), maxsize=3)
+    for layer in range(5):
+        bus.publish(LAYER_CHANGED, layer=layer)
+    assert [queue.get(0).layer for _ in range(3)] == [2, 3, 4]
+    assert queue.get(0.01) is None
+    assert queue.dropped == 2
+    assert metrics.get_counter('event_queue_dropped') == 2
+    queue.unsubscribe()
+    assert not bus.publish(LAYER_CHANGED, layer=5)
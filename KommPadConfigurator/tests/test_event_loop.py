@@ -0,0 +1,101 @@
+"""Tests of event_loop.EventLoop"""
+
+import socket
+import threading
+import time
+import pytest
+from config_watcher import ConfigWatcher
+from event_loop import EventLoop
+
+# Wakeups allowed while idle (slack for the setup right before the window)
+MAX_IDLE_WAKEUPS = 2
+
+
+@pytest.fixture
+def loop():
+    loop = EventLoop("TestLoop")
+    loop.start()
+    yield loop
+    loop.stop()
+
+
+def run_on_loop(loop, func, *args):
+    """Run a function on the loop thread and wait for it"""
+    done = threading.Event()
+
+    def call():
+        func(*args)
+        done.set()
+    loop.call_soon(call)
+    assert done.wait(1.0)
+
+
+def test_idle_loop_does_not_wake_up(loop, tmp_path):
+    path = tmp_path / "config.json"
+    path.write_text("{}")
+    # Stand-in for the serial port: a connected socket nobody writes to
+    device, host = socket.socketpair()
+    callbacks = []
+    watcher = ConfigWatcher(str(path), lambda: callbacks.append("config"))
+
+    def setup():
+        loop.add_reader(host.fileno(), lambda: callbacks.append(host.recv(4096)))
+        watcher.attach(loop)
+        # Timers far away and cancelled ones don't wake the loop either
+        loop.call_later(3600, callbacks.append, "timer")
+        loop.call_later(0.05, callbacks.append, "cancelled").cancel()
+    try:
+        run_on_loop(loop, setup)
+        time.sleep(0.1)
+
+        wakeups = loop.wakeups_per_minute()
+        time.sleep(0.5)
+        assert loop.wakeups_per_minute() - wakeups <= MAX_IDLE_WAKEUPS
+        assert callbacks == []
+    finally:
+        run_on_loop(loop, watcher.detach)
+        run_on_loop(loop, loop.remove_reader, host.fileno())
+        device.close()
+        host.close()
+
+
+def test_reader_wakes_the_loop(loop):
+    device, host = socket.socketpair()
+    received = threading.Event()
+
+    def on_readable():
+        host.recv(4096)
+        received.set()
+    try:
+        run_on_loop(loop, loop.add_reader, host.fileno(), on_readable)
+        device.send(b"button1 layer0 d\n")
+        assert received.wait(1.0)
+    finally:
+        run_on_loop(loop, loop.remove_reader, host.fileno())
+        device.close()
+        host.close()
+
+
+def test_timers_run_in_deadline_order(loop):
+    order = []
+    done = threading.Event()
+    loop.call_later(0.03, order.append, 3)
+    loop.call_later(0.01, order.append, 1)
+    loop.call_later(0.02, order.append, 2)
+    loop.call_later(0.02, order.append, "cancelled").cancel()
+    loop.call_later(0.05, done.set)
+    assert done.wait(1.0)
+    assert order == [1, 2, 3]
+    assert loop.pending() == 0
+
+
+def test_run_in_thread_calls_done_on_the_loop(loop):
+    result = []
+    done = threading.Event()
+
+    def on_done(value):
+        result.append((value, loop.is_loop_thread()))
+        done.set()
+    loop.run_in_thread(lambda: threading.current_thread().name != "TestLoop", done=on_done)
+    assert done.wait(1.0)
+    assert result == [(True, True)]
@@ -0,0 +1,37 @@
+"""Tests of event_timing"""
+
+import metrics
+from event_timing import ClockOffsetEstimator, EventTracker
+
+
+def test_offset_is_the_window_minimum():
+    clock = ClockOffsetEstimator(window=3)
+    assert clock.update(0, 105) == 105
+    assert clock.update(10, 112) == 102
+    assert clock.update(20, 130) == 102
+    assert clock.update(30, 140) == 102
+    # The fastest sample left the window
+    assert clock.update(40, 150) == 110
+
+
+def test_latency_above_the_fastest_event():
+    tracker = EventTracker()
+    assert tracker.on_event(1000, 1, 5002.0) == 0
+    assert tracker.on_event(1010, 2, 5015.0) == 3
+    assert tracker.on_event(None, None, 5020.0) is None
+
+
+def test_dropped_events_wrap_around():
+    tracker = EventTracker()
+    tracker.on_event(1000, 254, 2000.0)
+    tracker.on_event(1001, 255, 2001.0)
+    tracker.on_event(1002, 2, 2002.0)  # 0 and 1 were lost
+    assert metrics.get_counter('events_dropped') == 2
+
+
+def test_device_reboot_resets_the_clock():
+    tracker = EventTracker()
+    tracker.on_event(50000, 10, 1000.0)
+    assert tracker.on_event(100, 0, 2000.0) == 0
+    assert tracker.last_seq == 0
+    assert metrics.get_counter('events_dropped') == 0
@@ -0,0 +1,76 @@
+"""Tests of hold_engine.HoldEngine"""
+
+from button_handler import get_key_from_string
+from config_model import compile_config
+from hold_engine import HoldEngine
+
+CONFIG = compile_config({"mappings": {
+    "button1": {"layer0": {"action": "key", "value": "a"}},
+    "button2": {"layer0": {"action": "key", "value": "b", "modifiers": ["shift"], "hold": True}},
+    "button3": {"layer0": {"action": "key", "value": "c", "repeat": {"delay": 500, "rate": 10}}},
+    "button4": {"layer0": {"action": "key", "value": "d",
+                           "long_press": {"time": 400, "action": "key", "value": "e"}}},
+}})
+
+
+def taps(keyboard):
+    """Keys of the recorded presses"""
+    return [key for kind, key in keyboard.events if kind == "press"]
+
+
+def test_plain_action_runs_on_press(keyboard, scheduler):
+    engine = HoldEngine(scheduler)
+    engine.on_event(CONFIG, "button1", "layer0", "down")
+    engine.on_event(CONFIG, "button1", "layer0", "up")
+    engine.on_event(CONFIG, "button1", "layer0", None)
+    assert keyboard.events == [("press", "a"), ("release", "a")] * 2
+
+
+def test_hold_keeps_the_keys_down(keyboard, scheduler):
+    shift = get_key_from_string("shift")
+    engine = HoldEngine(scheduler)
+    engine.on_event(CONFIG, "button2", "layer0", "down")
+    assert keyboard.events == [("press", shift), ("press", "b")]
+    scheduler.advance(2.0)
+    engine.on_event(CONFIG, "button2", "layer0", "up")
+    assert keyboard.events[2:] == [("release", "b"), ("release", shift)]
+
+
+def test_repeat_after_the_delay_at_the_rate(keyboard, scheduler):
+    engine = HoldEngine(scheduler)
+    engine.on_event(CONFIG, "button3", "layer0", "down")
+    assert taps(keyboard) == ["c"]
+    scheduler.advance(0.45)
+    assert taps(keyboard) == ["c"]
+    scheduler.advance(0.38)  # Repeats at 0.5, 0.6, 0.7 and 0.8 s
+    assert taps(keyboard) == ["c"] * 5
+    engine.on_event(CONFIG, "button3", "layer0", "up")
+    scheduler.advance(1.0)
+    assert taps(keyboard) == ["c"] * 5
+    assert scheduler.pending() == 0
+
+
+def test_long_press(keyboard, scheduler):
+    engine = HoldEngine(scheduler)
+    # Short press: the normal action on release
+    engine.on_event(CONFIG, "button4", "layer0", "down")
+    scheduler.advance(0.2)
+    assert taps(keyboard) == []
+    engine.on_event(CONFIG, "button4", "layer0", "up")
+    assert taps(keyboard) == ["d"]
+    # Long press: the long-press action, nothing on release
+    engine.on_event(CONFIG, "button4", "layer0", "down")
+    scheduler.advance(0.5)
+    engine.on_event(CONFIG, "button4", "layer0", "up")
+    assert taps(keyboard) == ["d", "e"]
+
+
+def test_release_all_never_leaves_keys_stuck(keyboard, scheduler):
+    engine = HoldEngine(scheduler)
+    engine.on_event(CONFIG, "button2", "layer0", "down")
+    engine.on_event(CONFIG, "button3", "layer0", "down")
+    engine.release_all()
+    presses = sum(1 for kind, _ in keyboard.events if kind == "press")
+    releases = sum(1 for kind, _ in keyboard.events if kind == "release")
+    assert presses == releases
+    assert scheduler.pending() == 0
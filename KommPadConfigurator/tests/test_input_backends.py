@@ -0,0 +1,124 @@
+"""Tests of input_backends, with python-evdev replaced by a fake"""
+
+import types
+import pytest
+import input_backends
+from input_backends import RecordingBackend, UinputBackend, create_backend
+
+EV_SYN, EV_KEY = 0, 1
+KEY_1, KEY_A, KEY_C, KEY_LEFTCTRL, KEY_LEFTSHIFT, KEY_F5 = 2, 30, 46, 29, 42, 63
+
+FAKE_ECODES = types.SimpleNamespace(
+    EV_SYN=EV_SYN, EV_KEY=EV_KEY, SYN_REPORT=0,
+    KEY_1=KEY_1, KEY_A=KEY_A, KEY_C=KEY_C, KEY_LEFTCTRL=KEY_LEFTCTRL,
+    KEY_LEFTSHIFT=KEY_LEFTSHIFT, KEY_F5=KEY_F5,
+    keys={KEY_1: 'KEY_1', KEY_A: 'KEY_A', KEY_C: 'KEY_C', KEY_LEFTCTRL: 'KEY_LEFTCTRL',
+          KEY_LEFTSHIFT: 'KEY_LEFTSHIFT', KEY_F5: 'KEY_F5'},
+)
+
+
+class FakeUInput:
+    def __init__(self, events, name=None):
+        self.fd = -1
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class NoPynput:
+    name = "pynput"
+
+    def __init__(self):
+        raise ImportError("No module named 'pynput'")
+
+
+@pytest.fixture
+def writes(monkeypatch):
+    """Install the fake evdev and collect the buffers written to the device"""
+    writes = []
+
+    def write(fd, data):
+        assert fd == -1
+        writes.append(data)
+        return len(data)
+    monkeypatch.setattr(input_backends, "evdev", types.SimpleNamespace(UInput=FakeUInput))
+    monkeypatch.setattr(input_backends, "ecodes", FAKE_ECODES)
+    monkeypatch.setattr(input_backends.os, "write", write)
+    monkeypatch.setattr(input_backends, "PynputBackend", NoPynput)
+    monkeypatch.setitem(input_backends.BACKENDS, "pynput", NoPynput)
+    return writes
+
+
+def decode(data):
+    """Key events of a written buffer as (code, value), "syn" for a report"""
+    events = []
+    for _, _, kind, code, value in input_backends._INPUT_EVENT.iter_unpack(data):
+        events.append("syn" if kind == EV_SYN else (code, value))
+    return events
+
+
+def test_tap_is_one_write(writes):
+    backend = UinputBackend()
+    backend.tap(["ctrl", "c"], count=2)
+    assert len(writes) == 1
+    assert decode(writes[0]) == [
+        (KEY_LEFTCTRL, 1), "syn",
+        (KEY_C, 1), "syn", (KEY_C, 0), "syn",
+        (KEY_C, 1), "syn", (KEY_C, 0), "syn",
+        (KEY_LEFTCTRL, 0), "syn",
+    ]
+
+
+def test_shifted_keys_hold_shift(writes):
+    backend = UinputBackend()
+    backend.tap(["ctrl", "!"])
+    assert decode(writes[0]) == [
+        (KEY_LEFTCTRL, 1), "syn",
+        (KEY_LEFTSHIFT, 1), (KEY_1, 1), "syn", (KEY_1, 0), (KEY_LEFTSHIFT, 0), "syn",
+        (KEY_LEFTCTRL, 0), "syn",
+    ]
+    writes.clear()
+    backend.press("A")
+    backend.release("A")
+    assert [decode(data) for data in writes] == [
+        [(KEY_LEFTSHIFT, 1), (KEY_A, 1), "syn"],
+        [(KEY_A, 0), (KEY_LEFTSHIFT, 0), "syn"],
+    ]
+
+
+def test_unmapped_key_sends_nothing(writes):
+    backend = UinputBackend()
+    backend.tap(["ctrl", "no_such_key"])
+    backend.tap(["ctrl", "é"])
+    assert writes == []
+
+
+def test_typed_text_is_batched(writes):
+    backend = UinputBackend(RecordingBackend())
+    backend.type("a1é")
+    assert len(writes) == 1
+    assert decode(writes[0]) == [(KEY_A, 1), "syn", (KEY_A, 0), "syn", (KEY_1, 1), "syn", (KEY_1, 0), "syn"]
+    assert backend._fallback.events == [('type', 'é')]
+
+
+def test_create_backend_by_name(writes):
+    assert isinstance(create_backend("recording"), RecordingBackend)
+    assert isinstance(create_backend("uinput", strict=True), UinputBackend)
+
+
+def test_create_backend_falls_back(writes):
+    assert isinstance(create_backend(), UinputBackend)
+    assert isinstance(create_backend("bogus"), UinputBackend)
+    with pytest.raises(ValueError):
+        create_backend("bogus", strict=True)
+    with pytest.raises(ImportError):
+        create_backend("pynput", strict=True)
+
+
+def test_recording_is_never_a_fallback(writes, monkeypatch):
+    monkeypatch.setattr(input_backends, "evdev", None)
+    with pytest.raises(ImportError):
+        create_backend("pynput")
+    with pytest.raises(RuntimeError):
+        create_backend("uinput")
@@ -0,0 +1,103 @@
+"""Tests of launcher command resolution and spawning, with subprocess replaced by a fake"""
+
+import os
+import pytest
+import launcher
+import metrics
+
+pytestmark = pytest.mark.skipif(os.name == 'nt', reason="Windows always starts through the shell")
+
+
+class FakePopen:
+    def __init__(self, args, shell=False, **kwargs):
+        self.args = args
+        self.shell = shell
+        self.kwargs = kwargs
+
+
+class FakeReaper:
+    def __init__(self):
+        self.processes = []
+
+    def add(self, process):
+        self.processes.append(process)
+
+
+@pytest.fixture
+def which(monkeypatch):
+    """Executables on the fake PATH, and the names looked up"""
+    installed = {"firefox": "/usr/bin/firefox"}
+    lookups = []
+
+    def fake_which(name):
+        lookups.append(name)
+        return installed.get(name)
+    monkeypatch.setattr(launcher.shutil, "which", fake_which)
+    launcher.reset()
+    yield installed, lookups
+    launcher.reset()
+
+
+@pytest.fixture
+def spawned(monkeypatch):
+    reaper = FakeReaper()
+    monkeypatch.setattr(launcher.subprocess, "Popen", FakePopen)
+    monkeypatch.setattr(launcher, "_get_reaper", lambda: reaper)
+    return reaper.processes
+
+
+def test_absolute_path(which, tmp_path):
+    app = tmp_path / "app"
+    app.write_text("")
+    assert launcher.resolve_command(str(app)) == ([str(app)], False)
+
+
+def test_executable_is_resolved_once(which):
+    _, lookups = which
+    assert launcher.resolve_command("firefox --private-window") == (["/usr/bin/firefox", "--private-window"], False)
+    assert launcher.resolve_command("firefox --private-window") == (["/usr/bin/firefox", "--private-window"], False)
+    assert lookups == ["firefox"]
+
+
+def test_not_found_is_not_cached(which):
+    installed, lookups = which
+    assert launcher.resolve_command("code") == (None, False)
+    installed["code"] = "/usr/bin/code"
+    assert launcher.resolve_command("code") == (["/usr/bin/code"], False)
+    assert lookups == ["code", "code"]
+
+
+def test_shell_fallback(which):
+    # Shell characters, even when the executable is found
+    assert launcher.resolve_command("firefox $HOME/page.html") == ("firefox $HOME/page.html", True)
+    assert launcher.resolve_command("cd ~/src && make") == ("cd ~/src && make", True)
+    # Command lines the shell has to split
+    assert launcher.resolve_command("GDK_SCALE=2 myapp") == ("GDK_SCALE=2 myapp", True)
+
+
+def test_launch_app_spawns_without_a_shell(which, spawned):
+    assert launcher.launch_app("firefox")
+    process, = spawned
+    assert process.args == ["/usr/bin/firefox"]
+    assert not process.shell
+    assert process.kwargs["start_new_session"]
+    assert launcher.launch_app("GDK_SCALE=2 firefox")
+    assert spawned[1].args == "GDK_SCALE=2 firefox" and spawned[1].shell
+
+
+def test_launch_app_not_found(which, spawned):
+    assert not launcher.launch_app("code")
+    assert spawned == []
+    assert metrics.get_counter('launch_errors') == 1
+
+
+def test_failed_start_forgets_the_command(which, monkeypatch):
+    _, lookups = which
+
+    def fail(*args, **kwargs):
+        raise PermissionError("denied")
+    monkeypatch.setattr(launcher.subprocess, "Popen", fail)
+    assert not launcher.launch_app("firefox")
+    assert not launcher.launch_app("firefox")
+    assert lookups == ["firefox", "firefox"]
+    assert metrics.get_counter('launch_errors') == 2
@@ -0,0 +1,73 @@
+"""Tests of macro_engine.MacroEngine and the recorded macro format"""
+
+from input_backends import RecordingBackend
+from macro_engine import MacroEngine, decode_macro, get_macro_steps, is_timed_macro
+
+STEPS = [
+    {"press": "ctrl"},
+    {"tap": "c"},
+    {"delay": 100},
+    {"release": "ctrl"},
+    {"repeat": 2, "steps": [{"type": "ab"}, {"delay": 50}]},
+    {"function": "Layer_Up", "modifiers": []},
+]
+
+
+def create_engine(scheduler):
+    keyboard = RecordingBackend()
+    functions = []
+    engine = MacroEngine(keyboard, lambda key: key, lambda name, modifiers: functions.append(name), scheduler)
+    return engine, keyboard, functions
+
+
+def test_decode_macro():
+    assert decode_macro("+ctrl +c -c -ctrl 120+a -a") == (
+        {"press": "ctrl"}, {"press": "c"}, {"release": "c"}, {"release": "ctrl"},
+        {"delay": 120}, {"press": "a"}, {"release": "a"},
+    )
+    # Invalid tokens are skipped
+    assert decode_macro("+a 12 x5 -a") == ({"press": "a"}, {"release": "a"})
+    assert get_macro_steps({"encoded": "+a -a"}) == ({"press": "a"}, {"release": "a"})
+    assert is_timed_macro({"encoded": "+a -a"})
+    assert not is_timed_macro(["ctrl", "c"])
+
+
+def test_timed_playback(scheduler):
+    engine, keyboard, functions = create_engine(scheduler)
+    assert engine.play("macro", STEPS)
+    scheduler.advance(0.01)
+    assert keyboard.events == [("press", "ctrl"), ("press", "c"), ("release", "c")]
+    scheduler.advance(0.1)
+    assert keyboard.events[3:] == [("release", "ctrl"), ("type", "ab")]
+    scheduler.advance(0.05)
+    assert keyboard.events[5:] == [("type", "ab")]
+    assert functions == []
+    scheduler.advance(0.05)
+    assert functions == ["Layer_Up"]
+    assert not engine.is_playing("macro")
+    assert scheduler.pending() == 0
+
+
+def test_play_again_cancels(scheduler):
+    engine, keyboard, functions = create_engine(scheduler)
+    engine.play("macro", STEPS)
+    scheduler.advance(0.01)
+    assert not engine.play("macro", STEPS)
+    assert not engine.is_playing("macro")
+    scheduler.advance(1.0)
+    # Nothing after the cancel, and the held ctrl was released
+    assert keyboard.events == [("press", "ctrl"), ("press", "c"), ("release", "c"), ("release", "ctrl")]
+    assert functions == []
+    # The next press starts it over
+    assert engine.play("macro", STEPS)
+
+
+def test_cancel_all_releases_held_keys(scheduler):
+    engine, keyboard, _ = create_engine(scheduler)
+    engine.play("one", [{"press": "shift"}, {"press": "a"}, {"delay": 500}, {"release": "a"}])
+    engine.play("two", [{"press": "alt"}, {"delay": 500}])
+    scheduler.advance(0.01)
+    engine.cancel_all()
+    scheduler.advance(0.01)
+    assert keyboard.events[3:] == [("release", "a"), ("release", "shift"), ("release", "alt")]
+    assert scheduler.pending() == 0
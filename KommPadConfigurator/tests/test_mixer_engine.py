@@ -0,0 +1,42 @@
+"""Tests of mixer_engine.MixerEngine"""
+
+import metrics
+from mixer_engine import MixerEngine
+
+
+class FakeAudio:
+    """Audio backend with fixed volumes, get_volume() of "broken" raises"""
+
+    def __init__(self):
+        self.volumes = {"player": 50.0}
+
+    def get_volume(self, app):
+        if app == "broken":
+            raise OSError("backend crashed")
+        return self.volumes.get(app)
+
+    def set_volume(self, app, volume):
+        self.volumes[app] = volume
+        return True
+
+
+def test_steps_and_levels():
+    audio = FakeAudio()
+    mixer = MixerEngine(audio, interval=0)
+    mixer.step("player", 10)
+    mixer.flush()
+    mixer.set_volume("player", 120, 0, 80)
+    mixer.flush()
+    assert audio.volumes["player"] == 80
+
+
+def test_backend_errors_keep_the_thread_running():
+    audio = FakeAudio()
+    mixer = MixerEngine(audio, interval=0)
+    mixer.step("broken", 5)
+    mixer.flush()
+    assert metrics.get_counter('mixer_errors') == 1
+    assert mixer._thread.is_alive()
+    mixer.step("player", -20)
+    mixer.flush()
+    assert audio.volumes["player"] == 30
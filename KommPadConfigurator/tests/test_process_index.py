@@ -0,0 +1,56 @@
+"""Tests of process_index on a fake /proc"""
+
+import os
+import pytest
+from process_index import ProcessIndex, get_process_names
+
+
+def add_process(root, pid, comm, exe):
+    entry = root / str(pid)
+    entry.mkdir()
+    (entry / "comm").write_text(comm + "\n")
+    os.symlink(exe, entry / "exe")
+
+
+@pytest.fixture
+def proc(tmp_path):
+    (tmp_path / "self").mkdir()
+    (tmp_path / "cpuinfo").write_text("")
+    add_process(tmp_path, 100, "bash", "/usr/bin/bash")
+    add_process(tmp_path, 200, "firefox-bin", "/usr/lib/firefox/firefox")
+    add_process(tmp_path, 300, "gnome-text-edit", "/usr/bin/gnome-text-editor")
+    return tmp_path
+
+
+def test_process_names():
+    assert get_process_names("firefox --private-window") == ("firefox",)
+    assert get_process_names('"C:\\Program Files\\App\\Code.exe" --new') == ("code",)
+    assert get_process_names("gnome-text-editor") == ("gnome-text-editor", "gnome-text-edit")
+
+
+def test_find_by_comm_or_executable(proc):
+    index = ProcessIndex(str(proc))
+    assert index.is_available()
+    assert index.find("firefox") == [200]
+    assert index.find("/usr/bin/gnome-text-editor") == [300]
+    assert index.find("code") == []
+
+
+def test_refresh_reads_only_new_pids(proc):
+    index = ProcessIndex(str(proc))
+    index.find("bash")
+    assert index.scanned == 3
+    add_process(proc, 400, "bash", "/usr/bin/bash")
+    assert index.find("bash") == [100, 400]
+    assert index.scanned == 4
+
+
+def test_exited_and_reused_pids(proc):
+    index = ProcessIndex(str(proc))
+    assert index.find("firefox") == [200]
+    # Exited between two lookups
+    (proc / "100" / "comm").unlink()
+    assert index.find("bash") == []
+    # Reused by another program before the next refresh noticed
+    (proc / "200" / "comm").write_text("vim\n")
+    assert index.find("firefox") == []
@@ -0,0 +1,28 @@
+"""Tests of serial_session.SerialSession"""
+
+import pytest
+
+pytest.importorskip("serial")
+
+import button_handler
+import metrics
+from config_model import compile_config
+from event_timing import host_time_ms
+from serial_session import SerialSession
+
+CONFIG = compile_config({"mappings": {
+    "button1": {"layer0": {"action": "key", "value": "a"}},
+}})
+
+
+def test_failing_action_keeps_the_session(keyboard, monkeypatch):
+    def no_backend():
+        raise RuntimeError("no input backend")
+    session = SerialSession(None, CONFIG)
+    monkeypatch.setattr(button_handler, "get_keyboard", no_backend)
+    session.handle_line(b"button1 layer0 d", host_time_ms())
+    session.handle_line(b"button1 layer0 u", host_time_ms())
+    monkeypatch.undo()
+    session.handle_line(b"button1 layer0 d", host_time_ms())
+    assert metrics.get_counter('serial_event_lines') == 3
+    assert keyboard.events == [("press", "a"), ("release", "a")]
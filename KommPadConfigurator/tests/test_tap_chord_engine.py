@@ -0,0 +1,101 @@
+"""Tests of tap_chord_engine.TapChordEngine"""
+
+from config_model import compile_config
+from hold_engine import HoldEngine
+from tap_chord_engine import TapChordEngine
+
+CONFIG = compile_config({"mappings": {
+    "button1": {"layer0": {"action": "key", "value": "a", "tap_window": 200,
+                           "double_tap": {"action": "key", "value": "b"},
+                           "triple_tap": {"action": "key", "value": "c"}}},
+    "button2": {"layer0": {"action": "key", "value": "x"}},
+    "button3": {"layer0": {"action": "key", "value": "y"}},
+    "button4": {"layer0": {"action": "key", "value": "z"}},
+    "button5": {"layer0": {"action": "key", "value": "t", "tap_window": 200,
+                           "triple_tap": {"action": "key", "value": "u"}}},
+    "button2+button3": {"layer0": {"action": "key", "value": "q", "window": 50}},
+}})
+
+
+def taps(keyboard):
+    return [key for kind, key in keyboard.events if kind == "press"]
+
+
+def press(engine, control, scheduler, hold=0.01):
+    engine.on_event(CONFIG, control, "layer0", "down")
+    scheduler.advance(hold)
+    engine.on_event(CONFIG, control, "layer0", "up")
+
+
+def create_engine(scheduler):
+    return TapChordEngine(HoldEngine(scheduler), scheduler)
+
+
+def test_other_buttons_are_not_delayed(keyboard, scheduler):
+    engine = create_engine(scheduler)
+    engine.on_event(CONFIG, "button4", "layer0", "down")
+    assert taps(keyboard) == ["z"]
+
+
+def test_single_tap_after_the_tap_window(keyboard, scheduler):
+    engine = create_engine(scheduler)
+    press(engine, "button1", scheduler)
+    assert taps(keyboard) == []
+    scheduler.advance(0.25)
+    assert taps(keyboard) == ["a"]
+
+
+def test_double_tap(keyboard, scheduler):
+    engine = create_engine(scheduler)
+    press(engine, "button1", scheduler)
+    scheduler.advance(0.1)
+    press(engine, "button1", scheduler)
+    scheduler.advance(0.25)
+    assert taps(keyboard) == ["b"]
+
+
+def test_triple_tap_resolves_at_once(keyboard, scheduler):
+    engine = create_engine(scheduler)
+    for _ in range(3):
+        press(engine, "button1", scheduler)
+        scheduler.advance(0.05)
+    assert taps(keyboard) == ["c"]
+    assert scheduler.pending() == 0
+
+
+def test_fewer_taps_than_configured(keyboard, scheduler):
+    engine = create_engine(scheduler)
+    for _ in range(2):
+        press(engine, "button5", scheduler)
+        scheduler.advance(0.05)
+    scheduler.advance(0.25)
+    assert taps(keyboard) == ["t", "t"]
+
+
+def test_chord_within_the_window(keyboard, scheduler):
+    engine = create_engine(scheduler)
+    engine.on_event(CONFIG, "button2", "layer0", "down")
+    scheduler.advance(0.02)
+    engine.on_event(CONFIG, "button3", "layer0", "down")
+    engine.on_event(CONFIG, "button2", "layer0", "up")
+    engine.on_event(CONFIG, "button3", "layer0", "up")
+    assert taps(keyboard) == ["q"]
+
+
+def test_chord_partner_too_late(keyboard, scheduler):
+    engine = create_engine(scheduler)
+    engine.on_event(CONFIG, "button2", "layer0", "down")
+    scheduler.advance(0.1)
+    engine.on_event(CONFIG, "button3", "layer0", "down")
+    scheduler.advance(0.1)
+    engine.on_event(CONFIG, "button2", "layer0", "up")
+    engine.on_event(CONFIG, "button3", "layer0", "up")
+    assert taps(keyboard) == ["x", "y"]
+
+
+def test_release_all_drops_pending_taps(keyboard, scheduler):
+    engine = create_engine(scheduler)
+    press(engine, "button1", scheduler)
+    engine.release_all()
+    scheduler.advance(1.0)
+    assert taps(keyboard) == []
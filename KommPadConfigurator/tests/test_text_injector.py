@@ -0,0 +1,40 @@
+"""Tests of text_injector.TextInjector"""
+
+import time
+import pytest
+from text_injector import CHUNK_SIZE, TextInjector
+
+
+class NoClipboard:
+    def is_available(self):
+        return False
+
+
+class TimedKeyboard:
+    """Keep the typed chunks with the time they were typed"""
+
+    def __init__(self):
+        self.chunks = []
+
+    def type(self, text):
+        self.chunks.append((time.monotonic(), text))
+
+
+def test_unlimited_typing_uses_full_chunks():
+    keyboard = TimedKeyboard()
+    injector = TextInjector(keyboard, [], NoClipboard())
+    injector.inject_now("x" * 80, "type")
+    assert [len(text) for _, text in keyboard.chunks] == [CHUNK_SIZE, CHUNK_SIZE, 16]
+
+
+@pytest.mark.parametrize("rate, chunk", [(500, 10), (20, 1)])
+def test_typing_follows_the_rate(rate, chunk):
+    keyboard = TimedKeyboard()
+    injector = TextInjector(keyboard, [], NoClipboard(), rate=rate)
+    start = time.monotonic()
+    injector.inject_now("x" * (chunk * 5), "type")
+    assert [len(text) for _, text in keyboard.chunks] == [chunk] * 5
+    for typed, (when, _) in zip(range(0, chunk * 5, chunk), keyboard.chunks):
+        # Never ahead of the rate, and only late by scheduling noise
+        assert typed / rate <= when - start + 0.002
+        assert when - start < typed / rate + 0.05
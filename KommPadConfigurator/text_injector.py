@@ -0,0 +1,203 @@
+"""
+Text Injector Module for KommPad Configurator
+Types or pastes text snippets on a worker thread so the serial reader never waits
+
+Modes:
+    "type"   type the text in chunks, optionally limited to a rate in characters per second
+    "paste"  put the text on the clipboard and press the paste shortcut, then restore the clipboard
+    "auto"   paste long snippets when a clipboard is available, type everything else
+"""
+
+import queue
+import shutil
+import subprocess
+import sys
+import threading
+import time
+import metrics
+
+try:
+    import pyperclip  # Optional, preferred clipboard access when installed
+except ImportError:
+    pyperclip = None
+
+# Defaults, overridden by configure()
+DEFAULT_MODE = "auto"
+DEFAULT_RATE = 0             # Characters per second, 0 types as fast as possible
+CHUNK_SIZE = 32              # Characters per keyboard.type() call
+RATE_CHUNKS_PER_SECOND = 50  # Chunks per second at most when a rate is set
+AUTO_PASTE_MIN_LENGTH = 64   # "auto" mode pastes snippets at least this long
+PASTE_SETTLE_TIME = 0.15     # Seconds before the previous clipboard is restored
+
+# Clipboard command line tools, in order of preference: (copy command, paste command)
+CLIPBOARD_TOOLS = [
+    (["wl-copy"], ["wl-paste", "--no-newline"]),
+    (["xclip", "-selection", "clipboard"], ["xclip", "-selection", "clipboard", "-o"]),
+    (["xsel", "--clipboard", "--input"], ["xsel", "--clipboard", "--output"]),
+    (["pbcopy"], ["pbpaste"]),
+]
+
+def normalize_text(text):
+    """Use '\\n' line endings so a Windows line break is one Enter and not two"""
+    return text.replace("\r\n", "\n").replace("\r", "\n")
+
+class Clipboard:
+    """Read and write the clipboard through pyperclip or a command line tool"""
+
+    def __init__(self):
+        self._tools = None
+        if pyperclip is None:
+            for copy_cmd, paste_cmd in CLIPBOARD_TOOLS:
+                if shutil.which(copy_cmd[0]):
+                    self._tools = (copy_cmd, paste_cmd)
+                    break
+
+    def is_available(self):
+        """Check if the clipboard can be used"""
+        return pyperclip is not None or self._tools is not None
+
+    def read(self):
+        """Get the clipboard text, or None if it can't be read"""
+        try:
+            if pyperclip is not None:
+                return pyperclip.paste()
+            if self._tools:
+                result = subprocess.run(self._tools[1], capture_output=True, timeout=1)
+                return result.stdout.decode('utf-8', errors='replace')
+        except Exception:
+            pass
+        return None
+
+    def write(self, text):
+        """
+        Put text on the clipboard
+
+        Returns:
+            bool: True on success
+        """
+        try:
+            if pyperclip is not None:
+                pyperclip.copy(text)
+                return True
+            if self._tools:
+                subprocess.run(self._tools[0], input=text.encode('utf-8'), timeout=1, check=True)
+                return True
+        except Exception as e:
+            print(f"Error writing clipboard: {e}")
+        return False
+
+class TextInjector:
+    """
+    Inject text on a single worker thread.
+
+    Snippets are handled in order. Typing is split in chunks so a rate
+    limit can be applied between them without a sleep per character.
+    """
+
+    def __init__(self, keyboard, paste_keys, clipboard=None, mode=DEFAULT_MODE, rate=DEFAULT_RATE):
+        """
+        Args:
+            keyboard: Input backend with tap(keys) and type(text)
+            paste_keys (list): Keys of the paste shortcut (e.g., [Key.ctrl, 'v'])
+            clipboard (Clipboard): Clipboard access (default: detected automatically)
+            mode (str): "type", "paste" or "auto"
+            rate (int): Characters per second when typing, 0 for no limit
+        """
+        self._keyboard = keyboard
+        self._paste_keys = paste_keys
+        self._clipboard = clipboard or Clipboard()
+        self.mode = mode
+        self.rate = rate
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def configure(self, mode=None, rate=None):
+        """Change the default mode and typing rate"""
+        if mode is not None:
+            self.mode = mode
+        if rate is not None:
+            self.rate = max(0, int(rate))
+
+    def inject(self, text, mode=None):
+        """
+        Queue a snippet for injection (returns immediately)
+
+        Args:
+            text (str): Text to inject, any Unicode, may span several lines
+            mode (str): Override the default mode for this snippet
+        """
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="KommPadTextInjector", daemon=True)
+                self._thread.start()
+        self._queue.put((normalize_text(text), mode or self.mode))
+
+    def wait_idle(self):
+        """Block until every queued snippet was injected (used by benchmarks)"""
+        self._queue.join()
+
+    def inject_now(self, text, mode):
+        """
+        Inject a snippet on the calling thread
+
+        Returns:
+            int: Number of characters injected
+        """
+        start = time.perf_counter()
+        if mode == "auto":
+            use_paste = len(text) >= AUTO_PASTE_MIN_LENGTH and self._clipboard.is_available()
+            mode = "paste" if use_paste else "type"
+        if mode == "paste" and not self._paste(text):
+            mode = "type"  # Fall back to typing when the clipboard is not usable
+        if mode == "type":
+            self._type(text)
+        metrics.increment(f'text_{mode}_chars', len(text))
+        metrics.record_sample('text_injection_ms', (time.perf_counter() - start) * 1000.0)
+        return len(text)
+
+    def _run(self):
+        while True:
+            text, mode = self._queue.get()
+            try:
+                self.inject_now(text, mode)
+            except Exception as e:
+                print(f"Error injecting text: {e}")
+            finally:
+                self._queue.task_done()
+
+    def _type(self, text):
+        if self.rate:
+            # Smaller chunks at low rates, so no burst is longer than about 20 ms of typing
+            chunk = max(1, min(CHUNK_SIZE, self.rate // RATE_CHUNKS_PER_SECOND))
+            interval = chunk / self.rate
+        else:
+            chunk = CHUNK_SIZE
+            interval = 0.0
+        deadline = time.monotonic()
+        for index in range(0, len(text), chunk):
+            if interval:
+                delay = deadline - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                deadline += interval
+            self._keyboard.type(text[index:index + chunk])
+
+    def _paste(self, text):
+        if not self._clipboard.is_available():
+            return False
+        previous = self._clipboard.read()
+        if not self._clipboard.write(text):
+            return False
+        self._keyboard.tap(self._paste_keys)
+        if previous is not None:
+            # Give the target application time to read the clipboard first
+            time.sleep(PASTE_SETTLE_TIME)
+            self._clipboard.write(previous)
+        return True
+
+def get_default_paste_keys(key_enum):
+    """Get the paste shortcut of the platform (Cmd+V on macOS, Ctrl+V elsewhere)"""
+    if sys.platform == 'darwin':
+        return [key_enum.cmd, 'v']
+    return [key_enum.ctrl, 'v']
@@ -39,6 +39,9 @@ Keypad keypad = Keypad(makeKeymap(keymap), rowPins, colPins, numRows, numCols);
 // Encoder state variables
 int currentStateencPin1;
 int lastStateencPin1;
+int lastStateSW = HIGH;
+unsigned long lastChangeSW = 0;
+#define SW_DEBOUNCE_MS 20
 
 // Variables
 uint8_t MAX_LAYERS = 4;   
@@ -47,6 +50,33 @@ String layerNames[4]; // Adjust size as needed
 String display_names[4][6];
 uint16_t idleTime;
 
+// Log levels (set from the host with the "logLevel <n>" command)
+#define LOG_QUIET 0  // Only replies to commands (KommPong, layer changes)
+#define LOG_INFO 1   // Acknowledgements and warnings
+#define LOG_DEBUG 2  // Echo every parsed token
+uint8_t logLevel = LOG_DEBUG;
+
+// Optional event format flags (set from the host with the "eventFormat <n>" command)
+#define EVENT_TIMESTAMPS 1  // Append " t<millis> s<seq>" to each event
+#define EVENT_KEY_STATES 2  // Report key-down (" d") and key-up (" u") instead of single presses
+#define EVENT_DIALS 4       // Report the raw dial positions (" v<0-1023>")
+bool timestampEvents = false;
+bool keyStateEvents = false;
+bool dialEvents = false;
+uint8_t eventSeq = 0;          // Rolling sequence number so the host can detect lost events
+void sendEvent(String prefix, char btn, char state = 0, int value = -1);  // Declared here for the default arguments
+
+// Dials (potentiometers), sampled raw with a deadband and a rate limit; smoothing and scaling are done by the host
+#define NUM_DIALS 3
+#define DIAL_SAMPLE_MS 10
+#define DIAL_DEADBAND 4     // Smallest change reported, hides ADC noise
+#define DIAL_SEND_MS 40     // Shortest time between two reports of a dial, keeps 9600 baud free for keys
+#define DIAL_MAX 1023
+const uint8_t dialPins[NUM_DIALS] = { A0, A1, A2 };
+int lastDialValue[NUM_DIALS] = { -1, -1, -1 };
+unsigned long lastDialSend[NUM_DIALS] = { 0, 0, 0 };
+unsigned long lastDialSample = 0;
+
 int xPos[] = { 0, 48, 92 };  // X positions for the columns
 int yPos[] = { 0, 25 };      // Y positions for the rows
 // Setup function to initialize components
@@ -81,7 +111,7 @@ void loop() {
   read_serial();
   read_btn();
   read_enc();
-
+  read_dials();
 
   Led(effect);
   
@@ -89,12 +119,21 @@ void loop() {
 }
 
 void read_btn() {
-  // Get pressed key from the keypad
-  char key = keypad.getKey();
+  // Scan the keypad, getKeys() also tracks releases and several keys at once
+  if (!keypad.getKeys()) {
+    return;
+  }
 
-  // If a key is pressed, execute the corresponding action
-  if (key != NO_KEY) {
-    sendEvent("button", key);
+  for (int i = 0; i < LIST_MAX; i++) {
+    if (!keypad.key[i].stateChanged) {
+      continue;
+    }
+    char key = keypad.key[i].kchar;
+    if (keypad.key[i].kstate == PRESSED) {
+      sendEvent("button", key, keyStateEvents ? 'd' : 0);
+    } else if (keypad.key[i].kstate == RELEASED && keyStateEvents) {
+      sendEvent("button", key, 'u');
+    }
   }
 }
 
@@ -110,11 +149,41 @@ void read_enc() {
   }
   lastStateencPin1 = currentStateencPin1;  // Store the last encoder pin state
 
-  // Check if encoder switch (SW) is pressed
-  if (digitalRead(SW) == LOW) {
-    sendEvent("encoder", '2');
-    while (digitalRead(SW) == LOW) {}  // Wait for switch release or long press time
-    updateDisplay(); // Update the OLED display after switch press
+  // Check if encoder switch (SW) changed, without blocking while it is held
+  int stateSW = digitalRead(SW);
+  if (stateSW != lastStateSW && millis() - lastChangeSW > SW_DEBOUNCE_MS) {
+    lastStateSW = stateSW;
+    lastChangeSW = millis();
+    if (stateSW == LOW) {
+      sendEvent("encoder", '2', keyStateEvents ? 'd' : 0);
+    } else {
+      if (keyStateEvents) {
+        sendEvent("encoder", '2', 'u');
+      }
+      updateDisplay(); // Update the OLED display after switch release
+    }
+  }
+}
+
+void read_dials() {
+  // Only sample when the host asked for dial events, unconnected inputs float
+  if (!dialEvents || millis() - lastDialSample < DIAL_SAMPLE_MS) {
+    return;
+  }
+  lastDialSample = millis();
+
+  for (int i = 0; i < NUM_DIALS; i++) {
+    int value = analogRead(dialPins[i]);
+    if (value == lastDialValue[i] || lastDialSample - lastDialSend[i] < DIAL_SEND_MS) {
+      continue;
+    }
+    // Report a move of at least the deadband, and always the end stops so 0 and 100% are reachable
+    bool endStop = value <= 0 || value >= DIAL_MAX;
+    if (lastDialValue[i] < 0 || abs(value - lastDialValue[i]) >= DIAL_DEADBAND || endStop) {
+      lastDialValue[i] = value;
+      lastDialSend[i] = lastDialSample;
+      sendEvent("dial", '1' + i, 0, value);
+    }
   }
 }
 
@@ -132,24 +201,58 @@ void read_serial() {
             Serial.print("Layer changed to: ");
             Serial.println(currentLayer);
             updateDisplay(); // Update the OLED display after layer change
+        } else if (input.startsWith("setLayer ")) {  // Absolute layer set by the host
+            int layer = input.substring(9).toInt();
+            if (layer >= 0 && layer < MAX_LAYERS) {
+                currentLayer = layer;
+            }
+            Serial.print("Layer changed to: ");  // Reply with the actual layer so the host can confirm
+            Serial.println(currentLayer);
+            updateDisplay(); // Update the OLED display after layer change
+        } else if (input.startsWith("logLevel ")) {  // Set the verbosity of the serial output
+            logLevel = constrain(input.substring(9).toInt(), LOG_QUIET, LOG_DEBUG);
+            Serial.print("Log level set to: ");
+            Serial.println(logLevel);
+        } else if (input.startsWith("eventFormat ")) {  // Select the optional event fields
+            int flags = input.substring(12).toInt();
+            timestampEvents = flags & EVENT_TIMESTAMPS;
+            keyStateEvents = flags & EVENT_KEY_STATES;
+            dialEvents = flags & EVENT_DIALS;
+            Serial.print("Event format set to: ");
+            Serial.println(flags);
         } else if (input.startsWith("Settings:")) {  // Check if input is a settings string
-            Serial.println("Settings received.");
+            if (logLevel >= LOG_INFO) Serial.println("Settings received.");
             loadSettings(input);  // Pass the settings string to loadSettings
         } else if (input.startsWith("DisplayNames:")) {  // Check if input is a display names string
-            Serial.println("Display names received.");
+            if (logLevel >= LOG_INFO) Serial.println("Display names received.");
             loadDisplayNames(input);  // Pass the display names string to loadDisplayNames
-        } else {
+        } else if (logLevel >= LOG_INFO) {
             Serial.print("Unknown command: ");
             Serial.println(input);
         }
     }
 }
 
-void sendEvent(String prefix, char btn) {
+void sendEvent(String prefix, char btn, char state, int value) {
   Serial.print(prefix);
   Serial.print(btn);              // 0…5
   Serial.print(F(" layer"));
-  Serial.println(currentLayer);   // 0…MAX_LAYERS-1
+  Serial.print(currentLayer);     // 0…MAX_LAYERS-1
+  if (state) {
+    Serial.print(' ');
+    Serial.print(state);          // 'd' pressed, 'u' released
+  }
+  if (value >= 0) {
+    Serial.print(F(" v"));
+    Serial.print(value);          // Raw dial position
+  }
+  if (timestampEvents) {
+    Serial.print(F(" t"));
+    Serial.print(millis());       // Device time for latency attribution
+    Serial.print(F(" s"));
+    Serial.print(eventSeq++);     // 0…255, wraps around
+  }
+  Serial.println();
 }
 
 void updateDisplay() {
@@ -178,9 +281,11 @@ void updateDisplay() {
 }
 
 int splitString(String& input, char delimiter, String arr[]) {
-  Serial.print("Splitting string: '");
-  Serial.print(input);
-  Serial.println("'");
+  if (logLevel >= LOG_DEBUG) {
+    Serial.print("Splitting string: '");
+    Serial.print(input);
+    Serial.println("'");
+  }
 
     int index = 0;
     int inputLength = input.length();
@@ -203,31 +308,35 @@ int splitString(String& input, char delimiter, String arr[]) {
             }
             
             // Debug output
-            Serial.print("Token[");
-            Serial.print(index);
-            Serial.print("]: '");
-            Serial.print(arr[index]);
-            Serial.println("'");
+            if (logLevel >= LOG_DEBUG) {
+                Serial.print("Token[");
+                Serial.print(index);
+                Serial.print("]: '");
+                Serial.print(arr[index]);
+                Serial.println("'");
+            }
             
             index++;
             start = i + 1;  // Start next token after the delimiter
             
             // Safety check to prevent array overflow
             if (index >= 50) {  // Adjust this limit as needed
-                Serial.println("Warning: Maximum tokens reached!");
+                if (logLevel >= LOG_INFO) Serial.println("Warning: Maximum tokens reached!");
                 break;
             }
         }
     }
     
-    Serial.print("Total tokens found: ");
-    Serial.println(index);
+    if (logLevel >= LOG_DEBUG) {
+        Serial.print("Total tokens found: ");
+        Serial.println(index);
+    }
     return index;
 }
 
 void loadSettings(String settings) {
   
-  Serial.println(settings);
+  if (logLevel >= LOG_DEBUG) Serial.println(settings);
   settings.remove(0, 10);  // Remove "Settings:" prefix
 
   String settingList[10]; // Adjust size as needed
@@ -236,7 +345,7 @@ void loadSettings(String settings) {
   int size = splitString(settings, ',', settingList);
 
   // Print the split settings for debugging
-  for (int i = 0; i < size; i++) {
+  for (int i = 0; i < size && logLevel >= LOG_DEBUG; i++) {
       Serial.print("Setting[");
       Serial.print(i);
       Serial.print("]: ");
@@ -259,7 +368,7 @@ void loadSettings(String settings) {
 }
 
 void loadDisplayNames(String names_str) {
-  Serial.println(names_str);
+  if (logLevel >= LOG_DEBUG) Serial.println(names_str);
   names_str.remove(0, 14);  // Remove "DisplayNames:" prefix
 
   String nameLayers[4]; // Adjust size as needed
@@ -272,7 +381,7 @@ void loadDisplayNames(String names_str) {
   splitString(nameLayers[3], '~', display_names[3]);
 
   // Print the split display names for debugging
-  for (int i = 0; i < 4; i++) {
+  for (int i = 0; i < 4 && logLevel >= LOG_DEBUG; i++) {
     for (int j = 0; j < 6; j++) {
       Serial.print("DisplayName[");
       Serial.print(i);